@@ -0,0 +1,43 @@
+"""Add denormalized sales counters to products."""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "products", sa.Column("units_sold", sa.Integer(), nullable=False, server_default="0")
+    )
+    op.add_column(
+        "products", sa.Column("trending_score", sa.Double(), nullable=False, server_default="0")
+    )
+    op.create_index(
+        "ix_products_active_units_sold", "products", ["is_active", "units_sold", "id"]
+    )
+    op.create_index(
+        "ix_products_active_trending_score", "products", ["is_active", "trending_score", "id"]
+    )
+    # Trending scores start from zero; units sold are backfilled from paid orders.
+    op.execute(
+        """
+        UPDATE products SET units_sold = (
+            SELECT COALESCE(SUM(order_items.qty), 0)
+            FROM order_items JOIN orders ON orders.id = order_items.order_id
+            WHERE order_items.product_id = products.id
+              AND orders.status IN ('paid', 'shipped', 'completed')
+        )
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_products_active_trending_score", table_name="products")
+    op.drop_index("ix_products_active_units_sold", table_name="products")
+    op.drop_column("products", "trending_score")
+    op.drop_column("products", "units_sold")
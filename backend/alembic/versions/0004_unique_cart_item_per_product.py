@@ -0,0 +1,48 @@
+"""Allow one cart line per product."""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    cart_items = sa.table(
+        "cart_items",
+        sa.column("id", sa.Integer),
+        sa.column("cart_id", sa.Integer),
+        sa.column("product_id", sa.Integer),
+        sa.column("qty", sa.Integer),
+    )
+    # Merge existing duplicate lines into the oldest one before adding the constraint.
+    duplicates = bind.execute(
+        sa.select(
+            sa.func.min(cart_items.c.id),
+            sa.func.sum(cart_items.c.qty),
+            cart_items.c.cart_id,
+            cart_items.c.product_id,
+        )
+        .group_by(cart_items.c.cart_id, cart_items.c.product_id)
+        .having(sa.func.count() > 1)
+    ).all()
+    for keep_id, qty, cart_id, product_id in duplicates:
+        bind.execute(sa.update(cart_items).where(cart_items.c.id == keep_id).values(qty=qty))
+        bind.execute(
+            sa.delete(cart_items).where(
+                cart_items.c.cart_id == cart_id,
+                cart_items.c.product_id == product_id,
+                cart_items.c.id != keep_id,
+            )
+        )
+    with op.batch_alter_table("cart_items") as batch:
+        batch.create_unique_constraint("uq_cart_items_cart_product", ["cart_id", "product_id"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("cart_items") as batch:
+        batch.drop_constraint("uq_cart_items_cart_product", type_="unique")
@@ -0,0 +1,20 @@
+"""Index draft-cart lookups by (user_id, status)."""
+from __future__ import annotations
+
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_carts_user_id_status", "carts", ["user_id", "status"])
+    # The composite index leads with user_id, so it also serves the foreign key.
+    op.drop_index("ix_carts_user_id", table_name="carts")
+
+
+def downgrade() -> None:
+    op.create_index("ix_carts_user_id", "carts", ["user_id"])
+    op.drop_index("ix_carts_user_id_status", table_name="carts")
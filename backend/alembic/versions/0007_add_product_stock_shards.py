@@ -0,0 +1,34 @@
+"""Add sharded stock counters for hot products."""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "products", sa.Column("stock_shards", sa.Integer(), nullable=False, server_default="0")
+    )
+    op.create_index("ix_products_stock_shards", "products", ["stock_shards"])
+    op.create_table(
+        "product_stock_shards",
+        sa.Column(
+            "product_id",
+            sa.Integer(),
+            sa.ForeignKey("products.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("shard", sa.Integer(), primary_key=True),
+        sa.Column("stock", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("product_stock_shards")
+    op.drop_index("ix_products_stock_shards", table_name="products")
+    op.drop_column("products", "stock_shards")
@@ -0,0 +1,21 @@
+"""Add a last-modified timestamp to products."""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("products", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE products SET updated_at = created_at")
+    with op.batch_alter_table("products") as batch:
+        batch.alter_column("updated_at", existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column("products", "updated_at")
@@ -1,20 +1,42 @@
 """Admin endpoints."""
 from __future__ import annotations
 
+import datetime as dt
 import logging
-
-from fastapi import APIRouter, Depends, Query, status
-
-from ..core.deps import get_catalog_service, get_order_repository, get_order_service, require_admin
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
+
+from ..core.deps import (
+    get_catalog_service,
+    get_order_repository,
+    get_order_service,
+    get_product_importer,
+    require_admin,
+)
+from ..db.session import async_session_factory
 from ..models.order import OrderStatus
 from ..schemas.common import Paginated
 from ..schemas.order import OrderOut
-from ..schemas.product import ProductCreate, ProductOut, ProductUpdate
+from ..schemas.product import (
+    ProductBulkUpdate,
+    ProductBulkUpdateResult,
+    ProductCreate,
+    ProductImportReport,
+    ProductOut,
+    ProductUpdate,
+)
+from ..services.order_export import export_orders
+from ..services.product_import import iter_lines, parse_csv, parse_ndjson
 from ..utils.errors import not_found
+from ..utils.serialization import FragmentEncoder, page_body
 
 router = APIRouter(prefix="/admin")
 logger = logging.getLogger("audit")
 
+_order_encoder = FragmentEncoder(OrderOut)
+
 
 @router.post("/products", response_model=ProductOut, status_code=status.HTTP_201_CREATED)
 async def create_product(payload: ProductCreate, service=Depends(get_catalog_service), admin=Depends(require_admin)):
@@ -23,6 +45,54 @@ async def create_product(payload: ProductCreate, service=Depends(get_catalog_ser
     return ProductOut.model_validate(product)
 
 
+@router.patch("/products", response_model=ProductBulkUpdateResult)
+async def bulk_update_products(
+    payload: ProductBulkUpdate,
+    service=Depends(get_catalog_service),
+    admin=Depends(require_admin),
+):
+    """Apply price/stock/active changes to many products in one transaction."""
+    result = await service.bulk_update(payload.items)
+    logger.info(
+        "products_bulk_updated",
+        extra={
+            "requested": result.requested,
+            "updated": result.updated,
+            "not_found": len(result.not_found),
+            "admin_id": admin.id,
+        },
+    )
+    return result
+
+
+@router.post("/products/import", response_model=ProductImportReport)
+async def import_products(
+    request: Request,
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+    batch_size: int | None = Query(default=None, ge=1, le=10_000),
+    importer=Depends(get_product_importer),
+    admin=Depends(require_admin),
+):
+    """Upsert products keyed on SKU from an NDJSON or CSV request body, streamed."""
+    if batch_size is not None:
+        importer.batch_size = batch_size
+    admin_id = admin.id
+    parse = parse_csv if format == "csv" else parse_ndjson
+    report = await importer.run(parse(iter_lines(request.stream())))
+    logger.info(
+        "products_imported",
+        extra={
+            "rows": report.rows,
+            "created_rows": report.created,
+            "updated_rows": report.updated,
+            "failed_rows": report.failed,
+            "rows_per_second": round(report.rows_per_second, 1),
+            "admin_id": admin_id,
+        },
+    )
+    return ProductImportReport(**asdict(report), rows_per_second=report.rows_per_second)
+
+
 @router.patch("/products/{product_id}", response_model=ProductOut)
 async def update_product(
     product_id: int,
@@ -52,13 +122,62 @@ async def list_orders(
     status: OrderStatus | None = Query(default=None),
     page: int = Query(default=1, ge=1, le=100),
     page_size: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = Query(default=None, max_length=512),
     admin=Depends(require_admin),
     repo=Depends(get_order_repository),
 ):
-    orders, total = await repo.list_all(status=status, page=page, page_size=page_size)
-    items = [OrderOut.model_validate(order) for order in orders]
-    pages = (total + page_size - 1) // page_size if page_size else 1
-    return Paginated[OrderOut](items=items, total=total, page=page, page_size=page_size, pages=pages)
+    result = await repo.list_all(status=status, page=page, page_size=page_size, cursor=cursor)
+    body = page_body(
+        _order_encoder.encode(result.items),
+        total=result.total,
+        page=page,
+        page_size=page_size,
+        pages=(result.total + page_size - 1) // page_size if page_size else 1,
+        next_cursor=result.next_cursor,
+        total_estimated=result.total_estimated,
+    )
+    return Response(content=body, media_type="application/json")
+
+
+def _as_utc(value: dt.datetime | None) -> dt.datetime | None:
+    # Order timestamps are stored as naive UTC.
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(dt.timezone.utc).replace(tzinfo=None)
+
+
+@router.get("/orders/export")
+async def export_orders_feed(
+    format: str = Query(default="ndjson", pattern="^(ndjson|csv)$"),
+    status: OrderStatus | None = Query(default=None),
+    created_from: dt.datetime | None = Query(default=None),
+    created_to: dt.datetime | None = Query(default=None),
+    admin=Depends(require_admin),
+):
+    """Stream every matching order with its items as NDJSON or CSV."""
+    logger.info(
+        "orders_exported",
+        extra={
+            "format": format,
+            "status": status,
+            "created_from": created_from,
+            "created_to": created_to,
+            "admin_id": admin.id,
+        },
+    )
+    body = export_orders(
+        async_session_factory,
+        format,
+        status=status,
+        created_from=_as_utc(created_from),
+        created_to=_as_utc(created_to),
+    )
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'},
+    )
 
 
 @router.patch("/orders/{order_id}", response_model=OrderOut)
@@ -1,10 +1,19 @@
 """Cart endpoints."""
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Request, status
 
 from ..core.deps import get_cart_service, require_user
-from ..schemas.cart import CartItemCreate, CartItemOut, CartItemUpdate, CartOut
+from ..repositories.carts import CartLoad
+from ..schemas.cart import (
+    CartBatch,
+    CartItemCreate,
+    CartItemOut,
+    CartItemUpdate,
+    CartOut,
+    CartQuote,
+)
+from ..utils.http import cached_json_response
 
 router = APIRouter(prefix="/cart")
 
@@ -15,17 +24,39 @@ async def get_cart(service=Depends(get_cart_service), current_user=Depends(requi
     return CartOut.model_validate(cart)
 
 
+@router.get("/quote", response_model=CartQuote)
+async def get_quote(
+    request: Request,
+    service=Depends(get_cart_service),
+    current_user=Depends(require_user),
+):
+    cart = await service.get_or_create_cart(current_user.id, load=CartLoad.header)
+    quote = await service.quote(cart)
+    return cached_json_response(request, quote.body, quote.etag, cache_control="private, no-cache")
+
+
 @router.post("/items", response_model=CartItemOut, status_code=status.HTTP_201_CREATED)
 async def add_item(
     payload: CartItemCreate,
     service=Depends(get_cart_service),
     current_user=Depends(require_user),
 ):
-    cart = await service.get_or_create_cart(current_user.id)
-    item = await service.add_item(cart, product_id=payload.product_id, qty=payload.qty)
+    cart = await service.get_or_create_cart(current_user.id, load=CartLoad.header)
+    item = await service.add_item(cart.id, product_id=payload.product_id, qty=payload.qty)
     return CartItemOut.model_validate(item)
 
 
+@router.post("/batch", response_model=CartOut)
+async def apply_batch(
+    payload: CartBatch,
+    service=Depends(get_cart_service),
+    current_user=Depends(require_user),
+):
+    cart = await service.get_or_create_cart(current_user.id, load=CartLoad.items)
+    cart = await service.apply_batch(cart, payload.ops)
+    return CartOut.model_validate(cart)
+
+
 @router.patch("/items/{item_id}", response_model=CartItemOut)
 async def update_item(
     item_id: int,
@@ -33,8 +64,8 @@ async def update_item(
     service=Depends(get_cart_service),
     current_user=Depends(require_user),
 ):
-    cart = await service.get_or_create_cart(current_user.id)
-    item = await service.update_item(cart, item_id, payload.qty)
+    cart = await service.get_or_create_cart(current_user.id, load=CartLoad.header)
+    item = await service.update_item(cart.id, item_id, payload.qty)
     return CartItemOut.model_validate(item)
 
 
@@ -44,5 +75,5 @@ async def delete_item(
     service=Depends(get_cart_service),
     current_user=Depends(require_user),
 ) -> None:
-    cart = await service.get_or_create_cart(current_user.id)
-    await service.delete_item(cart, item_id)
+    cart = await service.get_or_create_cart(current_user.id, load=CartLoad.header)
+    await service.delete_item(cart.id, item_id)
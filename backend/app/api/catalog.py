@@ -1,34 +1,43 @@
 """Catalog endpoints."""
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request
 
 from ..core.deps import get_catalog_service, rate_limit
 from ..schemas.category import CategoryOut
-from ..schemas.common import Paginated
-from ..schemas.product import ProductOut
+from ..schemas.product import ProductOut, ProductPage, ProductSuggestion
+from ..utils.http import cached_json_response, not_modified
 
 router = APIRouter()
 
+FACETS_PATTERN = "^(category|price|stock)(,(category|price|stock))*$"
+
 
 @router.get("/categories", response_model=list[CategoryOut], dependencies=[Depends(rate_limit)])
-async def list_categories(service=Depends(get_catalog_service)):
-    categories = await service.list_categories()
-    return [CategoryOut.model_validate(cat) for cat in categories]
+async def list_categories(request: Request, service=Depends(get_catalog_service)):
+    tree = await service.get_category_tree()
+    return cached_json_response(request, tree.body, tree.etag)
 
 
-@router.get("/products", response_model=Paginated[ProductOut], dependencies=[Depends(rate_limit)])
+@router.get("/products", response_model=ProductPage, dependencies=[Depends(rate_limit)])
 async def list_products(
+    request: Request,
     q: str | None = None,
     category_id: int | None = Query(default=None),
+    include_descendants: bool = Query(default=False),
+    facets: str | None = Query(default=None, pattern=FACETS_PATTERN),
+    fuzzy: bool = Query(default=False),
     min_price: int | None = Query(default=None, ge=0),
     max_price: int | None = Query(default=None, ge=0),
-    sort: str | None = Query(default=None, pattern="^(price_asc|price_desc)$"),
+    sort: str | None = Query(
+        default=None, pattern="^(price_asc|price_desc|best_selling|trending)$"
+    ),
     page: int = Query(default=1, ge=1, le=100),
     page_size: int = Query(default=12, ge=1, le=100),
+    cursor: str | None = Query(default=None, max_length=512),
     service=Depends(get_catalog_service),
 ):
-    products, total = await service.search_products(
+    listing = await service.product_listing(
         q=q,
         category_id=category_id,
         min_price=min_price,
@@ -36,13 +45,37 @@ async def list_products(
         sort=sort,
         page=page,
         page_size=page_size,
+        cursor=cursor,
+        include_descendants=include_descendants,
+        facets=frozenset(facets.split(",")) if facets else frozenset(),
+        fuzzy=fuzzy,
     )
-    items = [ProductOut.model_validate(prod) for prod in products]
-    pages = (total + page_size - 1) // page_size if page_size else 1
-    return Paginated[ProductOut](items=items, total=total, page=page, page_size=page_size, pages=pages)
+    return cached_json_response(request, listing.body, listing.etag)
+
+
+@router.get(
+    "/products/suggest",
+    response_model=list[ProductSuggestion],
+    dependencies=[Depends(rate_limit)],
+)
+async def suggest_products(
+    prefix: str = Query(min_length=1, max_length=100),
+    limit: int = Query(default=8, ge=1, le=20),
+    service=Depends(get_catalog_service),
+):
+    return service.suggest(prefix, limit)
 
 
 @router.get("/products/{identifier}", response_model=ProductOut, dependencies=[Depends(rate_limit)])
-async def get_product(identifier: str, service=Depends(get_catalog_service)):
-    product = await service.get_product(identifier)
-    return ProductOut.model_validate(product)
+async def get_product(identifier: str, request: Request, service=Depends(get_catalog_service)):
+    if request.headers.get("if-none-match") or request.headers.get("if-modified-since"):
+        validators = await service.get_product_validators(identifier)
+        if validators is not None:
+            etag, last_modified = validators
+            unchanged = not_modified(request, etag, last_modified=last_modified)
+            if unchanged is not None:
+                return unchanged
+    product = await service.get_product_representation(identifier)
+    return cached_json_response(
+        request, product.body, product.etag, last_modified=product.last_modified
+    )
@@ -4,6 +4,7 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, status
 
 from ..core.deps import get_cart_service, get_order_service, require_user
+from ..repositories.carts import CartLoad
 from ..utils.errors import http_error
 from ..schemas.order import CheckoutRequest, CheckoutResponse
 
@@ -17,7 +18,7 @@ async def checkout(
     cart_service=Depends(get_cart_service),
     current_user=Depends(require_user),
 ):
-    cart = await cart_service.get_or_create_cart(current_user.id)
+    cart = await cart_service.get_or_create_cart(current_user.id, load=CartLoad.items)
     if cart.id != payload.cart_id:
         raise http_error(status_code=400, detail="Cart mismatch")
     order, payment_ref, client_secret = await order_service.checkout(cart)
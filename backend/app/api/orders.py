@@ -1,40 +1,74 @@
 """Order endpoints for customers."""
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Query
+from typing import Any
+
+from fastapi import APIRouter, Depends, Query, Request
 
 from ..core.deps import get_order_repository, require_user
 from ..models.order import OrderStatus
 from ..schemas.common import Paginated
 from ..schemas.order import OrderOut
+from ..utils.http import cached_json_response, not_modified, weak_etag
 
 router = APIRouter(prefix="/orders")
 
 
+def _order_etag(order: Any) -> str:
+    # Items are immutable once placed; only the header columns change.
+    return weak_etag("order", order.id, order.status.value, order.paid_at, order.total_cents)
+
+
 @router.get("", response_model=Paginated[OrderOut])
 async def list_orders(
     status: OrderStatus | None = Query(default=None),
     page: int = Query(default=1, ge=1, le=100),
     page_size: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = Query(default=None, max_length=512),
     current_user=Depends(require_user),
     repo=Depends(get_order_repository),
 ):
-    orders, total = await repo.list_by_user(
+    result = await repo.list_by_user(
         user_id=current_user.id,
         status=status,
         page=page,
         page_size=page_size,
+        cursor=cursor,
+    )
+    items = [OrderOut.model_validate(order) for order in result.items]
+    pages = (result.total + page_size - 1) // page_size if page_size else 1
+    return Paginated[OrderOut](
+        items=items,
+        total=result.total,
+        page=page,
+        page_size=page_size,
+        pages=pages,
+        next_cursor=result.next_cursor,
+        total_estimated=result.total_estimated,
     )
-    items = [OrderOut.model_validate(order) for order in orders]
-    pages = (total + page_size - 1) // page_size if page_size else 1
-    return Paginated[OrderOut](items=items, total=total, page=page, page_size=page_size, pages=pages)
 
 
 @router.get("/{order_id}", response_model=OrderOut)
-async def get_order(order_id: int, current_user=Depends(require_user), repo=Depends(get_order_repository)):
+async def get_order(
+    order_id: int,
+    request: Request,
+    current_user=Depends(require_user),
+    repo=Depends(get_order_repository),
+):
+    if request.headers.get("if-none-match"):
+        version = await repo.get_version(order_id)
+        if version is not None and version.user_id == current_user.id:
+            unchanged = not_modified(
+                request, _order_etag(version), cache_control="private, no-cache"
+            )
+            if unchanged is not None:
+                return unchanged
     order = await repo.get_by_id(order_id)
     if not order or order.user_id != current_user.id:
         from ..utils.errors import not_found
 
         raise not_found("Order not found")
-    return OrderOut.model_validate(order)
+    body = OrderOut.model_validate(order).model_dump_json().encode()
+    return cached_json_response(
+        request, body, _order_etag(order), cache_control="private, no-cache"
+    )
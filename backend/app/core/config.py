@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from functools import lru_cache
-from typing import List
+from typing import Dict, List
 
 from pydantic import AnyHttpUrl, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -37,6 +37,40 @@ class Settings(BaseSettings):
 
     IMAGE_URL_PATTERN: str = Field(default=r"^https://.+")
 
+    SEARCH_INDEX_ENABLED: bool = Field(default=True)
+    CATALOG_SNAPSHOT_ENABLED: bool = Field(default=False)
+    SUGGEST_INDEX_ENABLED: bool = Field(default=True)
+
+    COUNT_STRATEGY: str = Field(default="window", pattern="^(exact|window|estimate)$")
+    COUNT_ESTIMATE_THRESHOLD: int = Field(default=10_000, ge=1)
+    COUNT_CACHE_TTL_SECONDS: int = Field(default=30, ge=0)
+
+    CATALOG_CACHE_TTL_SECONDS: int = Field(default=60, ge=0)
+    CATALOG_CACHE_MAX_ENTRIES: int = Field(default=10_000, ge=0)
+    SEARCH_CACHE_TTL_SECONDS: int = Field(default=10, ge=0)
+    TRENDING_HALF_LIFE_HOURS: float = Field(default=168, gt=0)
+    PRODUCT_SLUG_CACHE_TTL_SECONDS: int = Field(default=3600, ge=0)
+    PRODUCT_SLUG_CACHE_MAX_ENTRIES: int = Field(default=50_000, ge=0)
+    PRODUCT_FRAGMENT_CACHE_TTL_SECONDS: int = Field(default=3600, ge=0)
+    PRODUCT_FRAGMENT_CACHE_MAX_ENTRIES: int = Field(default=50_000, ge=0)
+    CATEGORY_TREE_TTL_SECONDS: int = Field(default=300, ge=0)
+    CART_QUOTE_CACHE_TTL_SECONDS: int = Field(default=30, ge=0)
+    CART_QUOTE_CACHE_MAX_ENTRIES: int = Field(default=10_000, ge=0)
+    STOCK_SHARDS_MAX: int = Field(default=64, ge=1)
+    STOCK_SHARD_SYNC_SECONDS: float = Field(default=1.0, ge=0)
+    FACET_PRICE_BOUNDS: List[int] = Field(
+        default_factory=lambda: [1_000, 2_500, 5_000, 10_000, 25_000]
+    )
+
+    PRODUCT_IMPORT_BATCH_SIZE: int = Field(default=500, ge=1, le=10_000)
+    PRODUCT_IMPORT_MAX_BYTES: int = Field(default=512 * 1024 * 1024, ge=1)
+
+    QUERY_STATS_ENABLED: bool = Field(default=True)
+    QUERY_BUDGET_ENFORCED: bool = Field(default=False)
+    QUERY_BUDGET_MAX_QUERIES: int = Field(default=20, ge=1)
+    QUERY_BUDGET_MAX_REPEATS: int = Field(default=5, ge=1)
+    QUERY_BUDGET_OVERRIDES: Dict[str, int] = Field(default_factory=dict)
+
 
 @lru_cache()
 def get_settings() -> Settings:
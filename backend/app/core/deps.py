@@ -19,10 +19,22 @@ from ..repositories.users import UserRepository
 from ..services.auth import AuthService
 from ..services.cart import CartService
 from ..services.catalog import CatalogService
+from ..services.categories import category_tree_store
+from ..services.product_import import ProductImporter
 from ..services.orders import OrderService, PaymentProvider
 from .config import settings
 from .security import decode_token
+from ..utils.cache import (
+    cart_quotes,
+    catalog_cache,
+    listing_flights,
+    product_fragments,
+    product_slug_ids,
+)
+from ..utils.columnar import product_snapshot
 from ..utils.errors import AppErrorCode
+from ..utils.search import product_search_index
+from ..utils.suggest import product_suggestions
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
@@ -93,9 +105,36 @@ async def get_auth_service(
 async def get_catalog_service(
     session: Annotated[AsyncSession, Depends(get_db)]
 ) -> CatalogService:
+    search_index = product_search_index if settings.SEARCH_INDEX_ENABLED else None
+    snapshot = product_snapshot if settings.CATALOG_SNAPSHOT_ENABLED else None
     return CatalogService(
-        products=ProductRepository(session),
+        products=ProductRepository(session, search_index=search_index, snapshot=snapshot),
         categories=CategoryRepository(session),
+        search_index=search_index,
+        cache=catalog_cache,
+        category_tree=category_tree_store,
+        snapshot=snapshot,
+        slug_ids=product_slug_ids,
+        suggestions=product_suggestions if settings.SUGGEST_INDEX_ENABLED else None,
+        fragments=product_fragments,
+        flights=listing_flights,
+        quotes=cart_quotes,
+    )
+
+
+async def get_product_importer(
+    session: Annotated[AsyncSession, Depends(get_db)]
+) -> ProductImporter:
+    return ProductImporter(
+        session=session,
+        products=ProductRepository(session),
+        batch_size=settings.PRODUCT_IMPORT_BATCH_SIZE,
+        search_index=product_search_index if settings.SEARCH_INDEX_ENABLED else None,
+        snapshot=product_snapshot if settings.CATALOG_SNAPSHOT_ENABLED else None,
+        cache=catalog_cache,
+        slug_ids=product_slug_ids,
+        suggestions=product_suggestions if settings.SUGGEST_INDEX_ENABLED else None,
+        quotes=cart_quotes,
     )
 
 
@@ -106,6 +145,7 @@ async def get_cart_service(
         carts=CartRepository(session),
         products=ProductRepository(session),
         session=session,
+        quotes=cart_quotes,
     )
 
 
@@ -117,6 +157,9 @@ async def get_order_service(
         products=ProductRepository(session),
         session=session,
         payment_provider=PaymentProvider(),
+        catalog_cache=catalog_cache,
+        suggestions=product_suggestions if settings.SUGGEST_INDEX_ENABLED else None,
+        quotes=cart_quotes,
     )
 
 
@@ -7,6 +7,7 @@ from typing import Callable
 from fastapi import Request, Response
 
 from .config import settings
+from ..db.query_stats import track_queries
 from ..utils.metrics import metrics_registry
 
 
@@ -34,3 +35,34 @@ async def metrics_middleware(request: Request, call_next: Callable[[Request], Re
     route = request.url.path
     metrics_registry.observe_request(route=route, status=response.status_code, elapsed=elapsed)
     return response
+
+
+def route_template(request: Request) -> str:
+    """Return the matched route path (e.g. ``/api/orders/{order_id}``) or the raw path."""
+    route = request.scope.get("route")
+    return getattr(route, "path", request.url.path)
+
+
+async def query_stats_middleware(
+    request: Request, call_next: Callable[[Request], Response]
+) -> Response:
+    if not settings.QUERY_STATS_ENABLED:
+        return await call_next(request)
+
+    with track_queries() as stats:
+        response = await call_next(request)
+    route = route_template(request)
+    timing = f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"'
+    existing = response.headers.get("Server-Timing")
+    response.headers["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+    if settings.METRICS_ENABLED:
+        metrics_registry.observe_db(route=route, queries=stats.count, elapsed=stats.duration)
+    if settings.QUERY_BUDGET_ENFORCED:
+        stats.check_budget(
+            max_queries=settings.QUERY_BUDGET_OVERRIDES.get(
+                route, settings.QUERY_BUDGET_MAX_QUERIES
+            ),
+            max_repeats=settings.QUERY_BUDGET_MAX_REPEATS,
+            label=f"{request.method} {route}",
+        )
+    return response
@@ -0,0 +1,123 @@
+"""Import a product feed from the command line.
+
+The feed is streamed to ``POST /api/admin/products/import`` of a running
+server, so the server that owns the caches and in-memory search structures
+writes the rows and refreshes them. ``--direct`` writes to the database
+instead; use it only while no server is running, since servers build those
+structures at startup and would otherwise keep serving the old catalog.
+
+Usage::
+
+    ADMIN_ACCESS_TOKEN=... poetry run python -m app.db.import_products feed.ndjson
+    poetry run python -m app.db.import_products feed.csv --api-url http://shop:8000 --token ...
+    poetry run python -m app.db.import_products feed.ndjson --direct --batch-size 1000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+from pathlib import Path
+from typing import AsyncIterator
+
+import httpx
+
+from ..core.config import settings
+from ..db.session import async_session_factory
+from ..repositories.products import ProductRepository
+from ..schemas.product import ProductImportReport
+from ..services.product_import import (
+    ImportReport,
+    ProductImporter,
+    iter_lines,
+    parse_csv,
+    parse_ndjson,
+)
+
+CHUNK_SIZE = 1024 * 1024
+IMPORT_PATH = "/api/admin/products/import"
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+async def read_chunks(path: Path) -> AsyncIterator[bytes]:
+    with path.open("rb") as handle:
+        while chunk := handle.read(CHUNK_SIZE):
+            yield chunk
+
+
+async def upload_file(
+    client: httpx.AsyncClient, path: Path, *, fmt: str, batch_size: int, token: str
+) -> ProductImportReport:
+    """Stream ``path`` to the import endpoint of the server behind ``client``."""
+    response = await client.post(
+        IMPORT_PATH,
+        params={"format": fmt, "batch_size": batch_size},
+        headers={"Authorization": f"Bearer {token}", "Content-Type": CONTENT_TYPES[fmt]},
+        content=read_chunks(path),
+    )
+    response.raise_for_status()
+    return ProductImportReport.model_validate(response.json())
+
+
+async def import_file(path: Path, *, fmt: str, batch_size: int) -> ImportReport:
+    """Write ``path`` straight to the database, bypassing any running server."""
+    parse = parse_csv if fmt == "csv" else parse_ndjson
+    async with async_session_factory() as session:
+        importer = ProductImporter(
+            session=session, products=ProductRepository(session), batch_size=batch_size
+        )
+        return await importer.run(parse(iter_lines(read_chunks(path))))
+
+
+async def upload(
+    path: Path, *, api_url: str, fmt: str, batch_size: int, token: str
+) -> ProductImportReport:
+    async with httpx.AsyncClient(base_url=api_url, timeout=None) as client:
+        return await upload_file(client, path, fmt=fmt, batch_size=batch_size, token=token)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Upsert products keyed on SKU from a feed file.")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=("ndjson", "csv"), default=None)
+    parser.add_argument("--batch-size", type=int, default=settings.PRODUCT_IMPORT_BATCH_SIZE)
+    parser.add_argument("--api-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token", default=os.environ.get("ADMIN_ACCESS_TOKEN"))
+    parser.add_argument(
+        "--direct", action="store_true", help="write to the database; no server may be running"
+    )
+    args = parser.parse_args()
+    fmt = args.format or ("csv" if args.path.suffix.lower() == ".csv" else "ndjson")
+
+    if args.direct:
+        report = asyncio.run(import_file(args.path, fmt=fmt, batch_size=args.batch_size))
+    elif not args.token:
+        parser.error("an admin access token is required: pass --token or set ADMIN_ACCESS_TOKEN")
+    else:
+        try:
+            report = asyncio.run(
+                upload(
+                    args.path,
+                    api_url=args.api_url,
+                    fmt=fmt,
+                    batch_size=args.batch_size,
+                    token=args.token,
+                )
+            )
+        except httpx.HTTPStatusError as exc:
+            parser.exit(1, f"import rejected: {exc.response.status_code} {exc.response.text}\n")
+        except httpx.HTTPError as exc:
+            parser.exit(1, f"import failed: {exc}\n")
+    for error in report.errors:
+        print(f"line {error.line}: {error.error}")
+    if report.errors_truncated:
+        print("... more errors omitted")
+    print(
+        f"{report.rows} rows: {report.created} created, {report.updated} updated, "
+        f"{report.failed} failed in {report.elapsed_seconds:.1f}s "
+        f"({report.rows_per_second:,.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
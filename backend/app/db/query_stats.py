@@ -0,0 +1,110 @@
+"""Per-request SQL statement accounting and query budgets."""
+from __future__ import annotations
+
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+_IN_LIST_RE = re.compile(r"\((?:\s*(?:\?|%s|:\w+)\s*,)+\s*(?:\?|%s|:\w+)\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_current: ContextVar["QueryStats | None"] = ContextVar("query_stats", default=None)
+
+
+class QueryBudgetExceededError(AssertionError):
+    """Raised when a tracked block issues too many or too repetitive statements."""
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize SQL so that statements differing only in bind values compare equal."""
+    shape = _WHITESPACE_RE.sub(" ", statement).strip()
+    return _IN_LIST_RE.sub("(?)", shape)
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    duration: float = 0.0
+    shapes: Counter[str] = field(default_factory=Counter)
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.duration += elapsed
+        self.shapes[statement_shape(statement)] += 1
+
+    def check_budget(
+        self, *, max_queries: int | None, max_repeats: int | None, label: str = ""
+    ) -> None:
+        """Raise :class:`QueryBudgetExceededError` when the statements exceed the budget."""
+        prefix = f"{label}: " if label else ""
+        if max_queries is not None and self.count > max_queries:
+            raise QueryBudgetExceededError(
+                f"{prefix}issued {self.count} SQL statements, budget is {max_queries}"
+            )
+        if max_repeats is not None and self.shapes:
+            shape, repeats = self.shapes.most_common(1)[0]
+            if repeats > max_repeats:
+                raise QueryBudgetExceededError(
+                    f"{prefix}statement repeated {repeats} times (limit {max_repeats}), "
+                    f"possible N+1: {shape}"
+                )
+
+
+def current_stats() -> QueryStats | None:
+    return _current.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Collect statistics for every statement executed inside the block."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def assert_query_budget(
+    max_queries: int | None = None, max_repeats: int | None = None
+) -> Iterator[QueryStats]:
+    """Fail when the block issues more than ``max_queries`` statements or repeats one shape."""
+    with track_queries() as stats:
+        yield stats
+    stats.check_budget(max_queries=max_queries, max_repeats=max_repeats)
+
+
+def _before_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+    stats = _current.get()
+    starts = conn.info.get("query_start")
+    if stats is None or not starts:
+        return
+    stats.record(statement, time.perf_counter() - starts.pop())
+
+
+def _handle_error(context: Any) -> None:
+    starts = context.connection.info.get("query_start") if context.connection else None
+    if _current.get() is not None and starts:
+        starts.pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Attach the statement listeners to ``engine``; safe to call more than once."""
+    target = engine.sync_engine
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+        event.listen(target, "after_cursor_execute", _after_cursor_execute)
+        event.listen(target, "handle_error", _handle_error)
@@ -1,17 +1,38 @@
 """FastAPI application entry point."""
 from __future__ import annotations
 
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
 from logging.config import dictConfig
+from typing import AsyncIterator
 
 from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.exc import SQLAlchemyError
 from starlette.responses import PlainTextResponse
 
 from .api.router import api_router
 from .core.config import settings
-from .core.middleware import metrics_middleware, security_headers_middleware
+from .core.middleware import (
+    metrics_middleware,
+    query_stats_middleware,
+    security_headers_middleware,
+)
+from .db.query_stats import instrument_engine
+from .db.session import async_session_factory, engine
+from .repositories.categories import CategoryRepository
+from .repositories.orders import OrderRepository
+from .repositories.products import ProductRepository
+from .services.catalog import CatalogService
 from .utils.body_limit import BodySizeLimitMiddleware
+from .utils.cache import cart_quotes, catalog_cache
+from .utils.columnar import ProductSnapshot, product_snapshot
 from .utils.metrics import metrics_registry
+from .utils.search import product_search_index
+from .utils.suggest import product_suggestions
+
+logger = logging.getLogger(__name__)
 
 
 def configure_logging() -> None:
@@ -41,11 +62,142 @@ def configure_logging() -> None:
 
 configure_logging()
 
-app = FastAPI(title=settings.APP_NAME, version="0.1.0")
 
-app.add_middleware(BodySizeLimitMiddleware, max_body_size=1_000_000)
+async def build_search_index() -> None:
+    async with async_session_factory() as session:
+        service = CatalogService(
+            products=ProductRepository(session),
+            categories=CategoryRepository(session),
+            search_index=product_search_index,
+        )
+        try:
+            await service.rebuild_search_index()
+        except SQLAlchemyError:
+            logger.exception("search_index_build_failed")
+            return
+    logger.info("search_index_built", extra={"documents": len(product_search_index)})
+
+
+async def build_catalog_snapshot() -> None:
+    if not ProductSnapshot.available():
+        logger.warning("catalog_snapshot_unavailable", extra={"reason": "numpy is not installed"})
+        return
+    async with async_session_factory() as session:
+        service = CatalogService(
+            products=ProductRepository(session),
+            categories=CategoryRepository(session),
+            snapshot=product_snapshot,
+        )
+        try:
+            await service.rebuild_snapshot()
+        except SQLAlchemyError:
+            logger.exception("catalog_snapshot_build_failed")
+            return
+    logger.info(
+        "catalog_snapshot_built",
+        extra={
+            "products": len(product_snapshot),
+            "bytes": product_snapshot.nbytes,
+            "bytes_per_product": round(product_snapshot.bytes_per_product(), 1),
+        },
+    )
+
+
+async def build_suggestion_index() -> None:
+    async with async_session_factory() as session:
+        service = CatalogService(
+            products=ProductRepository(session),
+            categories=CategoryRepository(session),
+            suggestions=product_suggestions,
+        )
+        try:
+            await service.rebuild_suggestions(await OrderRepository(session).units_sold())
+        except SQLAlchemyError:
+            logger.exception("suggestion_index_build_failed")
+            return
+    logger.info("suggestion_index_built", extra={"products": len(product_suggestions)})
+
+
+async def sync_sharded_stock_once() -> int:
+    """Fold drifted shard totals into ``products.stock``; returns the products refreshed.
+
+    Deployments without sharded products pay one primary-key probe and no
+    write transaction.
+    """
+    search_index = product_search_index if settings.SEARCH_INDEX_ENABLED else None
+    snapshot = product_snapshot if settings.CATALOG_SNAPSHOT_ENABLED else None
+    async with async_session_factory() as session:
+        products = ProductRepository(session)
+        if not await products.has_stock_shards():
+            return 0
+        service = CatalogService(
+            products=products,
+            categories=CategoryRepository(session),
+            search_index=search_index,
+            cache=catalog_cache,
+            quotes=cart_quotes,
+            snapshot=snapshot,
+        )
+        synced = await service.sync_sharded_stock()
+        if synced:
+            await session.commit()
+        return synced
+
+
+async def sync_sharded_stock() -> None:
+    """Periodically fold stock shards into the cached ``products.stock`` of hot products.
+
+    A failed cycle is logged and retried on the next tick, so one bad cycle
+    does not stop the reconciliation.
+    """
+    while True:
+        await asyncio.sleep(settings.STOCK_SHARD_SYNC_SECONDS)
+        try:
+            await sync_sharded_stock_once()
+        except Exception:
+            logger.exception("stock_shard_sync_failed")
+
+
+def _report_stopped(task: asyncio.Task[None]) -> None:
+    """Log a background task that ended while the app was still running."""
+    if task.cancelled():
+        return
+    logger.error(
+        "background_task_stopped", extra={"task": task.get_name()}, exc_info=task.exception()
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if settings.SEARCH_INDEX_ENABLED:
+        await build_search_index()
+    if settings.CATALOG_SNAPSHOT_ENABLED:
+        await build_catalog_snapshot()
+    if settings.SUGGEST_INDEX_ENABLED:
+        await build_suggestion_index()
+    sync = None
+    if settings.STOCK_SHARD_SYNC_SECONDS:
+        sync = asyncio.create_task(sync_sharded_stock(), name="stock_shard_sync")
+        sync.add_done_callback(_report_stopped)
+    yield
+    if sync is not None and not sync.done():
+        sync.remove_done_callback(_report_stopped)
+        sync.cancel()
+        with suppress(asyncio.CancelledError):
+            await sync
+
+
+app = FastAPI(title=settings.APP_NAME, version="0.1.0", lifespan=lifespan)
+
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_body_size=1_000_000,
+    path_limits={"/api/admin/products/import": settings.PRODUCT_IMPORT_MAX_BYTES},
+)
 app.middleware("http")(security_headers_middleware)
 app.middleware("http")(metrics_middleware)
+app.middleware("http")(query_stats_middleware)
+instrument_engine(engine)
 
 app.add_middleware(
     CORSMiddleware,
@@ -2,7 +2,7 @@
 from .user import User, UserRole
 from .address import Address
 from .category import Category
-from .product import Product, ProductImage
+from .product import Product, ProductImage, ProductStockShard
 from .cart import Cart, CartItem
 from .order import Order, OrderItem
 from .token import Token, TokenType
@@ -14,6 +14,7 @@ __all__ = [
     "Category",
     "Product",
     "ProductImage",
+    "ProductStockShard",
     "Cart",
     "CartItem",
     "Order",
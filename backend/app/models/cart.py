@@ -4,7 +4,15 @@ from __future__ import annotations
 import datetime as dt
 from enum import Enum
 
-from sqlalchemy import Column, DateTime, Enum as SQLEnum, ForeignKey, Integer
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Enum as SQLEnum,
+    ForeignKey,
+    Index,
+    Integer,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 
 from ..db.session import Base
@@ -17,10 +25,14 @@ class CartStatus(str, Enum):
 
 class Cart(Base):
     __tablename__ = "carts"
+    # The draft-cart lookup (user_id, status) is a single probe of this index.
+    __table_args__ = (Index("ix_carts_user_id_status", "user_id", "status"),)
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     status = Column(SQLEnum(CartStatus), default=CartStatus.draft, nullable=False, index=True)
+    # Bumped by every change to the cart's lines; keys memoized quotes.
+    version = Column(Integer, nullable=False, default=0, server_default="0")
     updated_at = Column(DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow, nullable=False)
 
     user = relationship("User", back_populates="carts")
@@ -29,6 +41,7 @@ class Cart(Base):
 
 class CartItem(Base):
     __tablename__ = "cart_items"
+    __table_args__ = (UniqueConstraint("cart_id", "product_id", name="uq_cart_items_cart_product"),)
 
     id = Column(Integer, primary_key=True)
     cart_id = Column(Integer, ForeignKey("carts.id", ondelete="CASCADE"), nullable=False, index=True)
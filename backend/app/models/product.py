@@ -3,7 +3,17 @@ from __future__ import annotations
 
 import datetime as dt
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, Numeric, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Double,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    String,
+)
 from sqlalchemy.orm import relationship
 
 from ..db.session import Base
@@ -11,6 +21,11 @@ from ..db.session import Base
 
 class Product(Base):
     __tablename__ = "products"
+    # Active listings sorted by a sales counter are read straight off these indexes.
+    __table_args__ = (
+        Index("ix_products_active_units_sold", "is_active", "units_sold", "id"),
+        Index("ix_products_active_trending_score", "is_active", "trending_score", "id"),
+    )
 
     id = Column(Integer, primary_key=True)
     sku = Column(String(64), unique=True, nullable=False, index=True)
@@ -22,7 +37,18 @@ class Product(Base):
     stock = Column(Integer, nullable=False, default=0)
     is_active = Column(Boolean, default=True, nullable=False, index=True)
     created_at = Column(DateTime, default=dt.datetime.utcnow, nullable=False)
+    # Bumped by every UPDATE of the row; the product detail ETag and Last-Modified
+    # are derived from it. See ProductRepository.record_sales for the exception.
+    updated_at = Column(
+        DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow, nullable=False
+    )
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=True, index=True)
+    # Maintained by OrderService when orders are paid; see ProductRepository.record_sales.
+    units_sold = Column(Integer, nullable=False, default=0, server_default="0")
+    trending_score = Column(Double, nullable=False, default=0, server_default="0")
+    # Number of ProductStockShard rows holding this product's stock (0: kept in ``stock``).
+    # While sharded, ``stock`` is a cached sum; see CatalogService.sync_sharded_stock.
+    stock_shards = Column(Integer, nullable=False, default=0, server_default="0", index=True)
 
     category = relationship("Category", back_populates="products")
     images = relationship("ProductImage", back_populates="product", cascade="all, delete-orphan")
@@ -38,3 +64,13 @@ class ProductImage(Base):
     alt = Column(String(255), nullable=True)
 
     product = relationship("Product", back_populates="images")
+
+
+class ProductStockShard(Base):
+    """One slice of a sharded product's stock; checkouts decrement a single slice."""
+
+    __tablename__ = "product_stock_shards"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    stock = Column(Integer, nullable=False, default=0)
@@ -1,11 +1,14 @@
 """Base repository utilities."""
 from __future__ import annotations
 
-from typing import Generic, Optional, Type, TypeVar
+from typing import Any, Generic, Hashable, Optional, Sequence, Type, TypeVar
 
-from sqlalchemy import select
+from sqlalchemy import ColumnElement, Select, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..core.config import settings
+from ..utils.cache import count_cache
+
 T = TypeVar("T")
 
 
@@ -29,3 +32,63 @@ class SQLAlchemyRepository(Generic[T]):
 
     async def delete(self, obj: T) -> None:
         await self.session.delete(obj)
+
+    async def _fetch_page(
+        self,
+        query: Select,
+        *,
+        order_by: Sequence[Any],
+        limit: int,
+        offset: int = 0,
+        seek: ColumnElement | None = None,
+        count_key: tuple[str, Hashable] | None = None,
+    ) -> tuple[list[T], int, bool]:
+        """Fetch one page of ``query`` and resolve its total.
+
+        The total comes from the count cache when possible. Otherwise the
+        ``window`` strategy reads it from ``count(*) OVER ()`` in the page query
+        itself, and the remaining cases fall back to :meth:`_count_total`.
+        Returns ``(items, total, total_estimated)``.
+        """
+        cached = count_cache.get(*count_key) if count_key else None
+        page_query = query.order_by(*order_by)
+        page_query = page_query.where(seek) if seek is not None else page_query.offset(offset)
+        page_query = page_query.limit(limit)
+
+        total: int | None = None
+        estimated = False
+        if cached is None and seek is None and settings.COUNT_STRATEGY == "window":
+            result = await self.session.execute(
+                page_query.add_columns(func.count().over().label("total_count"))
+            )
+            rows = result.unique().all()
+            items = [row[0] for row in rows]
+            if rows:
+                total = rows[0][1]
+            elif offset == 0:
+                total = 0
+        else:
+            result = await self.session.execute(page_query)
+            items = list(result.scalars().unique().all())
+
+        if cached is not None:
+            total, estimated = cached
+        elif total is None:
+            total, estimated = await self._count_total(query)
+        if count_key and cached is None:
+            count_cache.set(*count_key, total, estimated)
+        return items, total, estimated
+
+    async def _count_total(self, query: Select) -> tuple[int, bool]:
+        """Count the rows of ``query``, capping the scan for the ``estimate`` strategy."""
+        if settings.COUNT_STRATEGY == "estimate":
+            threshold = settings.COUNT_ESTIMATE_THRESHOLD
+            capped = query.order_by(None).limit(threshold + 1).subquery()
+            result = await self.session.execute(select(func.count()).select_from(capped))
+            total = result.scalar_one()
+            if total > threshold:
+                return threshold, True
+            return total, False
+        count_query = select(func.count()).select_from(query.order_by(None).subquery())
+        result = await self.session.execute(count_query)
+        return result.scalar_one(), False
@@ -1,37 +1,168 @@
 """Cart repository."""
 from __future__ import annotations
 
-from typing import Optional
+import datetime as dt
+from enum import Enum
+from typing import Collection, Optional
 
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import Row, case, delete, func, insert, literal, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import raiseload, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models.cart import Cart, CartItem, CartStatus
+from ..models.product import Product
 from .base import SQLAlchemyRepository
+from .products import available_stock
+
+
+class CartLoad(str, Enum):
+    """How much of a cart to load: the row alone, its items, or items with products."""
+
+    header = "header"
+    items = "items"
+    products = "products"
+
+
+CART_LOAD_OPTIONS = {
+    CartLoad.header: (raiseload(Cart.items),),
+    CartLoad.items: (selectinload(Cart.items).raiseload(CartItem.product),),
+    CartLoad.products: (
+        selectinload(Cart.items).selectinload(CartItem.product).selectinload(Product.images),
+    ),
+}
 
 
 class CartRepository(SQLAlchemyRepository[Cart]):
     def __init__(self, session: AsyncSession) -> None:
         super().__init__(session, Cart)
 
-    async def get_user_draft_cart(self, user_id: int) -> Optional[Cart]:
+    async def get_user_draft_cart(
+        self, user_id: int, *, load: CartLoad = CartLoad.products, refresh: bool = False
+    ) -> Optional[Cart]:
+        """The user's draft cart; relationships beyond ``load`` raise instead of lazy loading.
+
+        ``refresh`` overwrites a cart already loaded in the session, e.g. after
+        set-based writes to its lines.
+        """
         result = await self.session.execute(
             select(Cart)
-            .options(selectinload(Cart.items).selectinload(CartItem.product))
+            .options(*CART_LOAD_OPTIONS[load])
             .where(Cart.user_id == user_id, Cart.status == CartStatus.draft)
+            .execution_options(populate_existing=refresh)
         )
         return result.scalar_one_or_none()
 
-    async def add_item(self, cart: Cart, item: CartItem) -> CartItem:
-        cart.items.append(item)
-        await self.session.flush()
-        return item
+    async def upsert_item(self, cart_id: int, product_id: int, qty: int) -> Optional[int]:
+        """Add ``qty`` to the cart's line for a product in one statement, creating it if needed.
+
+        The inserted row is selected from the product and the conflict update is
+        conditional, so nothing is written unless the product is active and the
+        line's new quantity fits its stock. Returns the line id, or None if rejected.
+        """
+        columns = ["cart_id", "product_id", "qty"]
+        source = select(literal(cart_id), Product.id, literal(qty)).where(
+            Product.id == product_id, Product.is_active.is_(True), available_stock() >= qty
+        )
+        stock = select(available_stock()).where(Product.id == product_id).scalar_subquery()
+        fits = CartItem.qty + qty <= stock
+        dialect = self.session.bind.dialect.name
+        if dialect == "mysql":
+            # Ordered so ``fits`` still sees the old qty; LAST_INSERT_ID(id) makes an
+            # updated line's id the statement's lastrowid (0 when nothing was written).
+            stmt = (
+                mysql_insert(CartItem)
+                .from_select(columns, source)
+                .on_duplicate_key_update(
+                    [
+                        ("id", case((fits, func.last_insert_id(CartItem.id)), else_=CartItem.id)),
+                        ("qty", case((fits, CartItem.qty + qty), else_=CartItem.qty)),
+                    ]
+                )
+            )
+            result = await self.session.execute(stmt)
+            return result.lastrowid or None
+        insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        stmt = (
+            insert(CartItem)
+            .from_select(columns, source)
+            .on_conflict_do_update(
+                index_elements=[CartItem.cart_id, CartItem.product_id],
+                set_={"qty": CartItem.qty + qty},
+                where=fits,
+            )
+            .returning(CartItem.id)
+        )
+        return (await self.session.execute(stmt)).scalar_one_or_none()
 
     async def get_item(self, cart_id: int, item_id: int) -> Optional[CartItem]:
         result = await self.session.execute(
             select(CartItem)
-            .options(selectinload(CartItem.product))
+            .options(selectinload(CartItem.product).selectinload(Product.images))
             .where(CartItem.cart_id == cart_id, CartItem.id == item_id)
         )
         return result.scalar_one_or_none()
+
+    async def delete_item(self, cart_id: int, item_id: int) -> bool:
+        result = await self.session.execute(
+            delete(CartItem)
+            .where(CartItem.cart_id == cart_id, CartItem.id == item_id)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+
+    async def delete_items(self, cart_id: int, item_ids: Collection[int]) -> None:
+        if item_ids:
+            await self.session.execute(
+                delete(CartItem)
+                .where(CartItem.cart_id == cart_id, CartItem.id.in_(list(item_ids)))
+                .execution_options(synchronize_session=False)
+            )
+
+    async def set_item_quantities(self, cart_id: int, quantities: dict[int, int]) -> None:
+        """Set ``qty`` per line id with one ``UPDATE ... CASE id``."""
+        if quantities:
+            await self.session.execute(
+                update(CartItem)
+                .where(CartItem.cart_id == cart_id, CartItem.id.in_(list(quantities)))
+                .values(qty=case(quantities, value=CartItem.id))
+                .execution_options(synchronize_session=False)
+            )
+
+    async def insert_items(self, cart_id: int, quantities: dict[int, int]) -> None:
+        """Insert one line per product id in a single executemany statement."""
+        if quantities:
+            await self.session.execute(
+                insert(CartItem),
+                [
+                    {"cart_id": cart_id, "product_id": product_id, "qty": qty}
+                    for product_id, qty in quantities.items()
+                ],
+            )
+
+    async def bump_version(self, cart_id: int) -> None:
+        """Record that the cart's lines changed."""
+        await self.session.execute(
+            update(Cart)
+            .where(Cart.id == cart_id)
+            .values(version=Cart.version + 1, updated_at=dt.datetime.utcnow())
+        )
+
+    async def quote_lines(self, cart_id: int) -> list[Row]:
+        """Each line with the price, stock and status of its product, in one joined query."""
+        result = await self.session.execute(
+            select(
+                CartItem.id,
+                CartItem.product_id,
+                CartItem.qty,
+                Product.price_cents,
+                available_stock().label("stock"),
+                Product.is_active,
+            )
+            .join(Product, Product.id == CartItem.product_id)
+            .where(CartItem.cart_id == cart_id)
+            .order_by(CartItem.id)
+        )
+        return list(result.all())
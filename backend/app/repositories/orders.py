@@ -1,23 +1,34 @@
 """Order repository."""
 from __future__ import annotations
 
-from typing import Optional
+import datetime as dt
+from typing import AsyncIterator, Hashable, Optional
 
-from sqlalchemy import Select, func, select
+from sqlalchemy import Row, Select, func, insert, select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..models.order import Order, OrderStatus
+from ..models.order import Order, OrderItem, OrderStatus
+from ..utils.pagination import Page, decode_cursor, encode_cursor, seek_after
 from .base import SQLAlchemyRepository
 
 
+PAID_STATUSES = (OrderStatus.paid, OrderStatus.shipped, OrderStatus.completed)
+
+
 class OrderRepository(SQLAlchemyRepository[Order]):
     def __init__(self, session: AsyncSession) -> None:
         super().__init__(session, Order)
 
     async def list_by_user(
-        self, *, user_id: int, status: OrderStatus | None, page: int, page_size: int
-    ) -> tuple[list[Order], int]:
+        self,
+        *,
+        user_id: int,
+        status: OrderStatus | None,
+        page: int,
+        page_size: int,
+        cursor: str | None = None,
+    ) -> Page[Order]:
         query = (
             select(Order)
             .options(selectinload(Order.items))
@@ -25,21 +36,24 @@ class OrderRepository(SQLAlchemyRepository[Order]):
         )
         if status:
             query = query.where(Order.status == status)
-        total = await self._count(query)
-        query = query.order_by(Order.created_at.desc()).offset((page - 1) * page_size).limit(page_size)
-        result = await self.session.execute(query)
-        return list(result.scalars().unique().all()), total
+        return await self._paginate(
+            query, count_key=(user_id, status), page=page, page_size=page_size, cursor=cursor
+        )
 
     async def list_all(
-        self, *, status: OrderStatus | None, page: int, page_size: int
-    ) -> tuple[list[Order], int]:
+        self,
+        *,
+        status: OrderStatus | None,
+        page: int,
+        page_size: int,
+        cursor: str | None = None,
+    ) -> Page[Order]:
         query = select(Order).options(selectinload(Order.items))
         if status:
             query = query.where(Order.status == status)
-        total = await self._count(query)
-        query = query.order_by(Order.created_at.desc()).offset((page - 1) * page_size).limit(page_size)
-        result = await self.session.execute(query)
-        return list(result.scalars().unique().all()), total
+        return await self._paginate(
+            query, count_key=(None, status), page=page, page_size=page_size, cursor=cursor
+        )
 
     async def get_by_id(self, obj_id: int) -> Order | None:
         result = await self.session.execute(
@@ -49,7 +63,98 @@ class OrderRepository(SQLAlchemyRepository[Order]):
         )
         return result.scalar_one_or_none()
 
-    async def _count(self, query: Select) -> int:
-        count_query = select(func.count()).select_from(query.subquery())
-        result = await self.session.execute(count_query)
-        return result.scalar_one()
+    async def get_version(self, obj_id: int) -> Row | None:
+        """The order's mutable header columns, without loading its items."""
+        result = await self.session.execute(
+            select(Order.id, Order.user_id, Order.status, Order.paid_at, Order.total_cents).where(
+                Order.id == obj_id
+            )
+        )
+        return result.one_or_none()
+
+    async def stream_export(
+        self,
+        *,
+        status: OrderStatus | None = None,
+        created_from: dt.datetime | None = None,
+        created_to: dt.datetime | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[Row]:
+        """Stream one row per order item (orders without items once), ordered by order.
+
+        Uses a server-side cursor fetched ``batch_size`` rows at a time, so the
+        memory used does not depend on how many orders match.
+        """
+        query = (
+            select(
+                Order.id,
+                Order.user_id,
+                Order.status,
+                Order.total_cents,
+                Order.currency,
+                Order.payment_ref,
+                Order.created_at,
+                Order.paid_at,
+                OrderItem.id.label("item_id"),
+                OrderItem.product_id,
+                OrderItem.sku_snapshot,
+                OrderItem.name_snapshot,
+                OrderItem.price_cents,
+                OrderItem.qty,
+            )
+            .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+            .order_by(Order.id, OrderItem.id)
+            .execution_options(yield_per=batch_size)
+        )
+        if status:
+            query = query.where(Order.status == status)
+        if created_from is not None:
+            query = query.where(Order.created_at >= created_from)
+        if created_to is not None:
+            query = query.where(Order.created_at < created_to)
+        result = await self.session.stream(query)
+        async for row in result:
+            yield row
+
+    async def add_items(self, rows: list[dict]) -> None:
+        """Insert order items in one executemany statement."""
+        await self.session.execute(insert(OrderItem), rows)
+
+    async def get_by_payment_ref(self, payment_ref: str) -> Order | None:
+        result = await self.session.execute(
+            select(Order).options(selectinload(Order.items)).where(Order.payment_ref == payment_ref)
+        )
+        return result.scalar_one_or_none()
+
+    async def units_sold(self) -> dict[int, int]:
+        """Units sold per product across orders that have been paid."""
+        result = await self.session.execute(
+            select(OrderItem.product_id, func.sum(OrderItem.qty))
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(Order.status.in_(PAID_STATUSES))
+            .group_by(OrderItem.product_id)
+        )
+        return {product_id: int(qty) for product_id, qty in result.all()}
+
+    async def _paginate(
+        self, query: Select, *, count_key: Hashable, page: int, page_size: int, cursor: str | None
+    ) -> Page[Order]:
+        """Page newest-first by ``(created_at, id)``, seeking past ``cursor`` when given."""
+        seek = None
+        if cursor:
+            created_at, last_id = decode_cursor(cursor, "newest", (dt.datetime.fromisoformat, int))
+            seek = seek_after(Order.created_at, Order.id, created_at, last_id, descending=True)
+        orders, total, estimated = await self._fetch_page(
+            query,
+            order_by=(Order.created_at.desc(), Order.id.desc()),
+            limit=page_size + 1,
+            offset=(page - 1) * page_size,
+            seek=seek,
+            count_key=("orders", count_key),
+        )
+
+        next_cursor = None
+        if len(orders) > page_size:
+            orders = orders[:page_size]
+            next_cursor = encode_cursor("newest", [orders[-1].created_at, orders[-1].id])
+        return Page(items=orders, total=total, next_cursor=next_cursor, total_estimated=estimated)
@@ -1,18 +1,139 @@
 """Product repository."""
 from __future__ import annotations
 
-from typing import List, Optional
+import bisect
+import datetime as dt
+import hashlib
+import json
+import random
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Iterable, List, Optional, Sequence
 
-from sqlalchemy import Select, and_, func, or_, select
+from sqlalchemy import (
+    ColumnElement,
+    Row,
+    Select,
+    and_,
+    case,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    update,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
-from ..models.product import Product, ProductImage
+from ..models.product import Product, ProductImage, ProductStockShard
+from ..utils.columnar import ProductSnapshot
+from ..utils.errors import http_error
+from ..utils.pagination import Page, decode_cursor, encode_cursor, seek_after
+from ..utils.search import IndexedProduct, ProductSearchIndex
 from .base import SQLAlchemyRepository
 
+SORT_COLUMNS = {
+    "price_asc": (Product.price_cents, False),
+    "price_desc": (Product.price_cents, True),
+    "newest": (Product.created_at, True),
+    "best_selling": (Product.units_sold, True),
+    "trending": (Product.trending_score, True),
+}
+# Sorts on the denormalized sales counters; the search index and the columnar
+# snapshot do not carry them, so these listings always use the indexed SQL path.
+SALES_SORTS = frozenset({"best_selling", "trending"})
+CURSOR_PARSERS = {"newest": dt.datetime.fromisoformat, "trending": float}
+# Upper bound on ids per IN list / CASE in set-based statements.
+BULK_CHUNK_SIZE = 1000
+
+
+def available_stock() -> ColumnElement[int]:
+    """Stock that can be sold right now: the shard total for sharded products.
+
+    ``products.stock`` of a sharded product is a cached sum that may lag behind
+    recent checkouts; checks that gate a write use this expression instead.
+    Must be selected alongside ``Product``, which the subquery correlates to.
+    """
+    shard_total = (
+        select(func.coalesce(func.sum(ProductStockShard.stock), 0))
+        .where(ProductStockShard.product_id == Product.id)
+        .scalar_subquery()
+    )
+    return case((Product.stock_shards > 0, shard_total), else_=Product.stock)
+
+
+def search_fingerprint(q: str, **params: Any) -> str:
+    """Short digest of a search-index query, binding offset cursors to the query they page."""
+    key = json.dumps(
+        [q.strip().lower(), sorted((name, params[name]) for name in params)],
+        default=sorted,
+        separators=(",", ":"),
+    )
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+@dataclass
+class FacetCounts:
+    """Counts gathered by :meth:`ProductRepository.facet_counts`."""
+
+    categories: dict[int | None, int] = field(default_factory=dict)
+    price_buckets: list[int] = field(default_factory=list)
+    in_stock: int = 0
+    out_of_stock: int = 0
+
 
 class ProductRepository(SQLAlchemyRepository[Product]):
-    def __init__(self, session: AsyncSession) -> None:
+    def __init__(
+        self,
+        session: AsyncSession,
+        search_index: ProductSearchIndex | None = None,
+        snapshot: ProductSnapshot | None = None,
+    ) -> None:
         super().__init__(session, Product)
+        self.search_index = search_index
+        self.snapshot = snapshot
+
+    async def get_by_id(self, obj_id: int) -> Product | None:
+        result = await self.session.execute(
+            select(Product).options(joinedload(Product.images)).where(Product.id == obj_id)
+        )
+        return result.unique().scalar_one_or_none()
+
+    async def get_by_slug(self, slug: str) -> Product | None:
+        result = await self.session.execute(
+            select(Product).options(joinedload(Product.images)).where(Product.slug == slug)
+        )
+        return result.unique().scalar_one_or_none()
+
+    async def get_by_identifier(self, identifier: str) -> Product | None:
+        """Resolve a numeric id or a slug in one statement, images included.
+
+        A numeric identifier matches either column; the id match wins when a
+        different product's slug spells the same number, leading zeros included.
+        """
+        condition = Product.slug == identifier
+        if identifier.isdigit():
+            condition = or_(Product.id == int(identifier), condition)
+        result = await self.session.execute(
+            select(Product).options(joinedload(Product.images)).where(condition)
+        )
+        products = result.unique().scalars().all()
+        if len(products) > 1:
+            return next(product for product in products if product.id == int(identifier))
+        return products[0] if products else None
+
+    async def get_version(self, identifier: str) -> Row | None:
+        """``(id, updated_at)`` of the product ``get_by_identifier`` would load."""
+        condition = Product.slug == identifier
+        if identifier.isdigit():
+            condition = or_(Product.id == int(identifier), condition)
+        rows = (
+            await self.session.execute(select(Product.id, Product.updated_at).where(condition))
+        ).all()
+        if len(rows) > 1:
+            return next(row for row in rows if row.id == int(identifier))
+        return rows[0] if rows else None
 
     def _apply_filters(
         self,
@@ -20,6 +141,7 @@ class ProductRepository(SQLAlchemyRepository[Product]):
         *,
         q: str | None = None,
         category_id: int | None = None,
+        category_ids: frozenset[int] | None = None,
         min_price: int | None = None,
         max_price: int | None = None,
     ) -> Select:
@@ -29,6 +151,8 @@ class ProductRepository(SQLAlchemyRepository[Product]):
             conditions.append(func.lower(Product.name).like(like))
         if category_id:
             conditions.append(Product.category_id == category_id)
+        if category_ids is not None:
+            conditions.append(Product.category_id.in_(sorted(category_ids)))
         if min_price is not None:
             conditions.append(Product.price_cents >= min_price)
         if max_price is not None:
@@ -37,46 +161,571 @@ class ProductRepository(SQLAlchemyRepository[Product]):
             query = query.where(and_(*conditions))
         return query
 
+    def _index_answers(self, q: str | None, sort: str | None) -> bool:
+        """Whether the search index, rather than SQL ``LIKE``, resolves a ``q`` listing."""
+        return bool(
+            q
+            and sort not in SALES_SORTS
+            and self.search_index is not None
+            and self.search_index.ready
+        )
+
     async def search(
         self,
         *,
         q: str | None = None,
         category_id: int | None = None,
+        category_ids: frozenset[int] | None = None,
         min_price: int | None = None,
         max_price: int | None = None,
         sort: str | None = None,
         page: int,
         page_size: int,
-    ) -> tuple[list[Product], int]:
-        query = select(Product).where(Product.is_active.is_(True))
+        cursor: str | None = None,
+        fuzzy: bool = False,
+    ) -> Page[Product]:
+        """Page of active products. ``fuzzy`` only applies to the search-index path."""
+        if self._index_answers(q, sort):
+            fingerprint = search_fingerprint(
+                q,
+                category_id=category_id,
+                category_ids=category_ids,
+                min_price=min_price,
+                max_price=max_price,
+                sort=sort,
+                fuzzy=fuzzy,
+            )
+            offset = (page - 1) * page_size
+            if cursor:
+                offset, bound_to = decode_cursor(cursor, "search", (int, str))
+                if bound_to != fingerprint:
+                    raise http_error(status_code=400, detail="Invalid cursor")
+                offset = max(0, offset)
+            hits = self.search_index.search(
+                q,
+                category_id=category_id,
+                category_ids=category_ids,
+                min_price=min_price,
+                max_price=max_price,
+                sort=sort,
+                offset=offset,
+                limit=page_size,
+                fuzzy=fuzzy,
+            )
+            if hits is not None:
+                ids, total = hits
+                next_offset = offset + page_size
+                next_cursor = None
+                if next_offset < total:
+                    next_cursor = encode_cursor("search", [next_offset, fingerprint])
+                products = await self.get_many_ordered(ids)
+                return Page(items=products, total=total, next_cursor=next_cursor)
+
+        sort_key = sort if sort in SORT_COLUMNS else "newest"
+        column, descending = SORT_COLUMNS[sort_key]
+        seek_values = None
+        if cursor:
+            parse_value = CURSOR_PARSERS.get(sort_key, int)
+            seek_values = decode_cursor(cursor, sort_key, (parse_value, int))
+
+        if (
+            not q
+            and sort_key not in SALES_SORTS
+            and self.snapshot is not None
+            and self.snapshot.ready
+        ):
+            ids, total, has_more = self.snapshot.search(
+                category_id=category_id,
+                category_ids=category_ids,
+                min_price=min_price,
+                max_price=max_price,
+                sort=sort_key,
+                offset=(page - 1) * page_size,
+                limit=page_size,
+                after=tuple(seek_values) if seek_values else None,
+            )
+            products = await self.get_many_ordered(ids)
+            next_cursor = None
+            if has_more and products:
+                last = products[-1]
+                next_cursor = encode_cursor(sort_key, [getattr(last, column.key), last.id])
+            return Page(items=products, total=total, next_cursor=next_cursor)
+
+        query = (
+            select(Product)
+            .options(selectinload(Product.images))
+            .where(Product.is_active.is_(True))
+        )
         query = self._apply_filters(
-            query, q=q, category_id=category_id, min_price=min_price, max_price=max_price
+            query,
+            q=q,
+            category_id=category_id,
+            category_ids=category_ids,
+            min_price=min_price,
+            max_price=max_price,
         )
 
-        if sort == "price_asc":
-            query = query.order_by(Product.price_cents.asc())
-        elif sort == "price_desc":
-            query = query.order_by(Product.price_cents.desc())
+        if descending:
+            order_by = (column.desc(), Product.id.desc())
         else:
-            query = query.order_by(Product.created_at.desc())
+            order_by = (column.asc(), Product.id.asc())
+
+        seek = None
+        if seek_values:
+            value, last_id = seek_values
+            seek = seek_after(column, Product.id, value, last_id, descending=descending)
+
+        filters = (
+            q.strip().lower() if q else None, category_id, category_ids, min_price, max_price
+        )
+        products, total, estimated = await self._fetch_page(
+            query,
+            order_by=order_by,
+            limit=page_size + 1,
+            offset=(page - 1) * page_size,
+            seek=seek,
+            count_key=("products", filters),
+        )
+
+        next_cursor = None
+        if len(products) > page_size:
+            products = products[:page_size]
+            last = products[-1]
+            next_cursor = encode_cursor(sort_key, [getattr(last, column.key), last.id])
+        return Page(items=products, total=total, next_cursor=next_cursor, total_estimated=estimated)
+
+    async def facet_counts(
+        self,
+        facets: frozenset[str],
+        *,
+        price_bounds: Sequence[int],
+        q: str | None = None,
+        category_id: int | None = None,
+        category_ids: frozenset[int] | None = None,
+        min_price: int | None = None,
+        max_price: int | None = None,
+        sort: str | None = None,
+        fuzzy: bool = False,
+    ) -> FacetCounts:
+        """Count the filtered active products per requested facet in one grouped query.
+
+        Rows are grouped by every requested dimension at once (category, price
+        bucket, in stock) and folded into per-facet totals here, so the number
+        of facets does not change the number of passes over the products.
+        ``price_bounds`` are ascending bucket edges; bucket ``i`` holds prices
+        below ``price_bounds[i]`` and the last bucket everything above. When the
+        search index answers the listing's ``q`` (see :meth:`search`), the
+        index's matches are counted instead (see :meth:`_index_facet_counts`).
+        """
+        counts = FacetCounts(price_buckets=[0] * (len(price_bounds) + 1))
+        if self._index_answers(q, sort):
+            documents = self.search_index.match_documents(
+                q,
+                category_id=category_id,
+                category_ids=category_ids,
+                min_price=min_price,
+                max_price=max_price,
+                fuzzy=fuzzy,
+            )
+            if documents is not None:
+                await self._index_facet_counts(counts, facets, documents, price_bounds)
+                return counts
+
+        dimensions = []
+        if "category" in facets:
+            dimensions.append(Product.category_id.label("category_id"))
+        if "price" in facets:
+            whens = [(Product.price_cents < bound, i) for i, bound in enumerate(price_bounds)]
+            bucket = case(*whens, else_=len(price_bounds)) if whens else literal(0)
+            dimensions.append(bucket.label("price_bucket"))
+        if "stock" in facets:
+            dimensions.append(case((Product.stock > 0, 1), else_=0).label("in_stock"))
+        if not dimensions:
+            return counts
+        query = self._apply_filters(
+            select(*dimensions, func.count().label("n")).where(Product.is_active.is_(True)),
+            q=q,
+            category_id=category_id,
+            category_ids=category_ids,
+            min_price=min_price,
+            max_price=max_price,
+        )
+        result = await self.session.execute(query.group_by(*dimensions))
+        for row in result.mappings():
+            n = row["n"]
+            if "category" in facets:
+                category = row["category_id"]
+                counts.categories[category] = counts.categories.get(category, 0) + n
+            if "price" in facets:
+                counts.price_buckets[row["price_bucket"]] += n
+            if "stock" in facets:
+                if row["in_stock"]:
+                    counts.in_stock += n
+                else:
+                    counts.out_of_stock += n
+        return counts
+
+    async def _index_facet_counts(
+        self,
+        counts: FacetCounts,
+        facets: frozenset[str],
+        documents: list[IndexedProduct],
+        price_bounds: Sequence[int],
+    ) -> None:
+        """Count search-index matches in one pass over their documents.
+
+        The index holds each match's category and price. Stock changes on every
+        checkout without a reindex, so it is read from the database instead, as
+        the ids of the active products that are out of stock: one statement
+        whatever the number of matches.
+        """
+        if "category" in facets or "price" in facets:
+            for doc in documents:
+                if "category" in facets:
+                    counts.categories[doc.category_id] = (
+                        counts.categories.get(doc.category_id, 0) + 1
+                    )
+                if "price" in facets:
+                    counts.price_buckets[bisect.bisect_right(price_bounds, doc.price_cents)] += 1
+        if "stock" in facets:
+            result = await self.session.execute(
+                select(Product.id).where(Product.is_active.is_(True), Product.stock <= 0)
+            )
+            sold_out = set(result.scalars())
+            counts.out_of_stock = sum(1 for doc in documents if doc.id in sold_out)
+            counts.in_stock = len(documents) - counts.out_of_stock
+
+    async def get_order_snapshots(self, ids: Iterable[int]) -> dict[int, Row]:
+        """Columns an order copies from its products (plus stock and status), keyed by id.
+
+        ``stock`` is the sellable stock (see :func:`available_stock`).
+        """
+        result = await self.session.execute(
+            select(
+                Product.id,
+                Product.sku,
+                Product.name,
+                Product.slug,
+                Product.price_cents,
+                available_stock().label("stock"),
+                Product.stock_shards,
+                Product.is_active,
+            ).where(Product.id.in_(list(ids)))
+        )
+        return {row.id: row for row in result}
+
+    async def get_many_ordered(self, ids: list[int]) -> list[Product]:
+        """Load active products with images, preserving the order of ``ids``."""
+        if not ids:
+            return []
+        result = await self.session.execute(
+            select(Product)
+            .options(selectinload(Product.images))
+            .where(Product.id.in_(ids), Product.is_active.is_(True))
+        )
+        by_id = {product.id: product for product in result.scalars().unique().all()}
+        return [by_id[product_id] for product_id in ids if product_id in by_id]
+
+    async def iter_search_documents(self, batch_size: int = 1000) -> AsyncIterator[Row]:
+        """Stream the columns needed by the search and suggestion indexes for active products."""
+        result = await self.session.stream(
+            select(
+                Product.id,
+                Product.sku,
+                Product.name,
+                Product.slug,
+                Product.description,
+                Product.price_cents,
+                Product.category_id,
+                Product.is_active,
+            )
+            .where(Product.is_active.is_(True))
+            .execution_options(yield_per=batch_size)
+        )
+        async for row in result:
+            yield row
+
+    async def iter_snapshot_rows(self, batch_size: int = 1000) -> AsyncIterator[Row]:
+        """Stream the columns held by the columnar snapshot for active products."""
+        result = await self.session.stream(
+            select(
+                Product.id,
+                Product.price_cents,
+                Product.category_id,
+                Product.created_at,
+                Product.stock,
+            )
+            .where(Product.is_active.is_(True))
+            .execution_options(yield_per=batch_size)
+        )
+        async for row in result:
+            yield row
+
+    async def find_by_skus(self, skus: Iterable[str]) -> dict[str, Row]:
+        """Map each existing SKU among ``skus`` to its id, slug, creation time and flags."""
+        skus = list(skus)
+        if not skus:
+            return {}
+        result = await self.session.execute(
+            select(
+                Product.id,
+                Product.sku,
+                Product.slug,
+                Product.created_at,
+                Product.is_active,
+                Product.stock_shards,
+            ).where(Product.sku.in_(skus))
+        )
+        return {row.sku: row for row in result}
+
+    async def bulk_insert(self, rows: Sequence[dict[str, Any]]) -> None:
+        """Insert product rows with a single multi-row/executemany ``INSERT``."""
+        if rows:
+            await self.session.execute(insert(Product), list(rows))
+
+    async def bulk_update(self, rows: Sequence[dict[str, Any]]) -> None:
+        """Update products by primary key (each row carries ``id``) as one executemany."""
+        if rows:
+            await self.session.execute(update(Product), list(rows))
+
+    async def bulk_replace_images(self, images: dict[int, list[dict[str, Any]]]) -> None:
+        """Replace the images of every product in ``images`` with the given rows."""
+        if not images:
+            return
+        await self.session.execute(
+            delete(ProductImage).where(ProductImage.product_id.in_(list(images)))
+        )
+        rows = [
+            {**image, "product_id": product_id}
+            for product_id, batch in images.items()
+            for image in batch
+        ]
+        if rows:
+            await self.session.execute(insert(ProductImage), rows)
+
+    async def resolve_refs(self, ids: Iterable[int], skus: Iterable[str]) -> list[Row]:
+        """``(id, sku, slug, stock_shards)`` of the products matching any of ``ids`` or ``skus``."""
+        ids, skus = list(ids), list(skus)
+        rows: list[Row] = []
+        for column, values in ((Product.id, ids), (Product.sku, skus)):
+            for start in range(0, len(values), BULK_CHUNK_SIZE):
+                result = await self.session.execute(
+                    select(Product.id, Product.sku, Product.slug, Product.stock_shards).where(
+                        column.in_(values[start : start + BULK_CHUNK_SIZE])
+                    )
+                )
+                rows.extend(result.all())
+        return rows
+
+    async def bulk_set(self, column: str, values: dict[int, Any]) -> int:
+        """Set ``column`` per product id with ``UPDATE ... CASE id`` statements.
+
+        One statement covers up to ``BULK_CHUNK_SIZE`` products; returns the
+        number of rows matched.
+        """
+        ids = list(values)
+        matched = 0
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            chunk = {pid: values[pid] for pid in ids[start : start + BULK_CHUNK_SIZE]}
+            result = await self.session.execute(
+                update(Product)
+                .where(Product.id.in_(list(chunk)))
+                .values({column: case(chunk, value=Product.id)})
+                .execution_options(synchronize_session=False)
+            )
+            matched += result.rowcount
+        return matched
 
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await self.session.execute(count_query)
-        total = total_result.scalar_one()
+    async def reserve_stock(self, quantities: dict[int, int]) -> int:
+        """Take ``qty`` off each active product's stock where at least that much remains.
 
-        query = query.offset((page - 1) * page_size).limit(page_size)
-        result = await self.session.execute(query)
-        return list(result.scalars().unique().all()), total
+        One conditional ``UPDATE ... CASE id`` per ``BULK_CHUNK_SIZE`` products; the
+        check and the decrement happen on the locked row, so concurrent callers cannot
+        oversell. Returns the number of products reserved: anything short of
+        ``len(quantities)`` means some line failed and the transaction must roll back.
+        """
+        ids = list(quantities)
+        reserved = 0
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            chunk = {pid: quantities[pid] for pid in ids[start : start + BULK_CHUNK_SIZE]}
+            qty = case(chunk, value=Product.id)
+            result = await self.session.execute(
+                update(Product)
+                .where(
+                    Product.id.in_(list(chunk)), Product.is_active.is_(True), Product.stock >= qty
+                )
+                .values(stock=Product.stock - qty)
+                .execution_options(synchronize_session=False)
+            )
+            reserved += result.rowcount
+        return reserved
+
+    async def reserve_sharded_stock(
+        self, quantities: dict[int, int], shards: dict[int, int]
+    ) -> bool:
+        """Take ``qty`` off the stock shards of each product, ``shards[product_id]`` of them.
+
+        A random shard is tried first with a conditional ``UPDATE``, so concurrent
+        checkouts of the same product usually lock different rows. When that shard
+        cannot cover the line, all of the product's shards are locked and drained
+        fullest first. Returns False if some product has too little stock left.
+        """
+        shard = ProductStockShard
+        for product_id, qty in quantities.items():
+            result = await self.session.execute(
+                update(shard)
+                .where(
+                    shard.product_id == product_id,
+                    shard.shard == random.randrange(shards[product_id]),
+                    shard.stock >= qty,
+                )
+                .values(stock=shard.stock - qty)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                continue
+            rows = (
+                await self.session.execute(
+                    select(shard.shard, shard.stock)
+                    .where(shard.product_id == product_id, shard.stock > 0)
+                    .order_by(shard.stock.desc())
+                    .with_for_update()
+                )
+            ).all()
+            if sum(row.stock for row in rows) < qty:
+                return False
+            take: dict[int, int] = {}
+            remaining = qty
+            for row in rows:
+                take[row.shard] = min(row.stock, remaining)
+                remaining -= take[row.shard]
+                if not remaining:
+                    break
+            await self.session.execute(
+                update(shard)
+                .where(shard.product_id == product_id, shard.shard.in_(list(take)))
+                .values(stock=shard.stock - case(take, value=shard.shard))
+                .execution_options(synchronize_session=False)
+            )
+        return True
+
+    async def create_stock_shards(self, product_id: int, stock: int, shards: int) -> None:
+        """Split ``stock`` as evenly as possible across ``shards`` new rows."""
+        base, extra = divmod(stock, shards)
+        await self.session.execute(
+            insert(ProductStockShard),
+            [
+                {"product_id": product_id, "shard": idx, "stock": base + (idx < extra)}
+                for idx in range(shards)
+            ],
+        )
+
+    async def drop_stock_shards(self, product_id: int) -> int:
+        """Delete a product's stock shards and return the stock they held."""
+        total = sum(
+            await self.session.scalars(
+                select(ProductStockShard.stock)
+                .where(ProductStockShard.product_id == product_id)
+                .with_for_update()
+            )
+        )
+        await self.session.execute(
+            delete(ProductStockShard).where(ProductStockShard.product_id == product_id)
+        )
+        return total
+
+    async def spread_stock(self, ids: Iterable[int]) -> None:
+        """Re-split ``products.stock`` across the shards of the sharded products among ``ids``.
+
+        Run after an admin sets the stock of products, so the shards hold the new
+        total; products without shards are not affected.
+        """
+        ids = list(ids)
+        shard = ProductStockShard
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            await self.session.execute(
+                update(shard)
+                .where(
+                    shard.product_id == Product.id,
+                    shard.product_id.in_(ids[start : start + BULK_CHUNK_SIZE]),
+                )
+                .values(
+                    stock=Product.stock // Product.stock_shards
+                    + case((shard.shard < Product.stock % Product.stock_shards, 1), else_=0)
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+    async def has_stock_shards(self) -> bool:
+        """Whether any product keeps its stock in shards, read off the shard primary key."""
+        row = await self.session.scalar(select(ProductStockShard.product_id).limit(1))
+        return row is not None
+
+    async def sharded_stock_drift(self) -> list[Row]:
+        """``(id, slug, total)`` of sharded products whose cached ``stock`` is out of date."""
+        total = func.sum(ProductStockShard.stock)
+        result = await self.session.execute(
+            select(Product.id, Product.slug, total.label("total"))
+            .join(ProductStockShard, ProductStockShard.product_id == Product.id)
+            .where(Product.stock_shards > 0)
+            .group_by(Product.id, Product.slug, Product.stock)
+            .having(total != Product.stock)
+        )
+        return list(result.all())
+
+    async def record_sales(self, sales: dict[int, int], *, trending_weight: float) -> None:
+        """Add ``qty`` per product id to ``units_sold`` and, scaled, to ``trending_score``.
+
+        Both counters move in one ``UPDATE ... CASE id`` per ``BULK_CHUNK_SIZE``
+        products; negative quantities take sales back. Products already loaded
+        in the session pick up the new counters. The counters are not part of
+        the product detail, so ``updated_at`` is left as it was.
+        """
+        ids = list(sales)
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            chunk = {pid: sales[pid] for pid in ids[start : start + BULK_CHUNK_SIZE]}
+            qty = case(chunk, value=Product.id)
+            await self.session.execute(
+                update(Product)
+                .where(Product.id.in_(list(chunk)))
+                .values(
+                    units_sold=Product.units_sold + qty,
+                    trending_score=Product.trending_score + qty * trending_weight,
+                    updated_at=Product.updated_at,
+                )
+                .execution_options(synchronize_session="fetch")
+            )
+
+    async def get_documents(self, ids: Iterable[int]) -> list[Row]:
+        """Columns needed to refresh the in-memory search structures for ``ids``."""
+        ids = list(ids)
+        rows: list[Row] = []
+        for start in range(0, len(ids), BULK_CHUNK_SIZE):
+            result = await self.session.execute(
+                select(
+                    Product.id,
+                    Product.sku,
+                    Product.name,
+                    Product.slug,
+                    Product.description,
+                    Product.price_cents,
+                    Product.category_id,
+                    Product.created_at,
+                    Product.stock,
+                    Product.is_active,
+                ).where(Product.id.in_(ids[start : start + BULK_CHUNK_SIZE]))
+            )
+            rows.extend(result.all())
+        return rows
 
     async def create_with_images(self, product: Product, images: list[ProductImage]) -> Product:
+        product.images.extend(images)
         await self.add(product)
-        for image in images:
-            image.product_id = product.id
-            self.session.add(image)
-        await self.session.flush()
         return product
 
     async def replace_images(self, product: Product, images: list[ProductImage]) -> None:
+        # The image rows are part of the product detail, so the product counts as updated.
+        product.updated_at = dt.datetime.utcnow()
         await self.session.execute(
             ProductImage.__table__.delete().where(ProductImage.product_id == product.id)
         )
@@ -84,3 +733,4 @@ class ProductRepository(SQLAlchemyRepository[Product]):
             image.product_id = product.id
             self.session.add(image)
         await self.session.flush()
+        await self.session.refresh(product, ["images"])
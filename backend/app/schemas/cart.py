@@ -1,9 +1,9 @@
 """Cart schemas."""
 from __future__ import annotations
 
-from typing import List
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 from ..models.cart import CartStatus
 from .common import ORMBase
@@ -19,12 +19,51 @@ class CartItemUpdate(BaseModel):
     qty: int = Field(ge=1, le=99)
 
 
+class CartBatchOp(BaseModel):
+    op: Literal["add", "update", "delete"]
+    product_id: Optional[int] = None
+    item_id: Optional[int] = None
+    qty: Optional[int] = Field(default=None, ge=1, le=99)
+
+    @model_validator(mode="after")
+    def check_target(self) -> "CartBatchOp":
+        if self.op == "add" and self.product_id is None:
+            raise ValueError("add requires product_id")
+        if self.op != "add" and self.item_id is None:
+            raise ValueError(f"{self.op} requires item_id")
+        if self.op != "delete" and self.qty is None:
+            raise ValueError(f"{self.op} requires qty")
+        return self
+
+
+class CartBatch(BaseModel):
+    ops: List[CartBatchOp] = Field(min_length=1, max_length=100)
+
+
 class CartItemOut(ORMBase):
     id: int
     qty: int
     product: ProductOut
 
 
+class CartQuoteLine(BaseModel):
+    item_id: int
+    product_id: int
+    qty: int
+    unit_price_cents: int
+    line_total_cents: int
+    stock: int
+    available: bool
+
+
+class CartQuote(BaseModel):
+    cart_id: int
+    version: int
+    items: List[CartQuoteLine]
+    total_cents: int
+    available: bool
+
+
 class CartOut(ORMBase):
     id: int
     status: CartStatus
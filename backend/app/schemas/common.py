@@ -21,3 +21,5 @@ class Paginated(GenericModel, Generic[T]):
     page: int
     page_size: int
     pages: int
+    next_cursor: Optional[str] = None
+    total_estimated: bool = False
@@ -4,9 +4,9 @@ from __future__ import annotations
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel, Field, HttpUrl, field_validator
+from pydantic import BaseModel, Field, HttpUrl, field_validator, model_validator
 
-from .common import ORMBase
+from .common import ORMBase, Paginated
 from ..core.config import settings
 
 
@@ -44,6 +44,8 @@ class ProductUpdate(BaseModel):
     price_cents: Optional[int] = Field(default=None, ge=0)
     currency: Optional[str] = Field(default=None, min_length=3, max_length=3)
     stock: Optional[int] = Field(default=None, ge=0)
+    # Split stock across this many counter rows for hot products; 0 turns it off.
+    stock_shards: Optional[int] = Field(default=None, ge=0, le=settings.STOCK_SHARDS_MAX)
     is_active: Optional[bool] = None
     category_id: Optional[int] = None
     images: Optional[List[ProductImageIn]] = None
@@ -81,3 +83,79 @@ class ProductOut(ORMBase):
     created_at: datetime
     category_id: Optional[int]
     images: List[ProductImageOut]
+
+
+class ProductSuggestion(ORMBase):
+    id: int
+    name: str
+    slug: str
+    sku: str
+    price_cents: int
+
+
+class CategoryFacet(BaseModel):
+    category_id: Optional[int]
+    count: int
+
+
+class PriceBucketFacet(BaseModel):
+    min_cents: Optional[int]
+    max_cents: Optional[int]
+    count: int
+
+
+class StockFacet(BaseModel):
+    in_stock: int
+    out_of_stock: int
+
+
+class ProductFacets(BaseModel):
+    categories: Optional[List[CategoryFacet]] = None
+    price: Optional[List[PriceBucketFacet]] = None
+    stock: Optional[StockFacet] = None
+
+
+class ProductPage(Paginated[ProductOut]):
+    facets: Optional[ProductFacets] = None
+
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+
+class ProductImportReport(BaseModel):
+    rows: int
+    created: int
+    updated: int
+    failed: int
+    errors: List[ImportRowError]
+    errors_truncated: bool
+    elapsed_seconds: float
+    rows_per_second: float
+
+
+class ProductBulkUpdateItem(BaseModel):
+    id: Optional[int] = None
+    sku: Optional[str] = Field(default=None, min_length=1, max_length=64)
+    price_cents: Optional[int] = Field(default=None, ge=0)
+    stock: Optional[int] = Field(default=None, ge=0)
+    is_active: Optional[bool] = None
+
+    @model_validator(mode="after")
+    def check_reference_and_changes(self) -> "ProductBulkUpdateItem":
+        if (self.id is None) == (self.sku is None):
+            raise ValueError("Provide exactly one of id or sku")
+        if self.price_cents is None and self.stock is None and self.is_active is None:
+            raise ValueError("Nothing to update")
+        return self
+
+
+class ProductBulkUpdate(BaseModel):
+    items: List[ProductBulkUpdateItem] = Field(min_length=1, max_length=10_000)
+
+
+class ProductBulkUpdateResult(BaseModel):
+    requested: int
+    updated: int
+    not_found: List[str]
@@ -1,13 +1,18 @@
 """Cart service."""
 from __future__ import annotations
 
+from typing import Any, Sequence
+
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models.cart import Cart, CartItem, CartStatus
 from ..models.product import Product
-from ..repositories.carts import CartRepository
+from ..repositories.carts import CartLoad, CartRepository
 from ..repositories.products import ProductRepository
+from ..schemas.cart import CartBatchOp, CartQuote, CartQuoteLine
+from ..utils.cache import DependencyCache
 from ..utils.errors import http_error, not_found
+from ..utils.http import Representation
 
 
 class CartService:
@@ -17,52 +22,148 @@ class CartService:
         carts: CartRepository,
         products: ProductRepository,
         session: AsyncSession,
+        quotes: DependencyCache[Any] | None = None,
     ) -> None:
         self.carts = carts
         self.products = products
         self.session = session
+        self.quotes = quotes
 
-    async def get_or_create_cart(self, user_id: int) -> Cart:
-        cart = await self.carts.get_user_draft_cart(user_id)
+    async def get_or_create_cart(
+        self, user_id: int, *, load: CartLoad = CartLoad.products
+    ) -> Cart:
+        """The user's draft cart, loaded only as deep as ``load``."""
+        cart = await self.carts.get_user_draft_cart(user_id, load=load)
         if cart:
             return cart
-        cart = Cart(user_id=user_id, status=CartStatus.draft)
+        cart = Cart(user_id=user_id, status=CartStatus.draft, items=[])
         await self.carts.add(cart)
         return cart
 
-    async def add_item(self, cart: Cart, *, product_id: int, qty: int) -> CartItem:
-        product = await self.products.get_by_id(product_id)
-        if not product or not product.is_active:
-            raise not_found("Product not found")
-        if product.stock < qty:
+    async def add_item(self, cart_id: int, *, product_id: int, qty: int) -> CartItem:
+        """Add ``qty`` of a product, merging into its existing line, without loading the cart."""
+        item_id = await self.carts.upsert_item(cart_id, product_id, qty)
+        if item_id is None:
+            product = await self.products.get_by_id(product_id)
+            if not product or not product.is_active:
+                raise not_found("Product not found")
             raise http_error(status_code=400, detail="Insufficient stock")
-        existing = next((item for item in cart.items if item.product_id == product_id), None)
-        if existing:
-            existing.qty += qty
-            if existing.qty > product.stock:
-                raise http_error(status_code=400, detail="Insufficient stock")
-            await self.session.flush()
-            return existing
-        item = CartItem(product_id=product_id, qty=qty)
-        item.product = product
-        await self.carts.add_item(cart, item)
-        return item
+        await self.carts.bump_version(cart_id)
+        return await self.carts.get_item(cart_id, item_id)
 
-    async def update_item(self, cart: Cart, item_id: int, qty: int) -> CartItem:
-        item = await self.carts.get_item(cart.id, item_id)
+    async def update_item(self, cart_id: int, item_id: int, qty: int) -> CartItem:
+        item = await self.carts.get_item(cart_id, item_id)
         if not item:
             raise not_found("Cart item not found")
-        product = await self.products.get_by_id(item.product_id)
-        if not product or product.stock < qty:
+        stock = item.product.stock
+        if item.product.stock_shards:
+            # A sharded product's ``stock`` is a cached sum; check the shards themselves.
+            snapshots = await self.products.get_order_snapshots([item.product_id])
+            stock = snapshots[item.product_id].stock
+        if stock < qty:
             raise http_error(status_code=400, detail="Insufficient stock")
         item.qty = qty
-        item.product = product
         await self.session.flush()
+        await self.carts.bump_version(cart_id)
         return item
 
-    async def delete_item(self, cart: Cart, item_id: int) -> None:
-        item = await self.carts.get_item(cart.id, item_id)
-        if not item:
+    async def delete_item(self, cart_id: int, item_id: int) -> None:
+        if not await self.carts.delete_item(cart_id, item_id):
             raise not_found("Cart item not found")
-        await self.session.delete(item)
-        await self.session.flush()
+        await self.carts.bump_version(cart_id)
+
+    async def apply_batch(self, cart: Cart, ops: Sequence[CartBatchOp]) -> Cart:
+        """Apply add/update/delete ``ops`` in order, then write the net change set-based.
+
+        ``cart`` needs its items loaded. Every referenced product is read in one
+        ``IN`` query and stock is checked against the final quantity of every line
+        the batch touched, so a failing op rejects the whole batch before anything
+        is written. The writes are at most one ``UPDATE``, one ``DELETE`` and one
+        bulk ``INSERT``; the cart is returned reloaded with its products.
+        """
+        original = {item.id: item.qty for item in cart.items}
+        product_of = {item.id: item.product_id for item in cart.items}
+        line_of = {item.product_id: item.id for item in cart.items}
+        qty = {item.product_id: item.qty for item in cart.items}
+        products = await self.products.get_order_snapshots(
+            qty.keys() | {op.product_id for op in ops if op.op == "add"}
+        )
+        touched: set[int] = set()
+        for op in ops:
+            if op.op == "add":
+                product = products.get(op.product_id)
+                if not product or not product.is_active:
+                    raise not_found("Product not found")
+                product_id = product.id
+                qty[product_id] = qty.get(product_id, 0) + op.qty
+            else:
+                product_id = product_of.pop(op.item_id, None)
+                if product_id is None:
+                    raise not_found("Cart item not found")
+                if op.op == "delete":
+                    del qty[product_id], line_of[product_id]
+                    touched.discard(product_id)
+                    continue
+                product_of[op.item_id] = product_id
+                qty[product_id] = op.qty
+            touched.add(product_id)
+        if any(qty[product_id] > products[product_id].stock for product_id in touched):
+            raise http_error(status_code=400, detail="Insufficient stock")
+
+        deleted = original.keys() - product_of.keys()
+        updated = {
+            line_of[pid]: qty[pid]
+            for pid in touched
+            if pid in line_of and qty[pid] != original[line_of[pid]]
+        }
+        inserted = {pid: qty[pid] for pid in touched if pid not in line_of}
+        if deleted or updated or inserted:
+            # Deletes go first: a product deleted and re-added in the same batch gets a
+            # new line, which must not meet the old one under uq_cart_items_cart_product.
+            await self.carts.delete_items(cart.id, deleted)
+            await self.carts.set_item_quantities(cart.id, updated)
+            await self.carts.insert_items(cart.id, inserted)
+            await self.carts.bump_version(cart.id)
+        return await self.carts.get_user_draft_cart(
+            cart.user_id, load=CartLoad.products, refresh=True
+        )
+
+    async def quote(self, cart: Cart) -> Representation[CartQuote]:
+        """Line totals and availability, memoized per cart version.
+
+        Cart writes bump the version; product writes touch the product in
+        ``quotes`` (see ``evict_product``), so a cached quote is only served while
+        neither the lines nor any of the cart's products has changed in this process.
+        """
+        key = (cart.id, cart.version)
+        started = 0
+        if self.quotes is not None:
+            started = self.quotes.start()
+            cached = self.quotes.get(key)
+            if cached is not None:
+                return cached
+        lines = [
+            CartQuoteLine(
+                item_id=row.id,
+                product_id=row.product_id,
+                qty=row.qty,
+                unit_price_cents=row.price_cents,
+                line_total_cents=row.price_cents * row.qty,
+                stock=row.stock,
+                available=row.is_active and row.stock >= row.qty,
+            )
+            for row in await self.carts.quote_lines(cart.id)
+        ]
+        quote = Representation.of(
+            CartQuote(
+                cart_id=cart.id,
+                version=cart.version,
+                items=lines,
+                total_cents=sum(line.line_total_cents for line in lines),
+                available=all(line.available for line in lines),
+            )
+        )
+        if self.quotes is not None:
+            dependencies = [line.product_id for line in lines]
+            self.quotes.set(key, quote, dependencies=dependencies, started=started)
+        return quote
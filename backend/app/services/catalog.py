@@ -1,53 +1,277 @@
 """Catalog services."""
 from __future__ import annotations
 
-from typing import List, Optional
+import datetime as dt
+from typing import Any, Callable, Hashable, List, Optional
 
-from ..models.category import Category
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
 from ..models.product import Product, ProductImage
 from ..repositories.categories import CategoryRepository
-from ..repositories.products import ProductRepository
-from ..schemas.product import ProductCreate, ProductUpdate
+from ..repositories.products import SALES_SORTS, ProductRepository
+from ..schemas.product import (
+    CategoryFacet,
+    PriceBucketFacet,
+    ProductBulkUpdateItem,
+    ProductBulkUpdateResult,
+    ProductCreate,
+    ProductFacets,
+    ProductOut,
+    ProductUpdate,
+    StockFacet,
+)
+from ..utils.cache import DependencyCache, SingleFlight, TTLCache, count_cache
+from ..utils.columnar import ProductSnapshot
 from ..utils.errors import not_found
+from ..utils.http import Representation, weak_etag
+from ..utils.search import ProductSearchIndex
+from ..utils.serialization import FragmentEncoder, page_body
+from ..utils.suggest import Suggestion, SuggestionIndex
+from .categories import CategoryNode, CategoryTree, CategoryTreeStore, build_category_tree
+
+_AFTER_COMMIT_KEY = "catalog_after_commit"
+
+
+def after_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """Run ``callback`` once ``session``'s transaction commits; drop it on rollback.
+
+    Caches and the in-memory indexes must only ever reflect committed rows:
+    updated before the commit, a failed commit would leave them holding data
+    that never existed, and a concurrent read could re-cache the old row right
+    after an eviction.
+    """
+    session.sync_session.info.setdefault(_AFTER_COMMIT_KEY, []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session: Session) -> None:
+    if not session.in_nested_transaction():
+        for callback in session.info.pop(_AFTER_COMMIT_KEY, ()):
+            callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    if not session.in_nested_transaction():
+        session.info.pop(_AFTER_COMMIT_KEY, None)
+
+
+def evict_product(
+    cache: TTLCache[Any] | None, product: Product, quotes: DependencyCache[Any] | None = None
+) -> None:
+    """Drop cached reads that may include ``product``, cart quotes of carts holding it included."""
+    if quotes is not None:
+        quotes.touch(product.id)
+    if cache is None:
+        return
+    cache.pop(("product", str(product.id)))
+    cache.pop(("product", product.slug))
+    cache.invalidate_namespace("search")
+
+
+def product_version(product: Product) -> Hashable:
+    """Every value rendered by ``ProductOut``; a changed row yields a different version."""
+    return (
+        product.sku,
+        product.name,
+        product.slug,
+        product.description,
+        product.price_cents,
+        product.currency,
+        product.stock,
+        product.is_active,
+        product.created_at,
+        product.category_id,
+        tuple((image.id, image.url, image.alt) for image in product.images),
+    )
+
+
+def product_etag(product_id: int, updated_at: dt.datetime) -> str:
+    """Product detail ETag, computable from ``ProductRepository.get_version`` alone."""
+    return weak_etag("product", product_id, updated_at.isoformat())
 
 
 class CatalogService:
-    def __init__(self, *, products: ProductRepository, categories: CategoryRepository) -> None:
+    """Catalog reads and admin writes.
+
+    Reads are served through ``cache`` as serialized bodies with their ETag
+    (alongside the response schema for product detail and the product ids
+    for listing pages), so cached entries never hold on to session-bound ORM
+    objects. Listing pages are assembled from per-product JSON fragments
+    kept in ``fragments`` and keyed by :func:`product_version`. Writes evict the affected
+    entries and patch the in-memory indexes as soon as they commit (see
+    :func:`after_commit`), which keeps edits visible immediately on this
+    instance; other instances converge within the cache TTL. The category
+    tree is memoized separately in ``category_tree``.
+    """
+
+    def __init__(
+        self,
+        *,
+        products: ProductRepository,
+        categories: CategoryRepository,
+        search_index: ProductSearchIndex | None = None,
+        cache: TTLCache[Any] | None = None,
+        category_tree: CategoryTreeStore | None = None,
+        snapshot: ProductSnapshot | None = None,
+        slug_ids: TTLCache[int] | None = None,
+        suggestions: SuggestionIndex | None = None,
+        fragments: TTLCache[bytes] | None = None,
+        flights: SingleFlight[Any] | None = None,
+        quotes: DependencyCache[Any] | None = None,
+    ) -> None:
         self.products = products
         self.categories = categories
+        self.search_index = search_index
+        self.cache = cache
+        self.category_tree = category_tree
+        self.snapshot = snapshot
+        self.slug_ids = slug_ids
+        self.suggestions = suggestions
+        self.flights = flights
+        self.quotes = quotes
+        self.encoder = FragmentEncoder(ProductOut, version=product_version, cache=fragments)
 
-    async def get_product(self, identifier: str) -> Product:
-        product = None
-        if identifier.isdigit():
-            product = await self.products.get_by_id(int(identifier))
-        if not product:
-            from sqlalchemy import select
+    async def get_product(self, identifier: str) -> ProductOut:
+        return (await self.get_product_representation(identifier)).value
 
-            result = await self.products.session.execute(
-                select(Product).where(Product.slug == identifier)
-            )
-            product = result.scalar_one_or_none()
+    async def get_product_representation(self, identifier: str) -> Representation[ProductOut]:
+        cached = self.cache.get(("product", identifier)) if self.cache is not None else None
+        if cached is not None:
+            return cached
+        product = await self._resolve_product(identifier)
         if not product:
             raise not_found("Product not found")
+        value = ProductOut.model_validate(product)
+        representation = Representation(
+            value=value,
+            body=value.model_dump_json().encode(),
+            etag=product_etag(product.id, product.updated_at),
+            last_modified=product.updated_at,
+        )
+        if self.cache is not None:
+            self.cache.set(("product", str(product.id)), representation)
+            if not product.slug.isdigit():
+                self.cache.set(("product", product.slug), representation)
+        return representation
+
+    async def get_product_validators(self, identifier: str) -> tuple[str, dt.datetime] | None:
+        """``(etag, last_modified)`` of the product detail, without loading the product.
+
+        Answered from the cached representation when there is one, else from
+        a single-row version query; ``None`` when no product matches.
+        """
+        cached = self.cache.get(("product", identifier)) if self.cache is not None else None
+        if cached is not None:
+            return cached.etag, cached.last_modified
+        version = await self.products.get_version(identifier)
+        if version is None:
+            return None
+        return product_etag(version.id, version.updated_at), version.updated_at
+
+    async def _resolve_product(self, identifier: str) -> Product | None:
+        """Load a product by id or slug in one statement.
+
+        Known slugs are resolved through ``slug_ids`` to a primary-key lookup;
+        an entry that no longer matches (slug changed or row replaced behind
+        our back) is dropped and the identifier is resolved afresh.
+        """
+        slug_ids = self.slug_ids
+        if slug_ids is not None and not identifier.isdigit():
+            product_id = slug_ids.get(identifier)
+            if product_id is not None:
+                product = await self.products.get_by_id(product_id)
+                if product is not None and product.slug == identifier:
+                    return product
+                slug_ids.pop(identifier)
+        product = await self.products.get_by_identifier(identifier)
+        if product is not None and slug_ids is not None and not product.slug.isdigit():
+            slug_ids.set(product.slug, product.id)
         return product
 
-    async def list_categories(self) -> list[Category]:
-        categories = await self.categories.list_tree()
-        by_parent: dict[int | None, list[Category]] = {}
-        for category in categories:
-            by_parent.setdefault(category.parent_id, []).append(category)
+    async def get_category_tree(self) -> CategoryTree:
+        if self.category_tree is not None:
+            return await self.category_tree.get(self.categories)
+        return build_category_tree(await self.categories.list_tree(), version=0)
+
+    async def list_categories(self) -> tuple[CategoryNode, ...]:
+        return (await self.get_category_tree()).roots
+
+    async def _category_scope(
+        self, category_id: int | None, include_descendants: bool
+    ) -> tuple[int | None, frozenset[int] | None]:
+        """``(category_id, category_ids)`` filters, expanding to the subtree when asked."""
+        if include_descendants and category_id:
+            return None, (await self.get_category_tree()).subtree_ids(category_id)
+        return category_id, None
+
+    async def product_listing(
+        self,
+        *,
+        q: str | None,
+        category_id: int | None,
+        min_price: int | None,
+        max_price: int | None,
+        sort: str | None,
+        page: int,
+        page_size: int,
+        cursor: str | None = None,
+        include_descendants: bool = False,
+        facets: frozenset[str] = frozenset(),
+        fuzzy: bool = False,
+    ) -> Representation[list[int]]:
+        """The ``/products`` response body, assembled from cached product fragments.
+
+        The representation's value is the list of product ids on the page.
+        Concurrent misses for the same parameters share one build through
+        ``flights``; results are cached for ``SEARCH_CACHE_TTL_SECONDS``.
+        """
+        params = (
+            q.strip().lower() if q else None,
+            category_id,
+            include_descendants,
+            min_price,
+            max_price,
+            sort,
+            page,
+            page_size,
+            cursor,
+            facets,
+            fuzzy,
+        )
+        key: Hashable = ("listing", params)
+        if self.cache is not None:
+            key = self.cache.namespaced("search", key)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
 
-        def attach_children(node: Category) -> None:
-            node.children = by_parent.get(node.id, [])
-            for child in node.children:
-                attach_children(child)
+        async def build() -> Representation[list[int]]:
+            representation = await self._build_listing(
+                q=q,
+                category_id=category_id,
+                min_price=min_price,
+                max_price=max_price,
+                sort=sort,
+                page=page,
+                page_size=page_size,
+                cursor=cursor,
+                include_descendants=include_descendants,
+                facets=facets,
+                fuzzy=fuzzy,
+            )
+            if self.cache is not None:
+                self.cache.set(key, representation, ttl=settings.SEARCH_CACHE_TTL_SECONDS)
+            return representation
 
-        roots = by_parent.get(None, [])
-        for root in roots:
-            attach_children(root)
-        return roots
+        if self.flights is None:
+            return await build()
+        return await self.flights.run(key, build)
 
-    async def search_products(
+    async def _build_listing(
         self,
         *,
         q: str | None,
@@ -57,16 +281,106 @@ class CatalogService:
         sort: str | None,
         page: int,
         page_size: int,
-    ) -> tuple[list[Product], int]:
-        return await self.products.search(
+        cursor: str | None,
+        include_descendants: bool,
+        facets: frozenset[str],
+        fuzzy: bool,
+    ) -> Representation[list[int]]:
+        filters = dict(q=q, category_id=category_id, min_price=min_price, max_price=max_price)
+        scoped_id, category_ids = await self._category_scope(category_id, include_descendants)
+        result = await self.products.search(
             q=q,
-            category_id=category_id,
+            category_id=scoped_id,
+            category_ids=category_ids,
             min_price=min_price,
             max_price=max_price,
             sort=sort,
             page=page,
             page_size=page_size,
+            cursor=cursor,
+            fuzzy=fuzzy,
         )
+        facet_counts = None
+        if facets:
+            facet_counts = await self.product_facets(
+                facets,
+                **filters,
+                include_descendants=include_descendants,
+                sort=sort,
+                fuzzy=fuzzy,
+            )
+        body = page_body(
+            self.encoder.encode(result.items),
+            total=result.total,
+            page=page,
+            page_size=page_size,
+            pages=(result.total + page_size - 1) // page_size if page_size else 1,
+            next_cursor=result.next_cursor,
+            total_estimated=result.total_estimated,
+            facets=facet_counts.model_dump(mode="json") if facet_counts is not None else None,
+        )
+        return Representation.from_body([product.id for product in result.items], body)
+
+    async def product_facets(
+        self,
+        facets: frozenset[str],
+        *,
+        q: str | None,
+        category_id: int | None,
+        min_price: int | None,
+        max_price: int | None,
+        include_descendants: bool = False,
+        sort: str | None = None,
+        fuzzy: bool = False,
+    ) -> ProductFacets:
+        """Facet counts for the listing filters; cached alongside search results.
+
+        ``sort`` and ``fuzzy`` only matter with ``q``: they decide whether the
+        search index or SQL matches the text, exactly as for the listing itself.
+        """
+        category_id, category_ids = await self._category_scope(category_id, include_descendants)
+        bounds = sorted(settings.FACET_PRICE_BOUNDS)
+        key = None
+        if self.cache is not None:
+            filters = (
+                q.strip().lower() if q else None,
+                category_id,
+                category_ids,
+                min_price,
+                max_price,
+                sort in SALES_SORTS if q else None,
+                fuzzy if q else None,
+            )
+            key = self.cache.namespaced("search", ("facets", filters, facets, tuple(bounds)))
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        counts = await self.products.facet_counts(
+            facets,
+            price_bounds=bounds,
+            q=q,
+            category_id=category_id,
+            category_ids=category_ids,
+            min_price=min_price,
+            max_price=max_price,
+            sort=sort,
+            fuzzy=fuzzy,
+        )
+        result = ProductFacets()
+        if "category" in facets:
+            ranked = sorted(counts.categories.items(), key=lambda item: (-item[1], item[0] or 0))
+            result.categories = [CategoryFacet(category_id=cid, count=n) for cid, n in ranked]
+        if "price" in facets:
+            edges = [None, *bounds, None]
+            result.price = [
+                PriceBucketFacet(min_cents=edges[i], max_cents=edges[i + 1], count=n)
+                for i, n in enumerate(counts.price_buckets)
+            ]
+        if "stock" in facets:
+            result.stock = StockFacet(in_stock=counts.in_stock, out_of_stock=counts.out_of_stock)
+        if self.cache is not None and key is not None:
+            self.cache.set(key, result)
+        return result
 
     async def create_product(self, payload: ProductCreate) -> Product:
         product = Product(
@@ -79,18 +393,178 @@ class CatalogService:
             stock=payload.stock,
             category_id=payload.category_id,
         )
-        images = [ProductImage(url=image.url, alt=image.alt) for image in payload.images]
-        return await self.products.create_with_images(product, images)
+        images = [ProductImage(url=str(image.url), alt=image.alt) for image in payload.images]
+        product = await self.products.create_with_images(product, images)
+        after_commit(self.products.session, lambda: self._refresh(product))
+        return product
 
     async def update_product(self, product: Product, payload: ProductUpdate) -> Product:
         data = payload.model_dump(exclude_unset=True)
         images = data.pop("images", None)
+        shards = data.pop("stock_shards", None)
         for key, value in data.items():
             setattr(product, key, value)
         if images is not None:
-            await self.products.replace_images(product, [ProductImage(url=img.url, alt=img.alt) for img in images])
+            await self.products.replace_images(
+                product, [ProductImage(url=str(img["url"]), alt=img["alt"]) for img in images]
+            )
         await self.products.session.flush()
+        if shards is not None and shards != product.stock_shards:
+            await self._reshard_stock(product, shards, restock="stock" in data)
+        elif "stock" in data and product.stock_shards:
+            await self.products.spread_stock([product.id])
+        after_commit(self.products.session, lambda: self._refresh(product))
         return product
 
+    async def _reshard_stock(self, product: Product, shards: int, *, restock: bool) -> None:
+        """Move ``product``'s stock into ``shards`` counter rows, or back onto the row for 0.
+
+        Existing shards are locked and folded into ``products.stock`` first, so no
+        concurrent checkout is lost, unless ``restock`` says the caller just set it.
+        """
+        if product.stock_shards:
+            folded = await self.products.drop_stock_shards(product.id)
+            if not restock:
+                product.stock = folded
+        if shards:
+            await self.products.create_stock_shards(product.id, product.stock, shards)
+        product.stock_shards = shards
+        await self.products.session.flush()
+
+    async def sync_sharded_stock(self) -> int:
+        """Refresh the cached ``stock`` of sharded products from their shards.
+
+        Checkouts of sharded products only write their shards, so this is what
+        makes catalog reads (``ProductOut.stock``, facets, the columnar snapshot)
+        follow them. Returns the number of products refreshed.
+        """
+        drift = await self.products.sharded_stock_drift()
+        if not drift:
+            return 0
+        await self.products.bulk_set("stock", {row.id: row.total for row in drift})
+        documents = []
+        if self._indexes():
+            documents = await self.products.get_documents(row.id for row in drift)
+
+        def refresh() -> None:
+            for row in drift:
+                evict_product(self.cache, row, self.quotes)
+            for document in documents:
+                self._reindex(document)
+
+        after_commit(self.products.session, refresh)
+        return len(drift)
+
+    async def bulk_update(self, items: list[ProductBulkUpdateItem]) -> ProductBulkUpdateResult:
+        """Apply price/stock/active changes with one set-based ``UPDATE`` per column.
+
+        Items reference products by id or SKU; a later item for the same
+        product wins. Unknown references are reported, not raised.
+        """
+        refs = await self.products.resolve_refs(
+            {item.id for item in items if item.id is not None},
+            {item.sku for item in items if item.sku is not None},
+        )
+        by_id = {row.id: row for row in refs}
+        by_sku = {row.sku: row for row in refs}
+        changes: dict[str, dict[int, Any]] = {"price_cents": {}, "stock": {}, "is_active": {}}
+        not_found = []
+        for item in items:
+            row = by_id.get(item.id) if item.id is not None else by_sku.get(item.sku)
+            if row is None:
+                not_found.append(str(item.id) if item.id is not None else item.sku)
+                continue
+            for column, value in item.model_dump(include=set(changes), exclude_none=True).items():
+                changes[column][row.id] = value
+
+        touched: set[int] = set()
+        for column, values in changes.items():
+            if values:
+                await self.products.bulk_set(column, values)
+                touched.update(values)
+        await self.products.spread_stock(
+            product_id for product_id in changes["stock"] if by_id[product_id].stock_shards
+        )
+        if touched:
+            documents = await self.products.get_documents(touched) if self._indexes() else []
+
+            def refresh() -> None:
+                count_cache.invalidate("products")
+                for product_id in touched:
+                    evict_product(self.cache, by_id[product_id], self.quotes)
+                for document in documents:
+                    self._reindex(document)
+
+            after_commit(self.products.session, refresh)
+        return ProductBulkUpdateResult(
+            requested=len(items), updated=len(touched), not_found=not_found
+        )
+
     async def delete_product(self, product: Product) -> None:
+        if product.stock_shards:
+            await self.products.drop_stock_shards(product.id)
+        product_id, slug = product.id, product.slug
         await self.products.delete(product)
+
+        def refresh() -> None:
+            count_cache.invalidate("products")
+            evict_product(self.cache, product, self.quotes)
+            if self.slug_ids is not None:
+                self.slug_ids.pop(slug)
+            for index in self._indexes():
+                index.remove(product_id)
+
+        after_commit(self.products.session, refresh)
+
+    def suggest(self, prefix: str, limit: int) -> list[Suggestion]:
+        if self.suggestions is None or not self.suggestions.ready:
+            return []
+        return self.suggestions.suggest(prefix, limit)
+
+    def _indexes(self) -> list[Any]:
+        """The in-memory read structures that mirror the products table."""
+        indexes = (self.search_index, self.snapshot, self.suggestions)
+        return [index for index in indexes if index is not None]
+
+    def _refresh(self, product: Product) -> None:
+        """Evict and reindex a created or updated product once its write has committed."""
+        count_cache.invalidate("products")
+        evict_product(self.cache, product, self.quotes)
+        if self.slug_ids is not None:
+            self.slug_ids.pop(product.slug)
+        self._reindex(product)
+
+    def _reindex(self, document: Any) -> None:
+        for index in self._indexes():
+            index.upsert(document)
+
+    async def rebuild_search_index(self) -> None:
+        """Reload the search index from the active products in the database."""
+        index = self.search_index
+        if index is None:
+            return
+        index.clear()
+        async for row in self.products.iter_search_documents():
+            index.add(row)
+        index.finish()
+
+    async def rebuild_snapshot(self) -> None:
+        """Reload the columnar snapshot from the active products in the database."""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return
+        snapshot.clear()
+        async for row in self.products.iter_snapshot_rows():
+            snapshot.add(row)
+        snapshot.finish()
+
+    async def rebuild_suggestions(self, units_sold: dict[int, int]) -> None:
+        """Reload the autocomplete index, ranking products by ``units_sold``."""
+        suggestions = self.suggestions
+        if suggestions is None:
+            return
+        suggestions.clear()
+        async for row in self.products.iter_search_documents():
+            suggestions.add(row)
+        suggestions.set_sales(units_sold)
+        suggestions.finish()
@@ -0,0 +1,158 @@
+"""Memoized, versioned category tree."""
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from itertools import chain
+from types import MappingProxyType
+from typing import Any, Callable, Iterable, Mapping
+
+from pydantic import TypeAdapter
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from ..core.config import settings
+from ..models.category import Category
+from ..repositories.categories import CategoryRepository
+from ..schemas.category import CategoryOut
+from ..utils.http import weak_etag
+
+_category_list_adapter = TypeAdapter(list[CategoryOut])
+
+
+@dataclass(frozen=True, slots=True)
+class CategoryNode:
+    id: int
+    name: str
+    slug: str
+    parent_id: int | None
+    children: tuple["CategoryNode", ...]
+
+
+@dataclass(frozen=True, slots=True)
+class CategoryTree:
+    """Immutable snapshot of the category hierarchy and its serialized form.
+
+    ``descendants`` maps every category id to the ids of its whole subtree
+    (itself included), so subtree filters need no recursive queries.
+    """
+
+    version: int
+    roots: tuple[CategoryNode, ...]
+    by_id: Mapping[int, CategoryNode]
+    descendants: Mapping[int, frozenset[int]]
+    body: bytes
+    etag: str
+    built_at: float
+
+    def subtree_ids(self, category_id: int) -> frozenset[int]:
+        return self.descendants.get(category_id, frozenset((category_id,)))
+
+
+def build_category_tree(categories: Iterable[Any], version: int) -> CategoryTree:
+    by_parent: dict[int | None, list[Any]] = {}
+    for category in sorted(categories, key=lambda c: c.id):
+        by_parent.setdefault(category.parent_id, []).append(category)
+
+    by_id: dict[int, CategoryNode] = {}
+    descendants: dict[int, frozenset[int]] = {}
+
+    def build(category: Any, path: frozenset[int]) -> CategoryNode:
+        children = tuple(
+            build(child, path | {category.id})
+            for child in by_parent.get(category.id, [])
+            if child.id not in path
+        )
+        node = CategoryNode(
+            id=category.id,
+            name=category.name,
+            slug=category.slug,
+            parent_id=category.parent_id,
+            children=children,
+        )
+        by_id[node.id] = node
+        descendants[node.id] = frozenset(
+            chain((node.id,), *(descendants[child.id] for child in children))
+        )
+        return node
+
+    roots = tuple(build(category, frozenset()) for category in by_parent.get(None, []))
+    body = _category_list_adapter.dump_json(
+        [CategoryOut.model_validate(root, from_attributes=True) for root in roots]
+    )
+    etag = weak_etag(body)
+    return CategoryTree(
+        version=version,
+        roots=roots,
+        by_id=MappingProxyType(by_id),
+        descendants=MappingProxyType(descendants),
+        body=body,
+        etag=etag,
+        built_at=time.monotonic(),
+    )
+
+
+class CategoryTreeStore:
+    """Holds the current :class:`CategoryTree` and rebuilds it after category writes.
+
+    ``version`` is bumped by :meth:`invalidate` (called after any commit that
+    touched ``categories``); the snapshot is also refreshed after ``ttl``
+    seconds so that other processes' writes are picked up.
+    """
+
+    def __init__(self, *, ttl: float = 300, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self.clock = clock
+        self.version = 0
+        self._tree: CategoryTree | None = None
+
+    def invalidate(self) -> None:
+        self.version += 1
+
+    def current(self) -> CategoryTree | None:
+        tree = self._tree
+        if tree is None or tree.version != self.version:
+            return None
+        if self.ttl and self.clock() - tree.built_at > self.ttl:
+            return None
+        return tree
+
+    async def get(self, repo: CategoryRepository) -> CategoryTree:
+        tree = self.current()
+        if tree is not None:
+            return tree
+        version = self.version
+        tree = build_category_tree(await repo.list_tree(), version)
+        if version == self.version:
+            self._tree = tree
+        return tree
+
+
+category_tree_store = CategoryTreeStore(ttl=settings.CATEGORY_TREE_TTL_SECONDS)
+
+_DIRTY_KEY = "category_tree_dirty"
+
+
+@event.listens_for(Session, "before_flush")
+def _track_category_flush(session: Session, flush_context: Any, instances: Any) -> None:
+    if any(isinstance(obj, Category) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info[_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_category_statements(state: ORMExecuteState) -> None:
+    if state.is_insert or state.is_update or state.is_delete:
+        table = getattr(state.statement, "table", None)
+        if getattr(table, "name", None) == Category.__tablename__:
+            state.session.info[_DIRTY_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    if session.info.pop(_DIRTY_KEY, False):
+        category_tree_store.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY_KEY, None)
@@ -0,0 +1,139 @@
+"""Streaming order export for finance."""
+from __future__ import annotations
+
+import csv
+import datetime as dt
+import io
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.order import OrderStatus
+from ..repositories.orders import OrderRepository
+
+CSV_COLUMNS = (
+    "order_id",
+    "user_id",
+    "status",
+    "total_cents",
+    "currency",
+    "payment_ref",
+    "created_at",
+    "paid_at",
+    "item_id",
+    "product_id",
+    "sku",
+    "name",
+    "price_cents",
+    "qty",
+)
+# Encoded output is flushed to the client in chunks of roughly this size.
+CHUNK_BYTES = 64 * 1024
+
+
+def _iso(value: dt.datetime | None) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def _order(row: Any) -> dict[str, Any]:
+    return {
+        "id": row.id,
+        "user_id": row.user_id,
+        "status": row.status.value,
+        "total_cents": row.total_cents,
+        "currency": row.currency,
+        "payment_ref": row.payment_ref,
+        "created_at": _iso(row.created_at),
+        "paid_at": _iso(row.paid_at),
+        "items": [],
+    }
+
+
+def _item(row: Any) -> dict[str, Any]:
+    return {
+        "id": row.item_id,
+        "product_id": row.product_id,
+        "sku": row.sku_snapshot,
+        "name": row.name_snapshot,
+        "price_cents": row.price_cents,
+        "qty": row.qty,
+    }
+
+
+async def encode_ndjson(rows: AsyncIterable[Any]) -> AsyncIterator[str]:
+    """One JSON object per order with its items nested; rows must be grouped by order."""
+    current: dict[str, Any] | None = None
+    async for row in rows:
+        if current is None or current["id"] != row.id:
+            if current is not None:
+                yield json.dumps(current) + "\n"
+            current = _order(row)
+        if row.item_id is not None:
+            current["items"].append(_item(row))
+    if current is not None:
+        yield json.dumps(current) + "\n"
+
+
+async def encode_csv(rows: AsyncIterable[Any]) -> AsyncIterator[str]:
+    """One CSV line per order item, with the order columns repeated."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    async for row in rows:
+        writer.writerow(
+            (
+                row.id,
+                row.user_id,
+                row.status.value,
+                row.total_cents,
+                row.currency,
+                row.payment_ref or "",
+                _iso(row.created_at),
+                _iso(row.paid_at) or "",
+                row.item_id or "",
+                row.product_id or "",
+                row.sku_snapshot or "",
+                row.name_snapshot or "",
+                "" if row.price_cents is None else row.price_cents,
+                "" if row.qty is None else row.qty,
+            )
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+ENCODERS: dict[str, Callable[[AsyncIterable[Any]], AsyncIterator[str]]] = {
+    "ndjson": encode_ndjson,
+    "csv": encode_csv,
+}
+
+
+async def export_orders(
+    session_factory: Callable[[], AsyncSession],
+    fmt: str,
+    *,
+    status: OrderStatus | None = None,
+    created_from: dt.datetime | None = None,
+    created_to: dt.datetime | None = None,
+) -> AsyncIterator[bytes]:
+    """Encode matching orders as ``fmt``, yielding ~``CHUNK_BYTES`` pieces.
+
+    Opens its own session because the body is produced after the request's
+    dependencies have been torn down.
+    """
+    async with session_factory() as session:
+        rows = OrderRepository(session).stream_export(
+            status=status, created_from=created_from, created_to=created_to
+        )
+        pending: list[str] = []
+        size = 0
+        async for text in ENCODERS[fmt](rows):
+            pending.append(text)
+            size += len(text)
+            if size >= CHUNK_BYTES:
+                yield "".join(pending).encode()
+                pending, size = [], 0
+        if pending:
+            yield "".join(pending).encode()
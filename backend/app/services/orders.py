@@ -3,14 +3,42 @@ from __future__ import annotations
 
 import datetime as dt
 import secrets
+from typing import Any
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..core.config import settings
 from ..models.cart import Cart, CartItem, CartStatus
-from ..models.order import Order, OrderItem, OrderStatus
-from ..repositories.orders import OrderRepository
+from ..models.order import Order, OrderStatus
+from ..repositories.orders import PAID_STATUSES, OrderRepository
 from ..repositories.products import ProductRepository
+from ..utils.cache import DependencyCache, TTLCache, count_cache
 from ..utils.errors import http_error, not_found
+from ..utils.suggest import SuggestionIndex
+from .catalog import after_commit, evict_product
+
+# Reference point for trending weights; any fixed instant works. Weights grow by
+# 2**(hours / half-life), so with a one-week half-life moving the epoch (and scaling
+# stored scores down to match) is only needed after ~19 years.
+TRENDING_EPOCH = dt.datetime(2024, 1, 1)
+
+
+def trending_weight(at: dt.datetime, half_life_hours: float | None = None) -> float:
+    """Forward-decay weight of a sale made at ``at``.
+
+    Weights double every half-life, so adding ``qty * weight`` to a product's
+    ``trending_score`` ranks products exactly as if every older sale had been
+    halved per half-life, without rewriting any stored score.
+    """
+    half_life = half_life_hours or settings.TRENDING_HALF_LIFE_HOURS
+    return 2.0 ** ((at - TRENDING_EPOCH).total_seconds() / (half_life * 3600))
+
+
+def units_by_product(order: Order) -> dict[int, int]:
+    units: dict[int, int] = {}
+    for item in order.items:
+        units[item.product_id] = units.get(item.product_id, 0) + item.qty
+    return units
 
 
 class PaymentProvider:
@@ -30,46 +58,80 @@ class OrderService:
         products: ProductRepository,
         session: AsyncSession,
         payment_provider: PaymentProvider | None = None,
+        catalog_cache: TTLCache[Any] | None = None,
+        suggestions: SuggestionIndex | None = None,
+        quotes: DependencyCache[Any] | None = None,
     ) -> None:
         self.orders = orders
         self.products = products
         self.session = session
         self.payment_provider = payment_provider or PaymentProvider()
+        self.catalog_cache = catalog_cache
+        self.suggestions = suggestions
+        self.quotes = quotes
 
     async def checkout(self, cart: Cart) -> tuple[Order, str, str]:
+        """Place an order for ``cart`` with the same few statements whatever its size.
+
+        Products are read in one ``IN`` query and the payment is created before
+        anything is written, so row locks are only held by the closing writes: one
+        conditional stock decrement, the order, its items in one bulk insert and the
+        cart status. A line whose stock ran out after the read fails the decrement,
+        and the request's transaction rolls back. Products with sharded stock are
+        decremented on one of their shard rows instead of the product row.
+        """
         if not cart.items:
             raise http_error(status_code=400, detail="Cart is empty")
-        total = 0
-        order = Order(user_id=cart.user_id, status=OrderStatus.pending, total_cents=0, currency="USD")
-        await self.orders.add(order)
+        quantities: dict[int, int] = {}
         for item in cart.items:
-            product = await self.products.get_by_id(item.product_id)
-            if not product or product.stock < item.qty:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.qty
+        products = await self.products.get_order_snapshots(quantities)
+        for product_id, qty in quantities.items():
+            product = products.get(product_id)
+            if not product or not product.is_active or product.stock < qty:
                 raise http_error(status_code=400, detail="Product unavailable")
-            product.stock -= item.qty
-            total += product.price_cents * item.qty
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=product.id,
-                sku_snapshot=product.sku,
-                name_snapshot=product.name,
-                price_cents=product.price_cents,
-                qty=item.qty,
-            )
-            order.items.append(order_item)
-        order.total_cents = total
-        cart.status = CartStatus.ordered
-        await self.session.flush()
+        order = Order(
+            user_id=cart.user_id,
+            status=OrderStatus.pending,
+            total_cents=sum(products[pid].price_cents * qty for pid, qty in quantities.items()),
+            currency="USD",
+        )
         payment_ref, client_secret = await self.payment_provider.create_payment(order)
         order.payment_ref = payment_ref
+
+        shards = {pid: products[pid].stock_shards for pid in quantities}
+        plain = {pid: qty for pid, qty in quantities.items() if not shards[pid]}
+        sharded = {pid: qty for pid, qty in quantities.items() if shards[pid]}
+        reserved = await self.products.reserve_stock(plain) == len(plain)
+        if not reserved or not await self.products.reserve_sharded_stock(sharded, shards):
+            raise http_error(status_code=400, detail="Product unavailable")
+        await self.orders.add(order)
+        await self.orders.add_items(
+            [
+                {
+                    "order_id": order.id,
+                    "product_id": product_id,
+                    "sku_snapshot": products[product_id].sku,
+                    "name_snapshot": products[product_id].name,
+                    "price_cents": products[product_id].price_cents,
+                    "qty": qty,
+                }
+                for product_id, qty in quantities.items()
+            ]
+        )
+        cart.status = CartStatus.ordered
         await self.session.flush()
+
+        def refresh() -> None:
+            for product in products.values():
+                evict_product(self.catalog_cache, product, self.quotes)
+            count_cache.invalidate("orders")
+
+        after_commit(self.session, refresh)
         return order, payment_ref, client_secret
 
     async def mark_paid(self, payment_ref: str) -> Order:
-        from sqlalchemy import select
-
-        result = await self.session.execute(select(Order).where(Order.payment_ref == payment_ref))
-        order = result.scalar_one_or_none()
+        order = await self.orders.get_by_payment_ref(payment_ref)
         if not order:
             raise not_found("Order not found")
         if order.status == OrderStatus.paid:
@@ -79,10 +141,7 @@ class OrderService:
             return order
         if order.status not in {OrderStatus.pending, OrderStatus.cancelled}:
             return order
-        order.status = OrderStatus.paid
-        if not order.paid_at:
-            order.paid_at = dt.datetime.utcnow()
-        await self.session.flush()
+        await self._enter_status(order, OrderStatus.paid)
         return order
 
     async def transition_status(self, order: Order, status: OrderStatus) -> Order:
@@ -96,6 +155,35 @@ class OrderService:
             raise http_error(status_code=400, detail="Cannot cancel fulfilled order")
         if order.status in valid_transitions and status not in valid_transitions[order.status]:
             raise http_error(status_code=400, detail="Invalid status transition")
+        await self._enter_status(order, status)
+        return order
+
+    async def _enter_status(self, order: Order, status: OrderStatus) -> None:
+        """Move ``order`` to ``status``, keeping the sales counters in step.
+
+        An order counts towards ``units_sold``/``trending_score`` while its status
+        is in ``PAID_STATUSES`` (as in migration 0003's backfill), so its units are
+        added when it enters that set, however it gets there, and taken back with
+        the same weight only when it leaves it.
+        """
+        was_counted = order.status in PAID_STATUSES
+        counted = status in PAID_STATUSES
+        if counted and not order.paid_at:
+            order.paid_at = dt.datetime.utcnow()
         order.status = status
+        units = units_by_product(order) if counted != was_counted else {}
+        if units:
+            sign = 1 if counted else -1
+            await self.products.record_sales(
+                {product_id: sign * qty for product_id, qty in units.items()},
+                trending_weight=trending_weight(order.paid_at or dt.datetime.utcnow()),
+            )
         await self.session.flush()
-        return order
+
+        def refresh() -> None:
+            if self.suggestions is not None:
+                for product_id, qty in units.items():
+                    self.suggestions.record_sale(product_id, qty if counted else -qty)
+            count_cache.invalidate("orders")
+
+        after_commit(self.session, refresh)
@@ -0,0 +1,319 @@
+"""Streaming bulk product import from NDJSON or CSV feeds."""
+from __future__ import annotations
+
+import csv
+import datetime as dt
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, AsyncIterator
+
+from pydantic import ValidationError
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..repositories.products import ProductRepository
+from ..schemas.product import ProductCreate
+from ..utils.cache import DependencyCache, TTLCache, count_cache
+from ..utils.columnar import ProductSnapshot
+from ..utils.search import ProductSearchIndex
+from ..utils.suggest import SuggestionIndex
+
+# A parsed feed record: the line it started on and either the row or why it could not be read.
+Record = tuple[int, "dict[str, Any] | str"]
+
+
+@dataclass
+class RowError:
+    line: int
+    error: str
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: list[RowError] = field(default_factory=list)
+    errors_truncated: bool = False
+    elapsed_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def fail(self, line: int, error: str, *, max_errors: int) -> None:
+        self.failed += 1
+        if len(self.errors) < max_errors:
+            self.errors.append(RowError(line=line, error=error))
+        else:
+            self.errors_truncated = True
+
+
+@dataclass(slots=True)
+class ImportedProduct:
+    """Column values of a written row, used to refresh the in-memory catalog structures."""
+
+    id: int
+    sku: str
+    name: str
+    slug: str
+    description: str | None
+    price_cents: int
+    category_id: int | None
+    created_at: dt.datetime
+    stock: int
+    is_active: bool
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines without holding more than one chunk plus a line."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+def _describe(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+async def parse_ndjson(lines: AsyncIterable[bytes]) -> AsyncIterator[Record]:
+    line_no = 0
+    async for raw in lines:
+        line_no += 1
+        if not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError as exc:
+            yield line_no, f"invalid JSON: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, "expected a JSON object"
+            continue
+        yield line_no, record
+
+
+def _csv_record(header: list[str], values: list[str]) -> dict[str, Any] | str:
+    if len(values) != len(header):
+        return f"expected {len(header)} columns, got {len(values)}"
+    record: dict[str, Any] = {}
+    for name, value in zip(header, values):
+        value = value.strip()
+        if not value:
+            continue
+        if name == "image_urls":
+            record["images"] = [{"url": url.strip()} for url in value.split("|") if url.strip()]
+        else:
+            record[name] = value
+    return record
+
+
+async def parse_csv(lines: AsyncIterable[bytes]) -> AsyncIterator[Record]:
+    """Parse CSV with a header row; ``image_urls`` holds ``|``-separated URLs.
+
+    Quoted fields may span lines: physical lines are joined until the quotes
+    balance, so only one record is buffered at a time.
+    """
+    header: list[str] | None = None
+    line_no = 0
+    start = 0
+    pending = ""
+    async for raw in lines:
+        line_no += 1
+        try:
+            text = raw.decode("utf-8-sig" if line_no == 1 else "utf-8")
+        except UnicodeDecodeError as exc:
+            pending = ""
+            yield line_no, f"invalid UTF-8: {exc}"
+            continue
+        if not pending:
+            start = line_no
+        pending = f"{pending}\n{text}" if pending else text
+        if pending.count('"') % 2:
+            continue
+        record_text, pending = pending.rstrip("\r"), ""
+        if not record_text.strip():
+            continue
+        values = next(csv.reader([record_text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        yield start, _csv_record(header, values)
+    if pending:
+        yield start, "unterminated quoted field"
+
+
+class ProductImporter:
+    """Upserts validated feed rows keyed on SKU in batches.
+
+    Each batch costs a lookup of the existing SKUs, one executemany ``INSERT``
+    for new products, one executemany ``UPDATE`` for known ones and, when rows
+    carry images, one ``DELETE`` plus one ``INSERT`` for those. Batches commit
+    on their own. Each batch is written inside a savepoint; one that hits a
+    constraint or bad value is rolled back to it and replayed row by row, each
+    row in its own savepoint, so only the offending rows are reported and the
+    rest of the session is left untouched. Other database errors abort the
+    import.
+    """
+
+    def __init__(
+        self,
+        *,
+        session: AsyncSession,
+        products: ProductRepository,
+        batch_size: int = 500,
+        max_errors: int = 1000,
+        search_index: ProductSearchIndex | None = None,
+        snapshot: ProductSnapshot | None = None,
+        cache: TTLCache[Any] | None = None,
+        slug_ids: TTLCache[int] | None = None,
+        suggestions: SuggestionIndex | None = None,
+        quotes: DependencyCache[Any] | None = None,
+    ) -> None:
+        self.session = session
+        self.products = products
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.search_index = search_index
+        self.snapshot = snapshot
+        self.cache = cache
+        self.slug_ids = slug_ids
+        self.suggestions = suggestions
+        self.quotes = quotes
+
+    async def run(self, records: AsyncIterable[Record]) -> ImportReport:
+        report = ImportReport()
+        started = time.perf_counter()
+        batch: dict[str, tuple[int, ProductCreate]] = {}
+        async for line, record in records:
+            report.rows += 1
+            if isinstance(record, str):
+                report.fail(line, record, max_errors=self.max_errors)
+                continue
+            try:
+                payload = ProductCreate.model_validate(record)
+            except ValidationError as exc:
+                report.fail(line, _describe(exc), max_errors=self.max_errors)
+                continue
+            if payload.sku in batch:
+                await self._flush(batch, report)
+            batch[payload.sku] = (line, payload)
+            if len(batch) >= self.batch_size:
+                await self._flush(batch, report)
+        await self._flush(batch, report)
+        report.elapsed_seconds = time.perf_counter() - started
+        if report.created or report.updated:
+            count_cache.invalidate("products")
+            if self.cache is not None:
+                self.cache.invalidate_namespace("search")
+        return report
+
+    async def _flush(
+        self, batch: dict[str, tuple[int, ProductCreate]], report: ImportReport
+    ) -> None:
+        if not batch:
+            return
+        entries = list(batch.values())
+        batch.clear()
+        try:
+            async with self.session.begin_nested():
+                written = await self._write(entries)
+        except (DataError, IntegrityError):
+            written = []
+            for line, payload in entries:
+                try:
+                    async with self.session.begin_nested():
+                        written.extend(await self._write([(line, payload)]))
+                except (DataError, IntegrityError) as exc:
+                    reason = str(exc.orig).splitlines()[0] if exc.orig else "database error"
+                    report.fail(
+                        line, f"rejected by the database: {reason}", max_errors=self.max_errors
+                    )
+        await self.session.commit()
+        for product, previous_slug in written:
+            if previous_slug is None:
+                report.created += 1
+            else:
+                report.updated += 1
+            self._refresh(product, previous_slug)
+
+    async def _write(
+        self, entries: list[tuple[int, ProductCreate]]
+    ) -> list[tuple[ImportedProduct, str | None]]:
+        """Write ``entries``; pairs each product with its previous slug (``None`` when new)."""
+        existing = await self.products.find_by_skus(payload.sku for _, payload in entries)
+        now = dt.datetime.utcnow()
+        inserts, updates = [], []
+        for _, payload in entries:
+            values = payload.model_dump(exclude={"images"})
+            row = existing.get(payload.sku)
+            if row is None:
+                inserts.append({**values, "created_at": now, "updated_at": now, "is_active": True})
+            else:
+                updates.append({**values, "id": row.id, "updated_at": now})
+        await self.products.bulk_insert(inserts)
+        await self.products.bulk_update(updates)
+        await self.products.spread_stock(
+            existing[payload.sku].id
+            for _, payload in entries
+            if payload.sku in existing and existing[payload.sku].stock_shards
+        )
+
+        rows = dict(existing)
+        if inserts:
+            rows.update(await self.products.find_by_skus(values["sku"] for values in inserts))
+        await self.products.bulk_replace_images(
+            {
+                rows[payload.sku].id: [
+                    {"url": str(image.url), "alt": image.alt} for image in payload.images
+                ]
+                for _, payload in entries
+                if "images" in payload.model_fields_set
+            }
+        )
+        written = []
+        for _, payload in entries:
+            row = rows[payload.sku]
+            product = ImportedProduct(
+                id=row.id,
+                sku=payload.sku,
+                name=payload.name,
+                slug=payload.slug,
+                description=payload.description,
+                price_cents=payload.price_cents,
+                category_id=payload.category_id,
+                created_at=row.created_at,
+                stock=payload.stock,
+                is_active=row.is_active,
+            )
+            previous = existing.get(payload.sku)
+            written.append((product, previous.slug if previous is not None else None))
+        return written
+
+    def _refresh(self, product: ImportedProduct, previous_slug: str | None) -> None:
+        slugs = {product.slug, previous_slug} - {None}
+        if self.quotes is not None:
+            self.quotes.touch(product.id)
+        if self.cache is not None:
+            self.cache.pop(("product", str(product.id)))
+            for slug in slugs:
+                self.cache.pop(("product", slug))
+        if self.slug_ids is not None:
+            for slug in slugs:
+                self.slug_ids.pop(slug)
+        if self.search_index is not None:
+            self.search_index.upsert(product)
+        if self.snapshot is not None:
+            self.snapshot.upsert(product)
+        if self.suggestions is not None:
+            self.suggestions.upsert(product)
@@ -8,14 +8,17 @@ from starlette.middleware.base import BaseHTTPMiddleware
 
 
 class BodySizeLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, *, max_body_size: int) -> None:
+    def __init__(
+        self, app, *, max_body_size: int, path_limits: dict[str, int] | None = None
+    ) -> None:
         super().__init__(app)
         self.max_body_size = max_body_size
+        self.path_limits = path_limits or {}
 
     async def dispatch(self, request: Request, call_next: Callable[[Request], Response]) -> Response:
         if request.headers.get("content-length"):
             size = int(request.headers["content-length"])
-            if size > self.max_body_size:
+            if size > self.path_limits.get(request.url.path, self.max_body_size):
                 from fastapi import status
                 from fastapi.responses import JSONResponse
 
@@ -0,0 +1,225 @@
+"""In-process caches with bounded size and time-based expiry."""
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Generic, Hashable, Iterable, TypeVar
+
+from ..core.config import settings
+from .metrics import metrics_registry
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """LRU mapping whose entries also expire ``ttl`` seconds after being stored."""
+
+    def __init__(
+        self, *, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: OrderedDict[Hashable, tuple[float, V]] = OrderedDict()
+        self._generations: dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> V | Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: V, *, ttl: float | None = None) -> None:
+        """Store ``value``; ``ttl`` shortens (or lengthens) this entry's lifetime."""
+        if not self.enabled:
+            return
+        self._data[key] = (self.clock() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def namespaced(self, namespace: str, key: Hashable) -> tuple[str, int, Hashable]:
+        """Build a key that :meth:`invalidate_namespace` can orphan in O(1)."""
+        return (namespace, self._generations.get(namespace, 0), key)
+
+    def invalidate_namespace(self, namespace: str) -> None:
+        """Drop every namespaced entry by bumping the namespace generation.
+
+        Orphaned entries are never read again and age out through LRU/TTL.
+        """
+        self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+
+class DependencyCache(Generic[V]):
+    """TTL cache whose entries remember the dependencies they were built from.
+
+    :meth:`touch` records a write to one dependency (e.g. a product id). An entry
+    is only served while none of its dependencies has been touched since
+    :meth:`start` was called for it, so a write drops just the entries that
+    read it, and one that lands while an entry is being built is not missed.
+    """
+
+    def __init__(
+        self, *, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.entries: TTLCache[tuple[int, tuple[Hashable, ...], V]] = TTLCache(
+            maxsize=maxsize, ttl=ttl, clock=clock
+        )
+        self._writes = 0
+        self._touched: dict[Hashable, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.entries.enabled
+
+    def start(self) -> int:
+        """Token to pass to :meth:`set` for an entry about to be built."""
+        return self._writes
+
+    def touch(self, dependency: Hashable) -> None:
+        self._writes += 1
+        self._touched[dependency] = self._writes
+
+    def get(self, key: Hashable) -> V | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        started, dependencies, value = entry
+        if any(self._touched.get(dep, 0) > started for dep in dependencies):
+            self.entries.pop(key)
+            self.entries.hits -= 1
+            self.entries.misses += 1
+            return None
+        return value
+
+    def set(
+        self, key: Hashable, value: V, *, dependencies: Iterable[Hashable], started: int
+    ) -> None:
+        dependencies = tuple(dependencies)
+        if any(self._touched.get(dep, 0) > started for dep in dependencies):
+            return
+        self.entries.set(key, (started, dependencies, value))
+
+
+class SingleFlight(Generic[V]):
+    """Runs one call per key at a time; concurrent callers share its result.
+
+    The first caller for a key (the leader) runs ``factory``; callers arriving
+    while it is in flight await the same outcome instead of repeating the work.
+    If the leader is cancelled, a waiting caller takes over.
+    """
+
+    def __init__(self) -> None:
+        self.leaders = 0
+        self.coalesced = 0
+        self.stampedes_avoided = 0
+        self._flights: dict[Hashable, asyncio.Future[V]] = {}
+        self._followers: dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[V]]) -> V:
+        future = self._flights.get(key)
+        if future is not None:
+            self.coalesced += 1
+            followers = self._followers[key] = self._followers[key] + 1
+            if followers == 1:
+                self.stampedes_avoided += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                task = asyncio.current_task()
+                if future.cancelled() and not (task is not None and task.cancelling()):
+                    return await self.run(key, factory)
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        self._followers[key] = 0
+        self.leaders += 1
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # retrieved here so an unawaited failure is not logged twice
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._flights[key]
+            del self._followers[key]
+
+
+class CountCache:
+    """Caches listing totals keyed by namespace and normalized filters."""
+
+    def __init__(self, *, maxsize: int = 4096, ttl: float = 30) -> None:
+        self._entries: TTLCache[tuple[int, bool]] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @property
+    def enabled(self) -> bool:
+        return self._entries.enabled
+
+    def get(self, namespace: str, key: Hashable) -> tuple[int, bool] | None:
+        if not self.enabled:
+            return None
+        return self._entries.get(self._entries.namespaced(namespace, key))
+
+    def set(self, namespace: str, key: Hashable, total: int, estimated: bool = False) -> None:
+        self._entries.set(self._entries.namespaced(namespace, key), (total, estimated))
+
+    def invalidate(self, namespace: str) -> None:
+        self._entries.invalidate_namespace(namespace)
+
+
+count_cache = CountCache(ttl=settings.COUNT_CACHE_TTL_SECONDS)
+catalog_cache: TTLCache[Any] = TTLCache(
+    maxsize=settings.CATALOG_CACHE_MAX_ENTRIES, ttl=settings.CATALOG_CACHE_TTL_SECONDS
+)
+metrics_registry.register_cache("catalog", catalog_cache)
+product_slug_ids: TTLCache[int] = TTLCache(
+    maxsize=settings.PRODUCT_SLUG_CACHE_MAX_ENTRIES, ttl=settings.PRODUCT_SLUG_CACHE_TTL_SECONDS
+)
+metrics_registry.register_cache("product_slugs", product_slug_ids)
+product_fragments: TTLCache[bytes] = TTLCache(
+    maxsize=settings.PRODUCT_FRAGMENT_CACHE_MAX_ENTRIES,
+    ttl=settings.PRODUCT_FRAGMENT_CACHE_TTL_SECONDS,
+)
+metrics_registry.register_cache("product_fragments", product_fragments)
+cart_quotes: DependencyCache[Any] = DependencyCache(
+    maxsize=settings.CART_QUOTE_CACHE_MAX_ENTRIES, ttl=settings.CART_QUOTE_CACHE_TTL_SECONDS
+)
+metrics_registry.register_cache("cart_quotes", cart_quotes.entries)
+listing_flights: SingleFlight[Any] = SingleFlight()
+metrics_registry.register_single_flight("catalog_listing", listing_flights)
@@ -0,0 +1,214 @@
+"""Columnar in-memory snapshot of active products.
+
+Requires the optional ``numpy`` dependency; without it the snapshot reports
+itself unavailable and listings keep using SQL.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import sys
+from typing import Any
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+_EPOCH = dt.datetime(1970, 1, 1)
+NO_CATEGORY = -1
+# sort key -> (column, descending); mirrors ProductRepository's SORT_COLUMNS
+SORTS = {
+    "price_asc": ("price_cents", False),
+    "price_desc": ("price_cents", True),
+    "newest": ("created_at", True),
+}
+
+
+def to_micros(value: dt.datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // dt.timedelta(microseconds=1)
+
+
+class ProductSnapshot:
+    """Active products as parallel NumPy columns for vectorized filter and sort.
+
+    Columns are ``id``, ``price_cents``, ``category_id`` (``-1`` for none),
+    ``created_at`` (epoch microseconds) and ``stock``. Admin writes patch rows
+    in place or append them; removals leave a tombstone that is compacted away
+    once a quarter of the rows are dead.
+    """
+
+    DTYPES = {
+        "id": "int64",
+        "price_cents": "int64",
+        "category_id": "int64",
+        "created_at": "int64",
+        "stock": "int32",
+    }
+
+    def __init__(self, *, capacity: int = 1024) -> None:
+        self.ready = False
+        self.initial_capacity = capacity
+        self._columns: dict[str, Any] = {}
+        self._alive: Any = None
+        self._positions: dict[int, int] = {}
+        self._size = 0
+
+    @staticmethod
+    def available() -> bool:
+        return np is not None
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident size: column buffers plus the id -> row map."""
+        if self._alive is None:
+            return 0
+        arrays = sum(column.nbytes for column in self._columns.values()) + self._alive.nbytes
+        return arrays + sys.getsizeof(self._positions)
+
+    def bytes_per_product(self) -> float:
+        return self.nbytes / len(self) if len(self) else 0.0
+
+    def clear(self) -> None:
+        self.ready = False
+        self._allocate(self.initial_capacity)
+        self._positions = {}
+        self._size = 0
+
+    def add(self, row: Any) -> None:
+        """Append a row during :meth:`load`; ``row`` has the snapshot column attributes."""
+        self._write(self._append_slot(row.id), row)
+
+    def finish(self) -> None:
+        self.ready = True
+
+    def upsert(self, product: Any) -> None:
+        """Insert or refresh ``product``; inactive products are dropped."""
+        if self._alive is None:
+            return
+        if not product.is_active:
+            self.remove(product.id)
+            return
+        position = self._positions.get(product.id)
+        if position is None:
+            position = self._append_slot(product.id)
+        self._write(position, product)
+
+    def remove(self, product_id: int) -> None:
+        position = self._positions.pop(product_id, None)
+        if position is None:
+            return
+        self._alive[position] = False
+        if self._size > self.initial_capacity and len(self._positions) < self._size * 0.75:
+            self._compact()
+
+    def search(
+        self,
+        *,
+        category_id: int | None = None,
+        category_ids: frozenset[int] | None = None,
+        min_price: int | None = None,
+        max_price: int | None = None,
+        sort: str = "newest",
+        offset: int = 0,
+        limit: int = 20,
+        after: tuple[Any, int] | None = None,
+    ) -> tuple[list[int], int, bool]:
+        """Return ``(ids, total, has_more)`` for one page of the filtered listing.
+
+        ``after`` is the ``(sort value, id)`` of the previous page's last row,
+        as carried by keyset cursors; when given, ``offset`` is ignored.
+        """
+        n = self._size
+        cols = {name: column[:n] for name, column in self._columns.items()}
+        mask = self._alive[:n].copy()
+        if category_id:
+            mask &= cols["category_id"] == category_id
+        if category_ids is not None:
+            wanted = np.fromiter(category_ids, dtype=np.int64, count=len(category_ids))
+            mask &= np.isin(cols["category_id"], wanted)
+        if min_price is not None:
+            mask &= cols["price_cents"] >= min_price
+        if max_price is not None:
+            mask &= cols["price_cents"] <= max_price
+        total = int(np.count_nonzero(mask))
+
+        column, descending = SORTS.get(sort, SORTS["newest"])
+        key, ids = cols[column], cols["id"]
+        if after is not None:
+            value, last_id = after
+            if isinstance(value, dt.datetime):
+                value = to_micros(value)
+            if descending:
+                mask &= (key < value) | ((key == value) & (ids < last_id))
+            else:
+                mask &= (key > value) | ((key == value) & (ids > last_id))
+            offset = 0
+
+        rows = np.flatnonzero(mask)
+        window = offset + limit
+        top = self._top(rows, key, ids, window + 1, descending)
+        page = top[offset:window]
+        return ids[page].tolist(), total, len(top) > window
+
+    @staticmethod
+    def _top(rows: Any, key: Any, ids: Any, count: int, descending: bool) -> Any:
+        """The first ``count`` of ``rows`` in ``(key, id)`` order without a full sort."""
+        sign = -1 if descending else 1
+        keys = key[rows] * sign
+        if len(rows) > count:
+            threshold = np.partition(keys, count - 1)[count - 1]
+            keep = keys <= threshold
+            rows, keys = rows[keep], keys[keep]
+        order = np.lexsort((ids[rows] * sign, keys))
+        return rows[order[:count]]
+
+    def _allocate(self, capacity: int) -> None:
+        self._columns = {
+            name: np.zeros(capacity, dtype=dtype) for name, dtype in self.DTYPES.items()
+        }
+        self._alive = np.zeros(capacity, dtype=bool)
+
+    def _append_slot(self, product_id: int) -> int:
+        if self._size == len(self._alive):
+            capacity = max(self.initial_capacity, self._size * 2)
+            for name, column in self._columns.items():
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[: self._size] = column[: self._size]
+                self._columns[name] = grown
+            alive = np.zeros(capacity, dtype=bool)
+            alive[: self._size] = self._alive[: self._size]
+            self._alive = alive
+        position = self._size
+        self._size += 1
+        self._positions[product_id] = position
+        return position
+
+    def _write(self, position: int, product: Any) -> None:
+        columns = self._columns
+        columns["id"][position] = product.id
+        columns["price_cents"][position] = product.price_cents
+        category_id = product.category_id
+        columns["category_id"][position] = NO_CATEGORY if category_id is None else category_id
+        created_at = product.created_at
+        columns["created_at"][position] = to_micros(created_at) if created_at else 0
+        columns["stock"][position] = product.stock or 0
+        self._alive[position] = True
+
+    def _compact(self) -> None:
+        live = self._alive[: self._size]
+        count = int(np.count_nonzero(live))
+        for column in self._columns.values():
+            column[:count] = column[: self._size][live]
+        self._alive[:count] = True
+        self._alive[count : self._size] = False
+        self._size = count
+        ids = self._columns["id"][:count]
+        self._positions = {int(product_id): i for i, product_id in enumerate(ids)}
+
+
+product_snapshot = ProductSnapshot()
@@ -0,0 +1,127 @@
+"""Conditional request helpers."""
+from __future__ import annotations
+
+import datetime as dt
+import hashlib
+from dataclasses import dataclass
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Generic, TypeVar
+
+from fastapi import Request, Response, status
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+def weak_etag(*parts: Any) -> str:
+    """Weak validator hashed from ``parts`` (bytes are used verbatim, the rest via ``str``)."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return f'W/"{digest.hexdigest()[:20]}"'
+
+
+@dataclass(frozen=True, slots=True)
+class Representation(Generic[T]):
+    """A response model together with its serialized JSON body and validators."""
+
+    value: T
+    body: bytes
+    etag: str
+    last_modified: dt.datetime | None = None
+
+    @classmethod
+    def of(cls, value: BaseModel) -> "Representation[Any]":
+        return cls.from_body(value, value.model_dump_json().encode())
+
+    @classmethod
+    def from_body(cls, value: T, body: bytes) -> "Representation[T]":
+        return cls(value=value, body=body, etag=weak_etag(body))
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison of an ``If-None-Match`` header against ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    candidates = if_none_match.split(",")
+    return any(candidate.strip().removeprefix("W/") == bare for candidate in candidates)
+
+
+def http_date(value: dt.datetime) -> str:
+    """``Last-Modified`` form of a naive UTC timestamp."""
+    return format_datetime(value.replace(tzinfo=dt.timezone.utc), usegmt=True)
+
+
+def unmodified_since(if_modified_since: str | None, last_modified: dt.datetime) -> bool:
+    """Whether a naive UTC ``last_modified`` is no later than ``If-Modified-Since``.
+
+    HTTP dates have one-second resolution, so sub-second changes are ignored;
+    a missing or malformed header never matches.
+    """
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=dt.timezone.utc)
+    return last_modified.replace(tzinfo=dt.timezone.utc, microsecond=0) <= since
+
+
+def _validator_headers(
+    etag: str, last_modified: dt.datetime | None, cache_control: str
+) -> dict[str, str]:
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(
+    request: Request,
+    etag: str,
+    *,
+    last_modified: dt.datetime | None = None,
+    cache_control: str = "no-cache",
+) -> Response | None:
+    """A ``304`` response when the client's copy is current, else ``None``.
+
+    ``If-None-Match`` is checked against ``etag``; only without it is
+    ``If-Modified-Since`` compared with ``last_modified``.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        unchanged = etag_matches(if_none_match, etag)
+    else:
+        unchanged = last_modified is not None and unmodified_since(
+            request.headers.get("if-modified-since"), last_modified
+        )
+    if unchanged:
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers=_validator_headers(etag, last_modified, cache_control),
+        )
+    return None
+
+
+def cached_json_response(
+    request: Request,
+    body: bytes,
+    etag: str,
+    *,
+    last_modified: dt.datetime | None = None,
+    cache_control: str = "no-cache",
+) -> Response:
+    """Serve pre-serialized JSON, answering ``304`` when the client's copy is current."""
+    unchanged = not_modified(
+        request, etag, last_modified=last_modified, cache_control=cache_control
+    )
+    if unchanged is not None:
+        return unchanged
+    headers = _validator_headers(etag, last_modified, cache_control)
+    return Response(content=body, media_type="application/json", headers=headers)
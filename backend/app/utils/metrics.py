@@ -1,21 +1,74 @@
 """Simple in-memory metrics collector."""
 from __future__ import annotations
 
+from bisect import bisect_left
 from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import DefaultDict, Dict
+from typing import Any, DefaultDict, Dict
+
+DB_QUERY_BUCKETS = (1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0)
+DB_DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...]
+    bucket_counts: list[int] = field(default_factory=list)
+    total: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.bucket_counts:
+            self.bucket_counts = [0] * len(self.buckets)
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            self.bucket_counts[index] += 1
+        self.total += value
+        self.count += 1
+
+    def render(self, name: str, labels: str) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, self.bucket_counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.total}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
 
 
 @dataclass
 class MetricsRegistry:
     counts: DefaultDict[str, int] = field(default_factory=lambda: defaultdict(int))
     durations: DefaultDict[str, float] = field(default_factory=lambda: defaultdict(float))
+    db_queries: Dict[str, Histogram] = field(default_factory=dict)
+    db_durations: Dict[str, Histogram] = field(default_factory=dict)
+    caches: Dict[str, Any] = field(default_factory=dict)
+    flights: Dict[str, Any] = field(default_factory=dict)
+
+    def register_cache(self, name: str, cache: Any) -> None:
+        """Expose ``cache.hits/misses/evictions`` and its size under ``name``."""
+        self.caches[name] = cache
+
+    def register_single_flight(self, name: str, flight: Any) -> None:
+        """Expose ``flight.leaders/coalesced/stampedes_avoided`` under ``name``."""
+        self.flights[name] = flight
 
     def observe_request(self, *, route: str, status: int, elapsed: float) -> None:
         key = f"{route}|{status}"
         self.counts[key] += 1
         self.durations[key] += elapsed
 
+    def observe_db(self, *, route: str, queries: int, elapsed: float) -> None:
+        if route not in self.db_queries:
+            self.db_queries[route] = Histogram(DB_QUERY_BUCKETS)
+            self.db_durations[route] = Histogram(DB_DURATION_BUCKETS)
+        self.db_queries[route].observe(queries)
+        self.db_durations[route].observe(elapsed)
+
     def render_prometheus(self) -> str:
         lines = ["# HELP http_requests_total Total HTTP requests.", "# TYPE http_requests_total counter"]
         for key, count in self.counts.items():
@@ -28,6 +81,36 @@ class MetricsRegistry:
             lines.append(
                 f'http_request_duration_seconds_total{{route="{route}",status="{status}"}} {duration}'
             )
+        lines.append("# HELP db_queries_per_request SQL statements issued per HTTP request.")
+        lines.append("# TYPE db_queries_per_request histogram")
+        for route, histogram in self.db_queries.items():
+            lines.extend(histogram.render("db_queries_per_request", f'route="{route}"'))
+        lines.append("# HELP db_duration_seconds_per_request Time spent in SQL per HTTP request.")
+        lines.append("# TYPE db_duration_seconds_per_request histogram")
+        for route, histogram in self.db_durations.items():
+            lines.extend(histogram.render("db_duration_seconds_per_request", f'route="{route}"'))
+        for metric, attribute, kind in (
+            ("cache_hits_total", "hits", "counter"),
+            ("cache_misses_total", "misses", "counter"),
+            ("cache_evictions_total", "evictions", "counter"),
+        ):
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, cache in self.caches.items():
+                lines.append(f'{metric}{{cache="{name}"}} {getattr(cache, attribute)}')
+        lines.append("# TYPE cache_entries gauge")
+        for name, cache in self.caches.items():
+            lines.append(f'cache_entries{{cache="{name}"}} {len(cache)}')
+        lines.append("# HELP singleflight_requests_total Cache misses by who ran the query.")
+        lines.append("# TYPE singleflight_requests_total counter")
+        for name, flight in self.flights.items():
+            for role, count in (("leader", flight.leaders), ("coalesced", flight.coalesced)):
+                labels = f'flight="{name}",role="{role}"'
+                lines.append(f"singleflight_requests_total{{{labels}}} {count}")
+        metric = "singleflight_stampedes_avoided_total"
+        lines.append(f"# HELP {metric} Queries shared by concurrent misses.")
+        lines.append(f"# TYPE {metric} counter")
+        for name, flight in self.flights.items():
+            lines.append(f'{metric}{{flight="{name}"}} {flight.stampedes_avoided}')
         return "\n".join(lines) + "\n"
 
 
@@ -1,10 +1,17 @@
 """Pagination helpers."""
 from __future__ import annotations
 
+import base64
+import binascii
+import json
+from dataclasses import dataclass
 from math import ceil
-from typing import Iterable, Sequence, TypeVar
+from typing import Any, Callable, Generic, Iterable, Sequence, TypeVar
 
 from pydantic import BaseModel
+from sqlalchemy import ColumnElement, and_, or_
+
+from .errors import http_error
 
 
 T = TypeVar("T")
@@ -18,6 +25,16 @@ class PaginatedResponse(BaseModel):
     pages: int
 
 
+@dataclass
+class Page(Generic[T]):
+    """A page of rows returned by a repository listing."""
+
+    items: list[T]
+    total: int
+    next_cursor: str | None = None
+    total_estimated: bool = False
+
+
 def paginate_items(items: Sequence[T], total: int, page: int, page_size: int) -> PaginatedResponse:
     pages = ceil(total / page_size) if page_size else 1
     return PaginatedResponse(items=items, total=total, page=page, page_size=page_size, pages=pages)
@@ -26,3 +43,35 @@ def paginate_items(items: Sequence[T], total: int, page: int, page_size: int) ->
 def apply_pagination(query, page: int, page_size: int):
     offset = (page - 1) * page_size
     return query.offset(offset).limit(page_size)
+
+
+def encode_cursor(kind: str, values: Sequence[Any]) -> str:
+    """Encode the sort key of the last row on a page into an opaque cursor."""
+    payload = {
+        "k": kind,
+        "v": [value.isoformat() if hasattr(value, "isoformat") else value for value in values],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, kind: str, parsers: Sequence[Callable[[Any], Any]]) -> list[Any]:
+    """Decode a cursor produced by :func:`encode_cursor` for the same ``kind``."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        values = payload["v"]
+        if payload["k"] != kind or len(values) != len(parsers):
+            raise ValueError("cursor does not match listing")
+        return [parse(value) for parse, value in zip(parsers, values, strict=True)]
+    except (binascii.Error, KeyError, TypeError, ValueError) as exc:
+        raise http_error(status_code=400, detail="Invalid cursor") from exc
+
+
+def seek_after(
+    column: ColumnElement, id_column: ColumnElement, value: Any, last_id: int, *, descending: bool
+) -> ColumnElement:
+    """Keyset predicate selecting rows after ``(value, last_id)`` in ``(column, id)`` order."""
+    if descending:
+        return or_(column < value, and_(column == value, id_column < last_id))
+    return or_(column > value, and_(column == value, id_column > last_id))
@@ -0,0 +1,387 @@
+"""In-process full-text search index for the catalog."""
+from __future__ import annotations
+
+import bisect
+import heapq
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+_TOKEN_RE = re.compile(r"\w+")
+
+FIELD_WEIGHTS = {"name": 2.0, "sku": 3.0, "description": 1.0}
+MAX_PREFIX_EXPANSIONS = 50
+# Fuzzy matching: vocabulary terms sharing the most trigrams with a query term
+# are re-ranked by edit distance; both sets are capped to keep latency flat.
+MIN_FUZZY_LENGTH = 3
+MAX_FUZZY_CANDIDATES = 64
+MAX_FUZZY_EXPANSIONS = 8
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Split text into lowercase word tokens."""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def trigrams(term: str) -> set[str]:
+    padded = f"${term}$"
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def max_edits(term: str) -> int:
+    """Typos tolerated for ``term``: one up to five characters, two from six."""
+    return 2 if len(term) >= 6 else 1
+
+
+def _query_trigrams(term: str) -> set[str]:
+    """Trigrams of ``term`` and of each adjacent swap, so "sfot" still reaches "soft"."""
+    grams = trigrams(term)
+    for i in range(len(term) - 1):
+        grams |= trigrams(term[:i] + term[i + 1] + term[i] + term[i + 2 :])
+    return grams
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or ``limit + 1`` once it exceeds ``limit``.
+
+    Counts insertions, deletions, substitutions and adjacent transpositions.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            )
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, previous2[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+def _fuzzy_indexable(term: str) -> bool:
+    return len(term) >= MIN_FUZZY_LENGTH and term.isalpha()
+
+
+def _sku_terms(sku: str | None) -> list[str]:
+    tokens = tokenize(sku)
+    compact = "".join(tokens)
+    if compact and compact not in tokens:
+        tokens.append(compact)
+    return tokens
+
+
+@dataclass(slots=True)
+class IndexedProduct:
+    id: int
+    price_cents: int
+    category_id: int | None
+    length: float
+    terms: tuple[str, ...]
+
+
+class ProductSearchIndex:
+    """Tokenizing inverted index over product name, SKU and description.
+
+    Only active products are indexed. Results are ranked with BM25 and can be
+    narrowed by category and price so that a page of ids is resolved without
+    touching the database. Alphabetic terms are also indexed by trigram so that
+    fuzzy searches can correct typos in query terms that match nothing.
+    """
+
+    def __init__(self, *, k1: float = 1.2, b: float = 0.75) -> None:
+        self.k1 = k1
+        self.b = b
+        self.ready = False
+        self._postings: dict[str, dict[int, float]] = {}
+        self._docs: dict[int, IndexedProduct] = {}
+        self._vocabulary: list[str] = []
+        self._trigrams: dict[str, set[str]] = {}
+        self._total_length = 0.0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def clear(self) -> None:
+        self.ready = False
+        self._postings.clear()
+        self._docs.clear()
+        self._vocabulary.clear()
+        self._trigrams.clear()
+        self._total_length = 0.0
+
+    def add(self, product: Any) -> None:
+        """Add ``product`` during a bulk load; call :meth:`finish` afterwards."""
+        if product.is_active:
+            self._add(product, keep_sorted=False)
+
+    def finish(self) -> None:
+        self._vocabulary = sorted(self._postings)
+        self.ready = True
+
+    def load(self, products: Iterable[Any]) -> None:
+        """Replace the index contents with ``products`` and mark it ready."""
+        self.clear()
+        for product in products:
+            self.add(product)
+        self.finish()
+
+    def upsert(self, product: Any) -> None:
+        """Index ``product`` or drop it when it is no longer active."""
+        self.remove(product.id)
+        if product.is_active:
+            self._add(product, keep_sorted=True)
+
+    def remove(self, product_id: int) -> None:
+        doc = self._docs.pop(product_id, None)
+        if doc is None:
+            return
+        self._total_length -= doc.length
+        for term in doc.terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[term]
+                pos = bisect.bisect_left(self._vocabulary, term)
+                if pos < len(self._vocabulary) and self._vocabulary[pos] == term:
+                    del self._vocabulary[pos]
+                if _fuzzy_indexable(term):
+                    for gram in trigrams(term):
+                        terms = self._trigrams[gram]
+                        terms.discard(term)
+                        if not terms:
+                            del self._trigrams[gram]
+
+    def search(
+        self,
+        q: str,
+        *,
+        category_id: int | None = None,
+        category_ids: frozenset[int] | None = None,
+        min_price: int | None = None,
+        max_price: int | None = None,
+        sort: str | None = None,
+        offset: int = 0,
+        limit: int = 20,
+        fuzzy: bool = False,
+    ) -> tuple[list[int], int] | None:
+        """Return a page of matching product ids and the total match count.
+
+        Every query term must match; the last term also matches as a prefix so
+        partially typed words still find products. ``category_ids`` restricts
+        matches to a set of categories (e.g. a subtree). With ``fuzzy``, a term
+        that matches nothing is replaced by the closest vocabulary terms within
+        :func:`max_edits`, scored lower the more edits they need. Returns
+        ``None`` when the query has no searchable tokens.
+        """
+        match = self._match(
+            q,
+            category_id=category_id,
+            category_ids=category_ids,
+            min_price=min_price,
+            max_price=max_price,
+            fuzzy=fuzzy,
+        )
+        if match is None:
+            return None
+        scores, matched = match
+        docs = self._docs
+        total = len(matched)
+        window = offset + limit
+        if sort == "price_asc":
+            ranked = heapq.nsmallest(window, matched, key=lambda i: (docs[i].price_cents, -i))
+        elif sort == "price_desc":
+            ranked = heapq.nlargest(window, matched, key=lambda i: (docs[i].price_cents, i))
+        else:
+            ranked = heapq.nlargest(window, matched, key=lambda i: (scores[i], i))
+        return ranked[offset:window], total
+
+    def match_documents(
+        self,
+        q: str,
+        *,
+        category_id: int | None = None,
+        category_ids: frozenset[int] | None = None,
+        min_price: int | None = None,
+        max_price: int | None = None,
+        fuzzy: bool = False,
+    ) -> list[IndexedProduct] | None:
+        """Every document :meth:`search` matches for the same arguments, unranked.
+
+        Returns ``None`` when the query has no searchable tokens.
+        """
+        match = self._match(
+            q,
+            category_id=category_id,
+            category_ids=category_ids,
+            min_price=min_price,
+            max_price=max_price,
+            fuzzy=fuzzy,
+        )
+        if match is None:
+            return None
+        docs = self._docs
+        return [docs[doc_id] for doc_id in match[1]]
+
+    def _match(
+        self,
+        q: str,
+        *,
+        category_id: int | None,
+        category_ids: frozenset[int] | None,
+        min_price: int | None,
+        max_price: int | None,
+        fuzzy: bool,
+    ) -> tuple[dict[int, float], list[int]] | None:
+        """BM25 scores of the documents matching every term, and the ids passing the filters."""
+        terms = tokenize(q)
+        if not terms:
+            return None
+
+        scores: dict[int, float] | None = None
+        for position, term in enumerate(terms):
+            expansions = self._expand(term, prefix=position == len(terms) - 1)
+            if expansions:
+                term_scores = self._score_terms(expansions)
+            elif fuzzy:
+                term_scores = self._score_terms(*self._expand_fuzzy(term))
+            else:
+                term_scores = {}
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    doc_id: score + term_scores[doc_id]
+                    for doc_id, score in scores.items()
+                    if doc_id in term_scores
+                }
+            if not scores:
+                return {}, []
+
+        assert scores is not None
+        docs = self._docs
+        filtered = category_id or category_ids is not None
+        if filtered or min_price is not None or max_price is not None:
+            matched = []
+            for doc_id in scores:
+                doc = docs[doc_id]
+                if category_id and doc.category_id != category_id:
+                    continue
+                if category_ids is not None and doc.category_id not in category_ids:
+                    continue
+                if min_price is not None and doc.price_cents < min_price:
+                    continue
+                if max_price is not None and doc.price_cents > max_price:
+                    continue
+                matched.append(doc_id)
+        else:
+            matched = list(scores)
+
+        return scores, matched
+
+    def _add(self, product: Any, *, keep_sorted: bool) -> None:
+        weighted: dict[str, float] = {}
+        for field, tokens in (
+            ("name", tokenize(product.name)),
+            ("sku", _sku_terms(product.sku)),
+            ("description", tokenize(product.description)),
+        ):
+            weight = FIELD_WEIGHTS[field]
+            for token in tokens:
+                weighted[token] = weighted.get(token, 0.0) + weight
+
+        length = sum(weighted.values())
+        for term, tf in weighted.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                if keep_sorted:
+                    bisect.insort(self._vocabulary, term)
+                if _fuzzy_indexable(term):
+                    for gram in trigrams(term):
+                        self._trigrams.setdefault(gram, set()).add(term)
+            postings[product.id] = tf
+        self._docs[product.id] = IndexedProduct(
+            id=product.id,
+            price_cents=product.price_cents,
+            category_id=product.category_id,
+            length=length,
+            terms=tuple(weighted),
+        )
+        self._total_length += length
+
+    def _expand(self, term: str, *, prefix: bool) -> list[str]:
+        if not prefix:
+            return [term] if term in self._postings else []
+        vocabulary = self._vocabulary
+        start = bisect.bisect_left(vocabulary, term)
+        expansions = []
+        for candidate in vocabulary[start : start + MAX_PREFIX_EXPANSIONS]:
+            if not candidate.startswith(term):
+                break
+            expansions.append(candidate)
+        return expansions
+
+    def _expand_fuzzy(self, term: str) -> tuple[list[str], list[float]]:
+        """Vocabulary terms within :func:`max_edits` of ``term`` and their score weights."""
+        if len(term) < MIN_FUZZY_LENGTH:
+            return [], []
+        limit = max_edits(term)
+        shared: dict[str, int] = {}
+        for gram in _query_trigrams(term):
+            for candidate in self._trigrams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        candidates = heapq.nlargest(
+            MAX_FUZZY_CANDIDATES,
+            (candidate for candidate in shared if abs(len(candidate) - len(term)) <= limit),
+            key=lambda candidate: (shared[candidate], candidate),
+        )
+        scored = []
+        for candidate in candidates:
+            distance = edit_distance(term, candidate, limit)
+            if distance <= limit:
+                scored.append((distance, -len(self._postings[candidate]), candidate))
+        scored = heapq.nsmallest(MAX_FUZZY_EXPANSIONS, scored)
+        return (
+            [candidate for _, _, candidate in scored],
+            [1 / (1 + distance) for distance, _, _ in scored],
+        )
+
+    def _score_terms(
+        self, terms: list[str], weights: list[float] | None = None
+    ) -> dict[int, float]:
+        doc_count = len(self._docs)
+        if not doc_count:
+            return {}
+        avg_length = self._total_length / doc_count or 1.0
+        k1, b = self.k1, self.b
+        docs = self._docs
+        scores: dict[int, float] = {}
+        for position, term in enumerate(terms):
+            postings = self._postings[term]
+            df = len(postings)
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            if weights is not None:
+                idf *= weights[position]
+            for doc_id, tf in postings.items():
+                norm = k1 * (1 - b + b * docs[doc_id].length / avg_length)
+                score = idf * tf * (k1 + 1) / (tf + norm)
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+        return scores
+
+
+product_search_index = ProductSearchIndex()
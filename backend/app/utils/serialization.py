@@ -0,0 +1,87 @@
+"""JSON encoding helpers for hot read paths."""
+from __future__ import annotations
+
+import datetime as dt
+import json
+from typing import Any, Callable, Hashable, Sequence
+
+from pydantic import TypeAdapter
+
+from .cache import TTLCache
+
+try:  # optional dependency (poetry install -E speedups)
+    import orjson
+except ImportError:  # pragma: no cover - exercised when orjson is not installed
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (dt.datetime, dt.date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    """Compact UTF-8 JSON, matching pydantic's output; uses orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=_default).encode()
+
+
+def page_body(items: Sequence[bytes], **fields: Any) -> bytes:
+    """A ``Paginated``-shaped object from pre-encoded ``items`` and the remaining fields."""
+    body = b'{"items":[' + b",".join(items) + b"]"
+    if fields:
+        body += b"," + dumps(fields)[1:]
+    else:
+        body += b"}"
+    return body
+
+
+class FragmentEncoder:
+    """Encodes objects through a pydantic model, reusing bytes while ``version`` is unchanged.
+
+    ``cache`` maps ``(id, version)`` to the encoded object, so a changed object
+    misses and its outdated entry ages out of the LRU. Only the misses are
+    validated, in one batched ``TypeAdapter`` call. Without ``version`` nothing
+    is cached and every call encodes the whole batch.
+    """
+
+    def __init__(
+        self,
+        model: type[Any],
+        *,
+        version: Callable[[Any], Hashable] | None = None,
+        cache: TTLCache[bytes] | None = None,
+    ) -> None:
+        self.adapter: TypeAdapter[list[Any]] = TypeAdapter(list[model])
+        self.version = version
+        self.cache = cache if version is not None else None
+
+    def encode(self, objects: Sequence[Any]) -> list[bytes]:
+        encoded: list[bytes | None] = [None] * len(objects)
+        stale: list[tuple[int, Hashable]] = []
+        cache = self.cache
+        for position, obj in enumerate(objects):
+            if cache is None:
+                stale.append((position, None))
+                continue
+            key = (obj.id, self.version(obj))
+            fragment = cache.get(key)
+            if fragment is not None:
+                encoded[position] = fragment
+            else:
+                stale.append((position, key))
+        if stale:
+            models = self.adapter.validate_python(
+                [objects[position] for position, _ in stale], from_attributes=True
+            )
+            for (position, key), data in zip(
+                stale, self.adapter.dump_python(models, mode="json")
+            ):
+                fragment = dumps(data)
+                encoded[position] = fragment
+                if cache is not None:
+                    cache.set(key, fragment)
+        return encoded  # type: ignore[return-value]
+
@@ -0,0 +1,182 @@
+"""Popularity-weighted prefix index for search-box autocomplete."""
+from __future__ import annotations
+
+import bisect
+import heapq
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+from .search import tokenize
+
+_MAX_CHAR = "\U0010ffff"
+
+
+@dataclass(slots=True)
+class Suggestion:
+    id: int
+    name: str
+    slug: str
+    sku: str
+    price_cents: int
+
+
+def suggestion_keys(product: Any) -> set[str]:
+    """Every word-start suffix of the product name, plus the SKU.
+
+    Keys are normalized like queries, so "Wireless Headphones" is found by
+    "wir", "wireless h" and "head", and "HP-001" by "hp-0" and "hp 001".
+    """
+    words = tokenize(product.name)
+    keys = {" ".join(words[start:]) for start in range(len(words))}
+    sku = " ".join(tokenize(product.sku))
+    if sku:
+        keys.add(sku)
+    return keys
+
+
+class SuggestionIndex:
+    """Sorted ``(key, product id)`` entries answered by binary search.
+
+    A prefix selects one contiguous run of entries, ranked by units sold and
+    then by shorter name. Runs longer than ``hot_range`` (short prefixes such
+    as "s") keep their top ``top_k`` ids in a memo. Writes and sales patch the
+    memoized lists of the prefixes they touch in place; only removing a listed
+    product or lowering its score (a cancelled sale) forces a recompute.
+    """
+
+    def __init__(self, *, top_k: int = 20, hot_range: int = 256, memo_size: int = 4096) -> None:
+        self.top_k = top_k
+        self.hot_range = hot_range
+        self.memo_size = memo_size
+        self.ready = False
+        self._entries: list[tuple[str, int]] = []
+        self._keys: dict[int, set[str]] = {}
+        self._products: dict[int, Suggestion] = {}
+        self._sales: dict[int, int] = {}
+        self._memo: dict[str, list[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+    def clear(self) -> None:
+        self.ready = False
+        self._entries = []
+        self._keys = {}
+        self._products = {}
+        self._sales = {}
+        self._memo = {}
+
+    def add(self, product: Any) -> None:
+        """Add a product during a rebuild; call :meth:`finish` afterwards."""
+        self._store(product)
+        self._entries.extend((key, product.id) for key in self._keys[product.id])
+
+    def set_sales(self, sales: dict[int, int]) -> None:
+        self._sales = dict(sales)
+        self._memo.clear()
+
+    def finish(self) -> None:
+        self._entries.sort()
+        self.ready = True
+
+    def load(self, products: Iterable[Any], sales: dict[int, int] | None = None) -> None:
+        self.clear()
+        for product in products:
+            if product.is_active:
+                self.add(product)
+        self.set_sales(sales or {})
+        self.finish()
+
+    def upsert(self, product: Any) -> None:
+        """Index ``product`` or drop it when it is no longer active."""
+        self.remove(product.id)
+        if not product.is_active:
+            return
+        self._store(product)
+        for key in self._keys[product.id]:
+            bisect.insort(self._entries, (key, product.id))
+        self._offer(product.id)
+
+    def remove(self, product_id: int) -> None:
+        keys = self._keys.get(product_id)
+        if keys is None:
+            return
+        self._forget(product_id)
+        del self._keys[product_id]
+        del self._products[product_id]
+        for key in keys:
+            pos = bisect.bisect_left(self._entries, (key, product_id))
+            if pos < len(self._entries) and self._entries[pos] == (key, product_id):
+                del self._entries[pos]
+
+    def record_sale(self, product_id: int, qty: int) -> None:
+        """Add ``qty`` units to the product's score; negative for a cancelled sale."""
+        self._sales[product_id] = self._sales.get(product_id, 0) + qty
+        if product_id not in self._keys:
+            return
+        if qty >= 0:
+            self._offer(product_id)
+        else:
+            self._forget(product_id)
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[Suggestion]:
+        needle = " ".join(tokenize(prefix))
+        if not needle:
+            return []
+        limit = min(limit, self.top_k)
+        ranked = self._memo.get(needle)
+        if ranked is None:
+            lo = bisect.bisect_left(self._entries, (needle,))
+            hi = bisect.bisect_left(self._entries, (needle + _MAX_CHAR,), lo)
+            ids = {product_id for _, product_id in self._entries[lo:hi]}
+            if hi - lo > self.hot_range:
+                ranked = heapq.nsmallest(self.top_k, ids, key=self._rank)
+                if len(self._memo) >= self.memo_size:
+                    self._memo.clear()
+                self._memo[needle] = ranked
+            else:
+                ranked = heapq.nsmallest(limit, ids, key=self._rank)
+        return [self._products[product_id] for product_id in ranked[:limit]]
+
+    def _rank(self, product_id: int) -> tuple[int, int, str, int]:
+        name = self._products[product_id].name
+        return (-self._sales.get(product_id, 0), len(name), name, product_id)
+
+    def _memoized_prefixes(self, product_id: int) -> set[str]:
+        memo = self._memo
+        return {
+            key[:end]
+            for key in self._keys[product_id]
+            for end in range(1, len(key) + 1)
+            if key[:end] in memo
+        }
+
+    def _forget(self, product_id: int) -> None:
+        """Drop memoized lists that rank ``product_id``; the next read recomputes them."""
+        for prefix in self._memoized_prefixes(product_id):
+            if product_id in self._memo[prefix]:
+                del self._memo[prefix]
+
+    def _offer(self, product_id: int) -> None:
+        """Re-rank memoized lists for prefixes of ``product_id`` after its score rose."""
+        for prefix in self._memoized_prefixes(product_id):
+            ranked = self._memo[prefix]
+            if product_id not in ranked:
+                if len(ranked) >= self.top_k and self._rank(product_id) > self._rank(ranked[-1]):
+                    continue
+                ranked.append(product_id)
+            ranked.sort(key=self._rank)
+            del ranked[self.top_k :]
+
+    def _store(self, product: Any) -> None:
+        self._keys[product.id] = suggestion_keys(product)
+        self._products[product.id] = Suggestion(
+            id=product.id,
+            name=product.name,
+            slug=product.slug,
+            sku=product.sku,
+            price_cents=product.price_cents,
+        )
+
+
+product_suggestions = SuggestionIndex()
@@ -0,0 +1,177 @@
+"""Concurrent checkout load test: throughput, latency and oversell check.
+
+Every buyer has a draft cart holding one unit of the same hot product plus
+``--lines - 1`` filler products, and the hot product has less stock than there
+are buyers. Buyers check out concurrently; each sold order must have taken a
+hot unit, so the run verifies ``sold <= stock`` and ``final stock == stock - sold``.
+Attempts that hit a lock conflict (SQLite's single writer) are rolled back and
+retried, as a client would. ``--shards N`` splits the hot product's stock across
+N counter rows (see ``Product.stock_shards``); row contention only shows up on a
+server database (``--database-url mysql+aiomysql://...``).
+
+Usage::
+
+    poetry run python -m benchmarks.checkout_benchmark --buyers 500 --stock 200 --concurrency 50
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from pathlib import Path
+
+from fastapi import HTTPException
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.query_stats import instrument_engine, track_queries
+from app.db.session import Base
+from app.models.cart import Cart, CartItem, CartStatus
+from app.models.order import OrderItem
+from app.models.product import Product
+from app.models.user import User
+from app.repositories.carts import CartLoad, CartRepository
+from app.repositories.orders import OrderRepository
+from app.repositories.products import ProductRepository, available_stock
+from app.services.orders import OrderService
+
+from .common import product_row
+
+
+async def seed(session_factory, buyers: int, stock: int, lines: int, shards: int) -> int:
+    rng = random.Random(buyers)
+    async with session_factory() as session:
+        hot = dict(product_row(0, rng), stock=stock)
+        fillers = [dict(product_row(idx, rng), stock=buyers * 10) for idx in range(1, 200)]
+        await session.execute(insert(Product), [hot, *fillers])
+        ids = list(await session.scalars(select(Product.id).order_by(Product.id)))
+        hot_id, filler_ids = ids[0], ids[1:]
+        await session.execute(
+            insert(User),
+            [
+                {"email": f"buyer{idx}@example.com", "hashed_password": "x", "full_name": "Buyer"}
+                for idx in range(buyers)
+            ],
+        )
+        user_ids = list(await session.scalars(select(User.id).order_by(User.id)))
+        await session.execute(
+            insert(Cart), [{"user_id": user_id, "status": CartStatus.draft} for user_id in user_ids]
+        )
+        cart_ids = list(await session.scalars(select(Cart.id).order_by(Cart.id)))
+        items = []
+        for cart_id in cart_ids:
+            items.append({"cart_id": cart_id, "product_id": hot_id, "qty": 1})
+            for product_id in rng.sample(filler_ids, lines - 1):
+                items.append({"cart_id": cart_id, "product_id": product_id, "qty": 1})
+        await session.execute(insert(CartItem), items)
+        if shards:
+            await ProductRepository(session).create_stock_shards(hot_id, stock, shards)
+            await session.execute(
+                update(Product).where(Product.id == hot_id).values(stock_shards=shards)
+            )
+        await session.commit()
+    return hot_id
+
+
+async def run(args: argparse.Namespace) -> None:
+    db_path = Path("bench_checkout.db")
+    db_path.unlink(missing_ok=True)
+    url = args.database_url or f"sqlite+aiosqlite:///./{db_path}"
+    connect_args = {"timeout": 30} if url.startswith("sqlite") else {}
+    engine = create_async_engine(url, pool_size=args.concurrency, connect_args=connect_args)
+    instrument_engine(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    hot_id = await seed(session_factory, args.buyers, args.stock, args.lines, args.shards)
+    async with session_factory() as session:
+        user_ids = list(await session.scalars(select(User.id)))
+
+    outcomes = {"sold": 0, "rejected": 0, "retries": 0}
+    latencies: list[float] = []
+    statements: list[int] = []
+    gate = asyncio.Semaphore(args.concurrency)
+
+    async def buy(user_id: int) -> None:
+        async with gate:
+            started = time.perf_counter()
+            while True:
+                async with session_factory() as session:
+                    service = OrderService(
+                        orders=OrderRepository(session),
+                        products=ProductRepository(session),
+                        session=session,
+                    )
+                    try:
+                        cart = await CartRepository(session).get_user_draft_cart(
+                            user_id, load=CartLoad.items
+                        )
+                        with track_queries() as stats:
+                            await service.checkout(cart)
+                        await session.commit()
+                    except HTTPException:
+                        await session.rollback()
+                        outcomes["rejected"] += 1
+                    except OperationalError:
+                        await session.rollback()
+                        outcomes["retries"] += 1
+                        await asyncio.sleep(random.uniform(0, 0.01))
+                        continue
+                    else:
+                        outcomes["sold"] += 1
+                        statements.append(stats.count)
+                    break
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(buy(user_id) for user_id in user_ids))
+    elapsed = time.perf_counter() - started
+
+    async with session_factory() as session:
+        final_stock = await session.scalar(select(available_stock()).where(Product.id == hot_id))
+        sold_units = await session.scalar(
+            select(func.coalesce(func.sum(OrderItem.qty), 0)).where(OrderItem.product_id == hot_id)
+        )
+    await engine.dispose()
+    db_path.unlink(missing_ok=True)
+
+    latencies.sort()
+    oversold = max(0, sold_units - args.stock)
+    consistent = final_stock == args.stock - sold_units
+    print(
+        f"buyers={args.buyers} stock={args.stock} lines={args.lines} shards={args.shards} "
+        f"concurrency={args.concurrency} dialect={engine.dialect.name}"
+    )
+    print(
+        f"  sold {outcomes['sold']} rejected {outcomes['rejected']} "
+        f"retries {outcomes['retries']} | oversold {oversold} | "
+        f"stock {args.stock} -> {final_stock} (consistent: {consistent})"
+    )
+    print(
+        f"  {len(user_ids) / elapsed:7.1f} checkouts/s | "
+        f"p50 {statistics.median(latencies):7.2f}ms "
+        f"p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]:7.2f}ms | "
+        f"statements per checkout {min(statements)}-{max(statements)}"
+    )
+    if oversold or not consistent:
+        raise SystemExit("inventory invariant violated")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--buyers", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--shards", type=int, default=0, help="stock shards for the hot product")
+    parser.add_argument("--database-url", default=None, help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
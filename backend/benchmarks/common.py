@@ -0,0 +1,56 @@
+"""Shared helpers for benchmark scripts."""
+from __future__ import annotations
+
+import os
+import random
+import statistics
+import time
+from typing import Awaitable, Callable
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./bench.db")
+os.environ.setdefault("FRONTEND_ORIGIN", "http://localhost:5173")
+os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "bench-secret")
+os.environ.setdefault("METRICS_ENABLED", "0")
+
+ADJECTIVES = [
+    "wireless", "compact", "premium", "classic", "portable", "ergonomic", "vintage", "smart",
+    "organic", "rugged", "slim", "deluxe", "eco", "modular", "heavy", "silent", "bright", "soft",
+]
+NOUNS = [
+    "headphones", "keyboard", "backpack", "jacket", "lamp", "grinder", "kettle", "speaker",
+    "monitor", "sneakers", "blender", "tripod", "wallet", "charger", "notebook", "mug", "tent",
+    "drone", "watch", "scarf", "cable", "router", "camera", "chair",
+]
+FILLER = [f"word{i}" for i in range(2000)]
+
+
+def product_row(idx: int, rng: random.Random) -> dict:
+    adjective = rng.choice(ADJECTIVES)
+    noun = rng.choice(NOUNS)
+    description = " ".join(rng.choices(FILLER, k=8) + [adjective, noun])
+    return {
+        "sku": f"SKU-{idx:07d}",
+        "name": f"{adjective.title()} {noun.title()} {idx}",
+        "slug": f"{adjective}-{noun}-{idx}",
+        "description": description,
+        "price_cents": rng.randint(100, 100_000),
+        "currency": "USD",
+        "stock": rng.randint(0, 50),
+        "is_active": True,
+        "category_id": None,
+    }
+
+
+async def measure(call: Callable[[], Awaitable[object]], iterations: int) -> dict[str, float]:
+    """Run ``call`` repeatedly and return latency percentiles in milliseconds."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50": statistics.median(samples),
+        "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+    }
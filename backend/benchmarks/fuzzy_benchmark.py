@@ -0,0 +1,101 @@
+"""Measure recall and latency of fuzzy catalog search on misspelled queries.
+
+Each query is "<adjective> <noun>" taken from a real product, with one or two
+random edits (deletion, insertion, substitution or transposition) applied to a
+word. A query is recalled when the top page contains a product whose name has
+both original words.
+
+Usage::
+
+    poetry run python -m benchmarks.fuzzy_benchmark --sizes 10000,100000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import string
+import time
+from types import SimpleNamespace
+
+from app.utils.search import ProductSearchIndex, max_edits, tokenize
+
+from .common import product_row
+
+
+def misspell(word: str, edits: int, rng: random.Random) -> str:
+    for _ in range(edits):
+        pos = rng.randrange(len(word))
+        kind = rng.choice(("delete", "insert", "substitute", "transpose"))
+        if kind == "delete" and len(word) > 4:
+            word = word[:pos] + word[pos + 1 :]
+        elif kind == "insert":
+            word = word[:pos] + rng.choice(string.ascii_lowercase) + word[pos:]
+        elif kind == "transpose" and pos < len(word) - 1:
+            word = word[:pos] + word[pos + 1] + word[pos] + word[pos + 2 :]
+        else:
+            word = word[:pos] + rng.choice(string.ascii_lowercase) + word[pos + 1 :]
+    return word
+
+
+def corpus(products: list[SimpleNamespace], count: int, rng: random.Random) -> list[tuple]:
+    queries = []
+    while len(queries) < count:
+        words = tokenize(rng.choice(products).name)[:2]
+        target = rng.randrange(2)
+        typo = misspell(words[target], rng.randint(1, max_edits(words[target])), rng)
+        if typo == words[target]:
+            continue
+        query = list(words)
+        query[target] = typo
+        queries.append((" ".join(query), frozenset(words)))
+    return queries
+
+
+def run(size: int, iterations: int, page_size: int) -> None:
+    rng = random.Random(size)
+    products = [SimpleNamespace(id=idx, **product_row(idx, rng)) for idx in range(size)]
+    index = ProductSearchIndex()
+    started = time.perf_counter()
+    index.load(products)
+    build_seconds = time.perf_counter() - started
+    names = {product.id: frozenset(tokenize(product.name)) for product in products}
+
+    queries = corpus(products, iterations, random.Random(42))
+    results = {}
+    for label, fuzzy in (("exact", False), ("fuzzy", True)):
+        samples = []
+        recalled = 0
+        for query, words in queries:
+            start = time.perf_counter()
+            ids, _ = index.search(query, limit=page_size, fuzzy=fuzzy)
+            samples.append((time.perf_counter() - start) * 1000)
+            recalled += any(words <= names[product_id] for product_id in ids)
+        samples.sort()
+        results[label] = {
+            "recall": recalled / len(queries),
+            "p50": statistics.median(samples),
+            "p99": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+        }
+
+    print(
+        f"{size:>9,} products | index build {build_seconds:6.2f}s | "
+        + " | ".join(
+            f"{label} recall {r['recall']:6.1%} p50 {r['p50']:6.2f}ms p99 {r['p99']:6.2f}ms"
+            for label, r in results.items()
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=20)
+    args = parser.parse_args()
+    for size in (int(value) for value in args.sizes.split(",")):
+        run(size, args.iterations, args.page_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare catalog search latency: LIKE scan vs in-memory inverted index.
+
+Usage::
+
+    poetry run python -m benchmarks.search_benchmark --sizes 10000,100000,1000000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.session import Base
+from app.models.product import Product
+from app.repositories.products import ProductRepository
+from app.utils.search import ProductSearchIndex
+
+from .common import ADJECTIVES, NOUNS, measure, product_row
+
+
+async def seed(session_factory, size: int, batch_size: int = 10_000) -> None:
+    rng = random.Random(size)
+    async with session_factory() as session:
+        for start in range(0, size, batch_size):
+            rows = [product_row(idx, rng) for idx in range(start, min(size, start + batch_size))]
+            await session.execute(insert(Product), rows)
+        await session.commit()
+
+
+async def run(size: int, iterations: int) -> None:
+    db_path = Path(f"bench_search_{size}.db")
+    db_path.unlink(missing_ok=True)
+    engine = create_async_engine(f"sqlite+aiosqlite:///./{db_path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    await seed(session_factory, size)
+
+    index = ProductSearchIndex()
+    async with session_factory() as session:
+        started = time.perf_counter()
+        index.clear()
+        async for row in ProductRepository(session).iter_search_documents():
+            index.add(row)
+        index.finish()
+        build_seconds = time.perf_counter() - started
+
+    rng = random.Random(42)
+    queries = [
+        rng.choice(NOUNS) if i % 2 else f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+        for i in range(iterations)
+    ]
+
+    async with session_factory() as session:
+        like_repo = ProductRepository(session)
+        index_repo = ProductRepository(session, search_index=index)
+        results = {}
+        for label, repo in (("like", like_repo), ("index", index_repo)):
+            it = iter(queries)
+
+            async def call(repo=repo, it=it):
+                return await repo.search(q=next(it), page=1, page_size=20)
+
+            results[label] = await measure(call, iterations)
+
+    print(
+        f"{size:>9,} products | index build {build_seconds:6.2f}s | "
+        f"LIKE p50 {results['like']['p50']:8.2f}ms p99 {results['like']['p99']:8.2f}ms | "
+        f"index p50 {results['index']['p50']:7.2f}ms p99 {results['index']['p99']:7.2f}ms"
+    )
+    await engine.dispose()
+    db_path.unlink(missing_ok=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    for size in (int(value) for value in args.sizes.split(",")):
+        asyncio.run(run(size, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Compare response serialization for product listings and the admin order list.
+
+"before" is the per-row ``model_validate`` path (for orders also FastAPI's
+``response_model`` round trip); "after" is the batched ``TypeAdapter`` path,
+with product fragments both cold and served from the fragment cache.
+Rows are transient ORM instances, so no database is involved.
+
+Usage::
+
+    poetry run python -m benchmarks.serialization_benchmark --page-size 100
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime as dt
+import random
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product, ProductImage
+from app.schemas.common import Paginated
+from app.schemas.order import OrderOut
+from app.schemas.product import ProductOut, ProductPage
+from app.services.catalog import product_version
+from app.utils.cache import TTLCache
+from app.utils.serialization import FragmentEncoder, orjson, page_body
+
+from .common import measure, product_row
+
+
+def products(count: int, rng: random.Random) -> list[Product]:
+    rows = []
+    for idx in range(count):
+        product = Product(id=idx + 1, created_at=dt.datetime(2024, 1, 1), **product_row(idx, rng))
+        product.images = [
+            ProductImage(id=idx * 3 + n, url=f"https://cdn.example.com/p/{idx}/{n}.jpg", alt=None)
+            for n in range(3)
+        ]
+        rows.append(product)
+    return rows
+
+
+def orders(count: int, rng: random.Random) -> list[Order]:
+    rows = []
+    for idx in range(count):
+        items = [
+            OrderItem(
+                id=idx * 5 + n,
+                product_id=rng.randint(1, 10_000),
+                sku_snapshot=f"SKU-{n:07d}",
+                name_snapshot="Wireless Headphones",
+                price_cents=rng.randint(100, 10_000),
+                qty=rng.randint(1, 3),
+            )
+            for n in range(rng.randint(1, 5))
+        ]
+        rows.append(
+            Order(
+                id=idx + 1,
+                status=OrderStatus.paid,
+                total_cents=sum(item.price_cents * item.qty for item in items),
+                currency="USD",
+                payment_ref=f"pay_{idx}",
+                created_at=dt.datetime(2024, 1, 1),
+                paid_at=dt.datetime(2024, 1, 2),
+                items=items,
+            )
+        )
+    return rows
+
+
+async def run(page_size: int, iterations: int) -> None:
+    rng = random.Random(page_size)
+    page = {
+        "total": 10_000,
+        "page": 1,
+        "page_size": page_size,
+        "pages": 10_000 // page_size,
+        "next_cursor": None,
+        "total_estimated": False,
+    }
+
+    product_rows = products(page_size, rng)
+
+    async def products_before():
+        items = [ProductOut.model_validate(product) for product in product_rows]
+        return ProductPage(items=items, **page).model_dump_json().encode()
+
+    cold = FragmentEncoder(ProductOut)
+
+    async def products_cold():
+        return page_body(cold.encode(product_rows), **page, facets=None)
+
+    warm = FragmentEncoder(
+        ProductOut, version=product_version, cache=TTLCache(maxsize=10_000, ttl=3600)
+    )
+
+    async def products_warm():
+        return page_body(warm.encode(product_rows), **page, facets=None)
+
+    assert await products_before() == await products_cold() == await products_warm()
+
+    order_rows = orders(page_size, rng)
+    field = create_model_field(name="response", type_=Paginated[OrderOut], mode="serialization")
+
+    async def orders_before():
+        items = [OrderOut.model_validate(order) for order in order_rows]
+        content = await serialize_response(
+            field=field, response_content=Paginated[OrderOut](items=items, **page)
+        )
+        return JSONResponse(content).body
+
+    order_encoder = FragmentEncoder(OrderOut)
+
+    async def orders_after():
+        return page_body(order_encoder.encode(order_rows), **page)
+
+    assert await orders_before() == await orders_after()
+
+    results = {
+        "list_products before": await measure(products_before, iterations),
+        "list_products after (cold)": await measure(products_cold, iterations),
+        "list_products after (cached)": await measure(products_warm, iterations),
+        "admin.list_orders before": await measure(orders_before, iterations),
+        "admin.list_orders after": await measure(orders_after, iterations),
+    }
+    print(f"page_size={page_size} encoder={'orjson' if orjson is not None else 'json'}")
+    for label, result in results.items():
+        print(f"  {label:<30} p50 {result['p50']:7.3f}ms p99 {result['p99']:7.3f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.page_size, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Compare filtered/sorted catalog listings: SQL vs the NumPy columnar snapshot.
+
+Usage::
+
+    poetry install -E columnar
+    poetry run python -m benchmarks.snapshot_benchmark --sizes 10000,100000,1000000
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+from pathlib import Path
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.db.session import Base
+from app.models.category import Category
+from app.models.product import Product
+from app.repositories.products import ProductRepository
+from app.utils.columnar import ProductSnapshot
+
+from .common import measure, product_row
+
+CATEGORIES = 50
+
+
+async def seed(session_factory, size: int, batch_size: int = 10_000) -> None:
+    rng = random.Random(size)
+    async with session_factory() as session:
+        await session.execute(
+            insert(Category),
+            [{"name": f"Category {i}", "slug": f"category-{i}"} for i in range(1, CATEGORIES + 1)],
+        )
+        for start in range(0, size, batch_size):
+            rows = []
+            for idx in range(start, min(size, start + batch_size)):
+                row = product_row(idx, rng)
+                row["category_id"] = rng.randint(1, CATEGORIES)
+                rows.append(row)
+            await session.execute(insert(Product), rows)
+        await session.commit()
+
+
+def listing_params(rng: random.Random) -> dict:
+    low = rng.randint(100, 80_000)
+    return {
+        "category_id": rng.choice([None, rng.randint(1, CATEGORIES)]),
+        "min_price": low,
+        "max_price": low + rng.randint(1_000, 20_000),
+        "sort": rng.choice(["price_asc", "price_desc", None]),
+        "page": rng.randint(1, 5),
+        "page_size": 20,
+    }
+
+
+async def run(size: int, iterations: int) -> None:
+    db_path = Path(f"bench_snapshot_{size}.db")
+    db_path.unlink(missing_ok=True)
+    engine = create_async_engine(f"sqlite+aiosqlite:///./{db_path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    await seed(session_factory, size)
+
+    snapshot = ProductSnapshot()
+    async with session_factory() as session:
+        started = time.perf_counter()
+        snapshot.clear()
+        async for row in ProductRepository(session).iter_snapshot_rows():
+            snapshot.add(row)
+        snapshot.finish()
+        build_seconds = time.perf_counter() - started
+
+    rng = random.Random(42)
+    params = [listing_params(rng) for _ in range(iterations)]
+    async with session_factory() as session:
+        results = {}
+        for label, repo in (
+            ("sql", ProductRepository(session)),
+            ("snapshot", ProductRepository(session, snapshot=snapshot)),
+        ):
+            it = iter(params)
+
+            async def call(repo=repo, it=it):
+                return await repo.search(**next(it))
+
+            results[label] = await measure(call, iterations)
+
+    print(
+        f"{size:>9,} products | build {build_seconds:6.2f}s | "
+        f"{snapshot.bytes_per_product():5.1f} B/product ({snapshot.nbytes / 2**20:7.1f} MiB) | "
+        f"SQL p50 {results['sql']['p50']:8.2f}ms p99 {results['sql']['p99']:8.2f}ms | "
+        f"snapshot p50 {results['snapshot']['p50']:7.2f}ms p99 {results['snapshot']['p99']:7.2f}ms"
+    )
+    await engine.dispose()
+    db_path.unlink(missing_ok=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    for size in (int(value) for value in args.sizes.split(",")):
+        asyncio.run(run(size, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
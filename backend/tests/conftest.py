@@ -3,7 +3,7 @@ from __future__ import annotations
 import asyncio
 import os
 from collections.abc import AsyncGenerator
-from typing import AsyncIterator
+from typing import Any, AsyncIterator, Callable, Iterator
 
 import pytest
 import pytest_asyncio
@@ -18,12 +18,20 @@ os.environ.setdefault("FRONTEND_ORIGIN", "http://localhost:5173")
 os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "15")
 os.environ.setdefault("REFRESH_TOKEN_EXPIRE_DAYS", "7")
 os.environ.setdefault("METRICS_ENABLED", "0")
+os.environ.setdefault("COUNT_CACHE_TTL_SECONDS", "0")
+os.environ.setdefault("CATALOG_CACHE_TTL_SECONDS", "0")
+os.environ.setdefault("QUERY_BUDGET_ENFORCED", "1")
 os.environ.setdefault("PAYMENT_WEBHOOK_SECRET", "test-shared-secret")
+os.environ.setdefault("STOCK_SHARD_SYNC_SECONDS", "0")
 
 from app.main import app  # noqa: E402
 from app.db.session import Base, async_session_factory, engine
 from app.models.category import Category
 from app.models.product import Product, ProductImage
+from app.repositories.categories import CategoryRepository
+from app.repositories.products import ProductRepository
+from app.services.catalog import CatalogService
+from app.utils.cache import catalog_cache, count_cache
 
 
 @pytest_asyncio.fixture(scope="session")
@@ -48,6 +56,42 @@ async def session() -> AsyncIterator:
         yield session
 
 
+@pytest.fixture
+def catalog_service(session) -> Callable[..., CatalogService]:
+    """Build a ``CatalogService`` on the test session with the given components.
+
+    A ``search_index`` or ``snapshot`` is wired into the product repository too.
+    """
+
+    def build(**components: Any) -> CatalogService:
+        products = ProductRepository(
+            session,
+            search_index=components.get("search_index"),
+            snapshot=components.get("snapshot"),
+        )
+        return CatalogService(
+            products=products, categories=CategoryRepository(session), **components
+        )
+
+    return build
+
+
+@pytest.fixture
+def cached_reads(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """Turn on the catalog and count caches, which the suite runs without.
+
+    Reads then go through the cached paths, so a test sees a stale value
+    unless the write that changed it evicted the entry after commit.
+    """
+    monkeypatch.setattr(catalog_cache, "ttl", 60)
+    monkeypatch.setattr(count_cache._entries, "ttl", 30)
+    catalog_cache.clear()
+    count_cache._entries.clear()
+    yield
+    catalog_cache.clear()
+    count_cache._entries.clear()
+
+
 @pytest_asyncio.fixture
 async def sample_catalog(session) -> AsyncIterator[None]:
     electronics = Category(name="Electronics", slug="electronics")
@@ -1,9 +1,32 @@
 from __future__ import annotations
 
+import asyncio
+from contextlib import suppress
+
 import pytest
+from asgi_lifespan import LifespanManager
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError, InvalidRequestError
 
+from app import main
+from app.core.config import settings
 from app.core.security import get_password_hash
+from app.db.query_stats import track_queries
+from app.main import app, sync_sharded_stock_once
+from app.models.cart import CartItem, CartStatus
+from app.models.order import Order, OrderItem
+from app.models.product import Product, ProductStockShard
 from app.models.user import User, UserRole
+from app.repositories.carts import CartLoad, CartRepository
+from app.repositories.orders import OrderRepository
+from app.repositories.products import ProductRepository
+from app.schemas.cart import CartBatch
+from app.schemas.product import ProductBulkUpdateItem
+from app.services.cart import CartService
+from app.services.orders import OrderService, PaymentProvider
+from app.utils.cache import cart_quotes
+from app.utils.suggest import product_suggestions
 
 
 async def create_user_and_login(client):
@@ -86,6 +109,11 @@ async def test_cart_checkout_flow(client, sample_catalog, session):
     assert response.json()["status"] == "paid"
     assert response.json()["paid_at"] == paid_at
 
+    conditional = {**headers, "If-None-Match": response.headers["etag"]}
+    response = await client.get(f"/api/orders/{order_id}", headers=conditional)
+    assert response.status_code == 304
+    assert response.headers["cache-control"] == "private, no-cache"
+
     admin = User(
         email="admin@example.com",
         full_name="Admin",
@@ -109,6 +137,16 @@ async def test_cart_checkout_flow(client, sample_catalog, session):
     assert replay_response.json()["status"] == "paid"
     assert replay_response.json()["paid_at"] == paid_at
 
+    listing = await client.get(
+        "/api/admin/orders",
+        params={"status": "paid"},
+        headers={"Authorization": f"Bearer {admin_token}"},
+    )
+    assert listing.status_code == 200
+    orders = {order["id"]: order for order in listing.json()["items"]}
+    assert orders[order_id] == (await client.get(f"/api/orders/{order_id}", headers=headers)).json()
+    assert listing.json()["total"] == len(orders)
+
 
 @pytest.mark.asyncio
 async def test_mock_payment_requires_signature(client):
@@ -124,3 +162,600 @@ async def test_mock_payment_requires_signature(client):
         headers={"x-mockpay-signature": "wrong"},
     )
     assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_cart_batch_is_atomic(client, sample_catalog, session):
+    await client.post(
+        "/api/auth/register",
+        json={"email": "batch@example.com", "password": "Password123", "name": "Batch"},
+    )
+    login = await client.post(
+        "/api/auth/login", json={"email": "batch@example.com", "password": "Password123"}
+    )
+    headers = {"Authorization": f"Bearer {login.json()['tokens']['access_token']}"}
+
+    products = [
+        Product(
+            sku=f"BATCH{idx}",
+            name=f"Batch Product {idx}",
+            slug=f"batch-product-{idx}",
+            price_cents=500,
+            currency="USD",
+            stock=5,
+        )
+        for idx in range(3)
+    ]
+    session.add_all(products)
+    await session.commit()
+    ids = [product.id for product in products]
+
+    response = await client.post(
+        "/api/cart/batch",
+        headers=headers,
+        json={"ops": [{"op": "add", "product_id": pid, "qty": 2} for pid in ids[:2]]},
+    )
+    assert response.status_code == 200
+    lines = {item["product"]["id"]: item for item in response.json()["items"]}
+    assert {pid: line["qty"] for pid, line in lines.items()} == {ids[0]: 2, ids[1]: 2}
+
+    ops = [
+        {"op": "update", "item_id": lines[ids[0]]["id"], "qty": 4},
+        {"op": "delete", "item_id": lines[ids[1]]["id"]},
+        {"op": "add", "product_id": ids[2], "qty": 1},
+        {"op": "add", "product_id": ids[2], "qty": 1},
+    ]
+    service = CartService(
+        carts=CartRepository(session), products=ProductRepository(session), session=session
+    )
+    with track_queries() as stats:
+        cart = await service.get_or_create_cart(login.json()["user"]["id"], load=CartLoad.items)
+        cart = await service.apply_batch(cart, CartBatch(ops=ops).ops)
+        await session.commit()
+    qty = {item.product_id: item.qty for item in cart.items}
+    assert qty == {ids[0]: 4, ids[2]: 2}
+    # cart and items, one product read, DELETE + UPDATE + INSERT, the version bump,
+    # then the reload (cart, items, products, images); none of it scales with ops
+    assert stats.count == 11
+    assert max(stats.shapes.values()) <= 2
+
+    # One op over stock rejects the whole batch.
+    ops = [
+        {"op": "add", "product_id": ids[1], "qty": 1},
+        {"op": "update", "item_id": lines[ids[0]]["id"], "qty": 6},
+    ]
+    response = await client.post("/api/cart/batch", headers=headers, json={"ops": ops})
+    assert response.status_code == 400
+    response = await client.post(
+        "/api/cart/batch", headers=headers, json={"ops": [{"op": "delete", "item_id": 0}]}
+    )
+    assert response.status_code == 404
+    response = await client.post(
+        "/api/cart/batch", headers=headers, json={"ops": [{"op": "update", "item_id": 1}]}
+    )
+    assert response.status_code == 422
+    cart = (await client.get("/api/cart", headers=headers)).json()
+    assert {item["product"]["id"]: item["qty"] for item in cart["items"]} == qty
+
+    # Deleting a line and re-adding its product must not trip the unique
+    # (cart_id, product_id) constraint.
+    line = next(item for item in cart["items"] if item["product"]["id"] == ids[0])
+    ops = [
+        {"op": "delete", "item_id": line["id"]},
+        {"op": "add", "product_id": ids[0], "qty": 1},
+    ]
+    response = await client.post("/api/cart/batch", headers=headers, json={"ops": ops})
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert {item["product"]["id"]: item["qty"] for item in items} == {ids[0]: 1, ids[2]: 2}
+
+
+@pytest.mark.asyncio
+async def test_add_to_cart_is_a_single_conditional_upsert(client, sample_catalog, session):
+    await client.post(
+        "/api/auth/register",
+        json={"email": "upsert@example.com", "password": "Password123", "name": "Upsert"},
+    )
+    login = await client.post(
+        "/api/auth/login", json={"email": "upsert@example.com", "password": "Password123"}
+    )
+    product = Product(
+        sku="UPSERT1", name="Upsert", slug="upsert", price_cents=100, currency="USD", stock=5
+    )
+    hidden = Product(
+        sku="UPSERT2", name="Hidden", slug="hidden", price_cents=100, currency="USD", stock=5,
+        is_active=False,
+    )
+    session.add_all([product, hidden])
+    await session.commit()
+
+    carts = CartRepository(session)
+    service = CartService(carts=carts, products=ProductRepository(session), session=session)
+    cart = await service.get_or_create_cart(login.json()["user"]["id"], load=CartLoad.header)
+    cart_id = cart.id
+    first = await service.add_item(cart_id, product_id=product.id, qty=2)
+    with track_queries() as stats:
+        line_id = await carts.upsert_item(cart_id, product.id, 3)
+    assert stats.count == 1
+    assert line_id == first.id
+    assert (await carts.upsert_item(cart_id, product.id, 1)) is None  # 6 > stock
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.add_item(cart_id, product_id=product.id, qty=1)
+    assert exc_info.value.status_code == 400
+    for product_id in (hidden.id, 0):
+        with pytest.raises(HTTPException) as exc_info:
+            await service.add_item(cart_id, product_id=product_id, qty=1)
+        assert exc_info.value.status_code == 404
+    await session.commit()
+
+    headers = {"Authorization": f"Bearer {login.json()['tokens']['access_token']}"}
+    cart = (await client.get("/api/cart", headers=headers)).json()
+    assert [(item["id"], item["qty"]) for item in cart["items"]] == [(first.id, 5)]
+
+    session.add(CartItem(cart_id=cart_id, product_id=product.id, qty=1))
+    with pytest.raises(IntegrityError):
+        await session.flush()
+    await session.rollback()
+
+
+@pytest.mark.asyncio
+async def test_cart_load_tiers(client, sample_catalog, session):
+    await client.post(
+        "/api/auth/register",
+        json={"email": "tiers@example.com", "password": "Password123", "name": "Tiers"},
+    )
+    login = await client.post(
+        "/api/auth/login", json={"email": "tiers@example.com", "password": "Password123"}
+    )
+    headers = {"Authorization": f"Bearer {login.json()['tokens']['access_token']}"}
+    product_id = (await client.get("/api/products")).json()["items"][0]["id"]
+    response = await client.post(
+        "/api/cart/items", headers=headers, json={"product_id": product_id, "qty": 1}
+    )
+    item_id = response.json()["id"]
+    user_id = login.json()["user"]["id"]
+
+    carts = CartRepository(session)
+    for load, statements in ((CartLoad.header, 1), (CartLoad.items, 2), (CartLoad.products, 4)):
+        session.expunge_all()
+        with track_queries() as stats:
+            cart = await carts.get_user_draft_cart(user_id, load=load)
+        assert stats.count == statements
+        if load == CartLoad.header:
+            with pytest.raises(InvalidRequestError):
+                _ = cart.items
+        elif load == CartLoad.items:
+            assert [item.id for item in cart.items] == [item_id]
+            with pytest.raises(InvalidRequestError):
+                _ = cart.items[0].product
+        else:
+            assert cart.items[0].product.images[0].url
+
+    response = await client.delete(f"/api/cart/items/{item_id}", headers=headers)
+    assert response.status_code == 204
+    response = await client.delete(f"/api/cart/items/{item_id}", headers=headers)
+    assert response.status_code == 404
+    assert (await client.get("/api/cart", headers=headers)).json()["items"] == []
+
+
+@pytest.mark.asyncio
+async def test_cart_quote_is_memoized_per_version(client, sample_catalog, session, catalog_service):
+    await client.post(
+        "/api/auth/register",
+        json={"email": "quote@example.com", "password": "Password123", "name": "Quote"},
+    )
+    login = await client.post(
+        "/api/auth/login", json={"email": "quote@example.com", "password": "Password123"}
+    )
+    headers = {"Authorization": f"Bearer {login.json()['tokens']['access_token']}"}
+    products = [
+        Product(
+            sku=f"QUOTE{idx}",
+            name=f"Quote {idx}",
+            slug=f"quote-{idx}",
+            price_cents=250 * (idx + 1),
+            currency="USD",
+            stock=3,
+        )
+        for idx in range(2)
+    ]
+    session.add_all(products)
+    await session.commit()
+    ids = [product.id for product in products]
+    ops = [
+        {"op": "add", "product_id": ids[0], "qty": 2},
+        {"op": "add", "product_id": ids[1], "qty": 3},
+    ]
+    await client.post("/api/cart/batch", headers=headers, json={"ops": ops})
+
+    response = await client.get("/api/cart/quote", headers=headers)
+    assert response.status_code == 200
+    quote = response.json()
+    assert [(line["line_total_cents"], line["available"]) for line in quote["items"]] == [
+        (500, True),
+        (1500, True),
+    ]
+    assert (quote["total_cents"], quote["available"]) == (2000, True)
+    response = await client.get(
+        "/api/cart/quote", headers={**headers, "If-None-Match": response.headers["etag"]}
+    )
+    assert response.status_code == 304
+
+    service = CartService(
+        carts=CartRepository(session),
+        products=ProductRepository(session),
+        session=session,
+        quotes=cart_quotes,
+    )
+    cart = await service.get_or_create_cart(login.json()["user"]["id"], load=CartLoad.header)
+    with track_queries() as stats:
+        assert (await service.quote(cart)).value.total_cents == 2000
+    assert stats.count == 0
+
+    # A write to a product outside the cart keeps the memoized quote...
+    catalog = catalog_service(quotes=cart_quotes)
+    await catalog.bulk_update([ProductBulkUpdateItem(sku="SKU100", stock=7)])
+    await session.commit()
+    with track_queries() as stats:
+        assert (await service.quote(cart)).value.total_cents == 2000
+    assert stats.count == 0
+
+    # ...while a write to one of its products invalidates it.
+    await catalog.bulk_update([ProductBulkUpdateItem(id=ids[1], stock=2)])
+    await session.commit()
+    quote = (await client.get("/api/cart/quote", headers=headers)).json()
+    assert [line["available"] for line in quote["items"]] == [True, False]
+    assert quote["available"] is False
+
+    # So does a change to the cart's lines.
+    item_id = quote["items"][1]["item_id"]
+    await client.patch(f"/api/cart/items/{item_id}", headers=headers, json={"qty": 1})
+    quote = (await client.get("/api/cart/quote", headers=headers)).json()
+    assert (quote["total_cents"], quote["available"]) == (1000, True)
+    assert quote["version"] == cart.version + 1
+
+
+@pytest.mark.asyncio
+async def test_checkout_is_set_based_and_never_oversells(client, sample_catalog, session):
+    users = []
+    for name in ("first", "second"):
+        await client.post(
+            "/api/auth/register",
+            json={"email": f"{name}@example.com", "password": "Password123", "name": name},
+        )
+        login = await client.post(
+            "/api/auth/login", json={"email": f"{name}@example.com", "password": "Password123"}
+        )
+        users.append(login.json())
+    products = [
+        Product(
+            sku=f"SET{idx}",
+            name=f"Set {idx}",
+            slug=f"set-{idx}",
+            price_cents=100 * (idx + 1),
+            currency="USD",
+            stock=2 if idx == 0 else 10,
+        )
+        for idx in range(6)
+    ]
+    session.add_all(products)
+    await session.commit()
+    hot = products[0].id
+    for user, lines in zip(users, ([p.id for p in products], [hot]), strict=True):
+        headers = {"Authorization": f"Bearer {user['tokens']['access_token']}"}
+        ops = [{"op": "add", "product_id": product_id, "qty": 1} for product_id in lines]
+        assert (await client.post("/api/cart/batch", headers=headers, json={"ops": ops})).is_success
+
+    carts = CartRepository(session)
+    service = OrderService(
+        orders=OrderRepository(session), products=ProductRepository(session), session=session
+    )
+    cart = await carts.get_user_draft_cart(users[0]["user"]["id"], load=CartLoad.items)
+    with track_queries() as stats:
+        order, _, _ = await service.checkout(cart)
+    # product read, stock reservation, order, bulk items, cart status
+    assert stats.count == 5
+    await session.commit()
+    order_id = order.id
+    assert order.total_cents == sum(100 * (idx + 1) for idx in range(6))
+    items = await session.scalars(select(OrderItem).where(OrderItem.order_id == order_id))
+    assert sorted(item.product_id for item in items) == sorted(p.id for p in products)
+    stock = await session.scalar(select(Product.stock).where(Product.id == hot))
+    assert stock == 1
+
+    class SoldOutMeanwhile(PaymentProvider):
+        async def create_payment(self, order):
+            # Another checkout takes the last unit after this one read the stock.
+            await session.execute(update(Product).where(Product.id == hot).values(stock=0))
+            return await super().create_payment(order)
+
+    service.payment_provider = SoldOutMeanwhile()
+    cart = await carts.get_user_draft_cart(users[1]["user"]["id"], load=CartLoad.items)
+    with pytest.raises(HTTPException) as exc_info:
+        await service.checkout(cart)
+    assert exc_info.value.status_code == 400
+    assert await session.scalar(select(Product.stock).where(Product.id == hot)) == 0
+    await session.rollback()
+    cart = await carts.get_user_draft_cart(users[1]["user"]["id"], load=CartLoad.header)
+    assert cart.status == CartStatus.draft
+
+    await session.execute(OrderItem.__table__.delete().where(OrderItem.order_id == order_id))
+    await session.execute(Order.__table__.delete().where(Order.id == order_id))
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_checkout_refreshes_cached_stock(sample_catalog, cached_reads, client, session):
+    product_id = await session.scalar(select(Product.id).where(Product.slug == "test-product"))
+    detail_url = f"/api/products/{product_id}"
+    listing = {"page_size": 5, "facets": "stock"}
+    assert (await client.get(detail_url)).json()["stock"] == 10
+    assert (await client.get("/api/products", params=listing)).json()["items"][0]["stock"] == 10
+    cached = await client.get(detail_url)
+    assert 'desc="0 queries"' in cached.headers["Server-Timing"]
+
+    token, _ = await create_user_and_login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    cart_id = (await client.get("/api/cart", headers=headers)).json()["id"]
+    response = await client.post(
+        "/api/cart/items", headers=headers, json={"product_id": product_id, "qty": 10}
+    )
+    assert response.status_code == 201
+    response = await client.post("/api/checkout", headers=headers, json={"cart_id": cart_id})
+    assert response.status_code == 201
+    order_id = response.json()["order_id"]
+    try:
+        assert (await client.get(detail_url)).json()["stock"] == 0
+        page = (await client.get("/api/products", params=listing)).json()
+        assert page["items"][0]["stock"] == 0
+        assert page["facets"]["stock"] == {"in_stock": 0, "out_of_stock": 1}
+    finally:
+        await session.execute(OrderItem.__table__.delete().where(OrderItem.order_id == order_id))
+        await session.execute(Order.__table__.delete().where(Order.id == order_id))
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_sharded_stock_for_hot_products(client, sample_catalog, session):
+    session.add(
+        User(
+            email="shards-admin@example.com",
+            full_name="Admin",
+            hashed_password=get_password_hash("AdminPass123!"),
+            role=UserRole.admin,
+        )
+    )
+    hot = Product(sku="HOT1", name="Hot", slug="hot", price_cents=500, currency="USD", stock=6)
+    session.add(hot)
+    await session.commit()
+    hot_id = hot.id
+    login = await client.post(
+        "/api/auth/login", json={"email": "shards-admin@example.com", "password": "AdminPass123!"}
+    )
+    admin = {"Authorization": f"Bearer {login.json()['tokens']['access_token']}"}
+
+    async def shards() -> list[int]:
+        session.expire_all()
+        return list(
+            await session.scalars(
+                select(ProductStockShard.stock)
+                .where(ProductStockShard.product_id == hot_id)
+                .order_by(ProductStockShard.shard)
+            )
+        )
+
+    admin_url = f"/api/admin/products/{hot_id}"
+    response = await client.patch(admin_url, headers=admin, json={"stock_shards": 3})
+    assert response.status_code == 200
+    assert response.json()["stock"] == 6
+    assert await shards() == [2, 2, 2]
+
+    token, _ = await create_user_and_login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    cart_id = (await client.get("/api/cart", headers=headers)).json()["id"]
+    response = await client.post(
+        "/api/cart/items", headers=headers, json={"product_id": hot_id, "qty": 7}
+    )
+    assert response.status_code == 400
+    response = await client.post(
+        "/api/cart/items", headers=headers, json={"product_id": hot_id, "qty": 2}
+    )
+    assert response.status_code == 201
+    item_id = response.json()["id"]
+    response = await client.patch(f"/api/cart/items/{item_id}", headers=headers, json={"qty": 7})
+    assert response.status_code == 400
+
+    response = await client.post("/api/checkout", headers=headers, json={"cart_id": cart_id})
+    assert response.status_code == 201
+    order_id = response.json()["order_id"]
+    # Only shard rows were written; the product row keeps its cached sum until the sync.
+    assert sum(await shards()) == 4
+    assert (await client.get(f"/api/products/{hot_id}")).json()["stock"] == 6
+    assert await sync_sharded_stock_once() == 1
+    assert await sync_sharded_stock_once() == 0
+    assert (await client.get(f"/api/products/{hot_id}")).json()["stock"] == 4
+
+    # A line no single shard covers drains several under lock.
+    products = ProductRepository(session)
+    assert await products.reserve_sharded_stock({hot_id: 3}, {hot_id: 3})
+    assert sum(await shards()) == 1
+    assert not await products.reserve_sharded_stock({hot_id: 2}, {hot_id: 3})
+    await session.rollback()
+
+    response = await client.patch(admin_url, headers=admin, json={"stock": 9})
+    assert response.status_code == 200
+    assert await shards() == [3, 3, 3]
+    response = await client.patch(admin_url, headers=admin, json={"stock_shards": 0})
+    assert response.json()["stock"] == 9
+    assert await shards() == []
+
+    await session.execute(OrderItem.__table__.delete().where(OrderItem.order_id == order_id))
+    await session.execute(Order.__table__.delete().where(Order.id == order_id))
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_shard_sync_loop(prepare_database, monkeypatch, caplog):
+    with track_queries() as stats:
+        assert await sync_sharded_stock_once() == 0
+    assert stats.count == 1
+
+    cycles = []
+
+    async def flaky_cycle() -> int:
+        cycles.append(len(cycles))
+        if len(cycles) == 1:
+            raise RuntimeError("shard sync broke")
+        return 0
+
+    monkeypatch.setattr(settings, "STOCK_SHARD_SYNC_SECONDS", 0.001)
+    monkeypatch.setattr(main, "sync_sharded_stock_once", flaky_cycle)
+    loop = asyncio.create_task(main.sync_sharded_stock())
+
+    async def three_cycles() -> None:
+        while len(cycles) < 3 and not loop.done():
+            await asyncio.sleep(0.001)
+
+    await asyncio.wait_for(three_cycles(), timeout=5)
+    assert not loop.done()
+    loop.cancel()
+    with suppress(asyncio.CancelledError):
+        await loop
+    logged = [r.message for r in caplog.records if r.name == main.logger.name]
+    assert logged == ["stock_shard_sync_failed"]
+
+    async def dead_loop() -> None:
+        raise RuntimeError("shard sync died")
+
+    caplog.clear()
+    monkeypatch.setattr(main, "sync_sharded_stock", dead_loop)
+    async with LifespanManager(app):
+        await asyncio.sleep(0.01)
+    stopped = [r for r in caplog.records if r.message == "background_task_stopped"]
+    assert len(stopped) == 1
+    assert stopped[0].task == "stock_shard_sync"
+    assert str(stopped[0].exc_info[1]) == "shard sync died"
+
+
+@pytest.mark.asyncio
+async def test_admin_status_changes_keep_sales_counters(client, sample_catalog, session):
+    session.add(
+        User(
+            email="status-admin@example.com",
+            full_name="Admin",
+            hashed_password=get_password_hash("AdminPass123!"),
+            role=UserRole.admin,
+        )
+    )
+    product = Product(
+        sku="STAT1", name="Stat", slug="stat", price_cents=500, currency="USD", stock=10
+    )
+    session.add(product)
+    await session.commit()
+    product_id = product.id
+    login = await client.post(
+        "/api/auth/login", json={"email": "status-admin@example.com", "password": "AdminPass123!"}
+    )
+    admin = {"Authorization": f"Bearer {login.json()['tokens']['access_token']}"}
+    token, _ = await create_user_and_login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def place_order(qty: int) -> int:
+        cart_id = (await client.get("/api/cart", headers=headers)).json()["id"]
+        response = await client.post(
+            "/api/cart/items", headers=headers, json={"product_id": product_id, "qty": qty}
+        )
+        assert response.status_code == 201
+        response = await client.post("/api/checkout", headers=headers, json={"cart_id": cart_id})
+        assert response.status_code == 201
+        return response.json()["order_id"]
+
+    async def units_sold() -> int:
+        session.expire_all()
+        return await session.scalar(select(Product.units_sold).where(Product.id == product_id))
+
+    # Paid by an admin instead of the payment webhook, then cancelled.
+    first = await place_order(2)
+    response = await client.patch(f"/api/admin/orders/{first}?status=paid", headers=admin)
+    assert response.status_code == 200
+    assert response.json()["paid_at"] is not None
+    assert await units_sold() == 2
+    response = await client.patch(f"/api/admin/orders/{first}?status=cancelled", headers=admin)
+    assert response.status_code == 200
+    assert await units_sold() == 0
+
+    # Cancelling an order that was never paid takes nothing back.
+    second = await place_order(1)
+    response = await client.patch(f"/api/admin/orders/{second}?status=cancelled", headers=admin)
+    assert response.status_code == 200
+    assert await units_sold() == 0
+
+    # Shipped straight from pending counts, as migration 0003's backfill does.
+    third = await place_order(3)
+    response = await client.patch(f"/api/admin/orders/{third}?status=shipped", headers=admin)
+    assert response.status_code == 200
+    assert await units_sold() == 3
+    response = await client.patch(f"/api/admin/orders/{third}?status=completed", headers=admin)
+    assert response.status_code == 200
+    assert await units_sold() == 3
+
+    order_ids = [first, second, third]
+    await session.execute(OrderItem.__table__.delete().where(OrderItem.order_id.in_(order_ids)))
+    await session.execute(Order.__table__.delete().where(Order.id.in_(order_ids)))
+    await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_sales_lower_suggestion_rank(sample_catalog, client, session):
+    session.add(
+        User(
+            email="suggest-admin@example.com",
+            full_name="Admin",
+            hashed_password=get_password_hash("AdminPass123!"),
+            role=UserRole.admin,
+        )
+    )
+    await session.commit()
+    login = await client.post(
+        "/api/auth/login", json={"email": "suggest-admin@example.com", "password": "AdminPass123!"}
+    )
+    admin = {"Authorization": f"Bearer {login.json()['tokens']['access_token']}"}
+    rack = Product(
+        sku="TUBE-1", name="Test Tube Rack", slug="test-tube-rack", price_cents=900,
+        currency="USD", stock=5, is_active=True,
+    )
+    session.add(rack)
+    await session.commit()
+    rack_id = rack.id
+    product_suggestions.upsert(rack)
+    product_suggestions.set_sales({})  # SQLite reuses the ids of earlier tests' products
+    token, _ = await create_user_and_login(client)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def suggested() -> list[str]:
+        response = await client.get("/api/products/suggest", params={"prefix": "test"})
+        return [item["slug"] for item in response.json()]
+
+    try:
+        assert await suggested() == ["test-product", "test-tube-rack"]
+        cart_id = (await client.get("/api/cart", headers=headers)).json()["id"]
+        await client.post(
+            "/api/cart/items", headers=headers, json={"product_id": rack_id, "qty": 2}
+        )
+        response = await client.post("/api/checkout", headers=headers, json={"cart_id": cart_id})
+        order_id = response.json()["order_id"]
+        response = await client.patch(f"/api/admin/orders/{order_id}?status=paid", headers=admin)
+        assert response.status_code == 200
+        assert await suggested() == ["test-tube-rack", "test-product"]
+
+        response = await client.patch(
+            f"/api/admin/orders/{order_id}?status=cancelled", headers=admin
+        )
+        assert response.status_code == 200
+        assert await suggested() == ["test-product", "test-tube-rack"]
+    finally:
+        product_suggestions.remove(rack_id)
+        await session.execute(OrderItem.__table__.delete())
+        await session.execute(Order.__table__.delete())
+        await session.commit()
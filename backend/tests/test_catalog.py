@@ -1,6 +1,39 @@
 from __future__ import annotations
 
+import asyncio
+import datetime as dt
+import json
+from types import SimpleNamespace
+
 import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.db.query_stats import assert_query_budget, track_queries
+from app.models.category import Category
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.product import Product
+from app.models.user import User, UserRole
+from app.repositories.orders import OrderRepository
+from app.repositories.products import BULK_CHUNK_SIZE, ProductRepository
+from app.schemas.product import (
+    ProductBulkUpdateItem,
+    ProductCreate,
+    ProductOut,
+    ProductPage,
+    ProductUpdate,
+)
+from app.services.catalog import CatalogService
+from app.services.categories import CategoryTreeStore, build_category_tree, category_tree_store
+from app.services.orders import OrderService
+from app.utils.cache import CountCache, SingleFlight, TTLCache
+from app.utils.columnar import ProductSnapshot
+from app.utils.http import http_date
+from app.utils.metrics import metrics_registry
+from app.utils.search import ProductSearchIndex, edit_distance, product_search_index
+from app.utils.suggest import SuggestionIndex, product_suggestions
 
 
 @pytest.mark.asyncio
@@ -15,3 +48,920 @@ async def test_product_search(client, sample_catalog):
     assert response.status_code == 200
     product = response.json()
     assert product["sku"] == "SKU100"
+
+
+def test_search_index_ranking():
+    def product(
+        id, name, sku, description=None, price_cents=1000, category_id=None, is_active=True
+    ):
+        return SimpleNamespace(
+            id=id,
+            name=name,
+            sku=sku,
+            description=description,
+            price_cents=price_cents,
+            category_id=category_id,
+            is_active=is_active,
+        )
+
+    index = ProductSearchIndex()
+    index.load(
+        [
+            product(1, "Wireless Headphones", "HP-001", "Noise cancelling", price_cents=9900),
+            product(2, "Headphone Stand", "ST-002", "Holds wireless headphones", price_cents=1500),
+            product(3, "USB Cable", "CB-003", "Braided cable", category_id=7),
+            product(4, "Hidden Headphones", "HP-004", is_active=False),
+        ]
+    )
+
+    ids, total = index.search("wireless headphones")
+    assert total == 2
+    assert ids[0] == 1
+    assert index.search("head")[1] == 2
+    assert index.search("cb003") == ([3], 1)
+    assert index.search("headphones", max_price=2000) == ([2], 1)
+    assert index.search("headphones", sort="price_asc")[0] == [2, 1]
+    assert index.search("!!!") is None
+
+    index.upsert(product(2, "Headphone Stand", "ST-002", is_active=False))
+    assert index.search("headphone")[1] == 1
+    index.remove(1)
+    assert index.search("wireless") == ([], 0)
+
+
+def test_search_index_fuzzy_matching():
+    assert edit_distance("hedphones", "headphones", 2) == 1
+    assert edit_distance("sfot", "soft", 1) == 1
+    assert edit_distance("kettle", "camera", 2) == 3
+
+    def product(id, name, is_active=True):
+        return SimpleNamespace(
+            id=id, name=name, sku=f"SKU-{id}", description=None, price_cents=1000,
+            category_id=None, is_active=is_active,
+        )
+
+    index = ProductSearchIndex()
+    index.load(
+        [
+            product(1, "Wireless Headphones"),
+            product(2, "Soft Headphone Case"),
+            product(3, "Electric Kettle"),
+            product(4, "Hidden Headset", is_active=False),
+        ]
+    )
+    assert index.search("hedphones") == ([], 0)
+    ids, total = index.search("hedphones", fuzzy=True)
+    assert (ids[0], total) == (1, 2)
+    assert index.search("sfot case", fuzzy=True) == ([2], 1)
+    assert index.search("wireles kettle", fuzzy=True) == ([], 0)
+    assert index.search("ketle", fuzzy=True) == ([3], 1)
+    assert index.search("xyzzy", fuzzy=True) == ([], 0)
+
+    index.remove(3)
+    assert index.search("ketle", fuzzy=True) == ([], 0)
+    index.upsert(product(5, "Kettle Descaler"))
+    assert index.search("ketle", fuzzy=True) == ([5], 1)
+
+
+@pytest.mark.asyncio
+async def test_catalog_service_maintains_search_index(sample_catalog, session, catalog_service):
+    index = ProductSearchIndex()
+    service = catalog_service(search_index=index)
+    await service.rebuild_search_index()
+    assert index.ready
+    search = dict(category_id=None, min_price=None, max_price=None, sort=None, page=1, page_size=10)
+    result = json.loads((await service.product_listing(q="test", **search)).body)
+    assert result["total"] == 1
+    assert result["items"][0]["sku"] == "SKU100"
+
+    product = await service.create_product(
+        ProductCreate(
+            sku="IDX-200",
+            name="Indexed Espresso Grinder",
+            slug="indexed-espresso-grinder",
+            description="Conical burr grinder",
+            price_cents=15900,
+            currency="USD",
+            stock=3,
+        )
+    )
+    # The index only follows committed writes.
+    assert index.search("burr grind") == ([], 0)
+    await session.commit()
+    listing = await service.product_listing(q="burr grind", **search)
+    assert json.loads(listing.body)["total"] == 1
+    assert listing.value == [product.id]
+
+    product_id = product.id
+    await service.update_product(product, ProductUpdate(name="Rolled Back Grinder"))
+    await session.rollback()
+    assert index.search("rolled") == ([], 0)
+    product = await service.products.get_by_id(product_id)
+    await service.update_product(product, ProductUpdate(is_active=False))
+    await session.commit()
+    assert index.search("grinder") == ([], 0)
+
+    await service.delete_product(product)
+    await session.commit()
+    assert len(index) == 1
+
+
+@pytest.mark.asyncio
+async def test_product_cursor_pagination(sample_catalog, session):
+    session.add_all(
+        [
+            Product(
+                sku=f"CUR{idx}",
+                name=f"Cursor Product {idx}",
+                slug=f"cursor-product-{idx}",
+                price_cents=1000 + (idx % 3) * 100,
+                currency="USD",
+                stock=1,
+            )
+            for idx in range(7)
+        ]
+    )
+    await session.commit()
+    repo = ProductRepository(session)
+
+    for sort in (None, "price_asc", "price_desc"):
+        expected = await repo.search(sort=sort, page=1, page_size=100)
+        assert expected.total == 8
+        seen = []
+        result = await repo.search(sort=sort, page=1, page_size=3)
+        seen.extend(result.items)
+        while result.next_cursor:
+            result = await repo.search(sort=sort, page=1, page_size=3, cursor=result.next_cursor)
+            assert result.total == 8
+            seen.extend(result.items)
+        assert [p.id for p in seen] == [p.id for p in expected.items]
+
+    with pytest.raises(HTTPException) as exc_info:
+        await repo.search(sort="price_asc", page=1, page_size=3, cursor="not-a-cursor")
+    assert exc_info.value.status_code == 400
+
+    # Search-index offset cursors only page the query they were issued for.
+    index = ProductSearchIndex()
+    index.load((await repo.search(page=1, page_size=100)).items)
+    indexed = ProductRepository(session, search_index=index)
+    first = await indexed.search(q="cursor", page=1, page_size=3)
+    assert first.total == 7
+    second = await indexed.search(q="cursor", page=1, page_size=3, cursor=first.next_cursor)
+    assert len(second.items) == 3
+    assert {p.id for p in second.items}.isdisjoint(p.id for p in first.items)
+    with pytest.raises(HTTPException) as exc_info:
+        await indexed.search(q="test", page=1, page_size=3, cursor=first.next_cursor)
+    assert exc_info.value.status_code == 400
+    with pytest.raises(HTTPException):
+        await indexed.search(
+            q="cursor", max_price=1000, page=1, page_size=3, cursor=first.next_cursor
+        )
+
+
+@pytest.mark.asyncio
+async def test_product_count_strategies(sample_catalog, session, monkeypatch):
+    session.add_all(
+        [
+            Product(
+                sku=f"CNT{idx}",
+                name=f"Count {idx}",
+                slug=f"count-{idx}",
+                price_cents=100,
+                currency="USD",
+                stock=1,
+            )
+            for idx in range(4)
+        ]
+    )
+    await session.commit()
+    repo = ProductRepository(session)
+
+    result = await repo.search(page=3, page_size=2)
+    assert (result.items, result.total) == ([result.items[0]], 5)
+    result = await repo.search(page=9, page_size=2)
+    assert (result.items, result.total) == ([], 5)
+
+    monkeypatch.setattr(settings, "COUNT_STRATEGY", "estimate")
+    monkeypatch.setattr(settings, "COUNT_ESTIMATE_THRESHOLD", 3)
+    result = await repo.search(page=1, page_size=2)
+    assert result.total == 3
+    assert result.total_estimated
+
+
+def test_count_cache_invalidation():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.evictions == 1
+    now[0] = 11
+    assert cache.get("a") is None
+
+    counts = CountCache(ttl=30)
+    counts.set("products", ("q",), 12)
+    assert counts.get("products", ("q",)) == (12, False)
+    counts.invalidate("products")
+    assert counts.get("products", ("q",)) is None
+
+
+@pytest.mark.asyncio
+async def test_catalog_read_through_cache(sample_catalog, session, catalog_service):
+    cache = TTLCache(maxsize=100, ttl=60)
+    service = catalog_service(cache=cache, category_tree=CategoryTreeStore())
+    search = dict(
+        q=None, category_id=None, min_price=None, max_price=None, sort=None, page=1, page_size=10
+    )
+
+    product = await service.get_product("test-product")
+    listing = await service.product_listing(**search)
+    categories = await service.list_categories()
+    assert json.loads(listing.body)["total"] == 1
+    assert categories[0].slug == "electronics"
+
+    with assert_query_budget(max_queries=0):
+        assert await service.get_product(str(product.id)) is product
+        assert await service.product_listing(**search) is listing
+        assert await service.list_categories() is categories
+    assert cache.hits == 2
+
+    orm_product = await service.products.get_by_id(product.id)
+    await service.update_product(orm_product, ProductUpdate(price_cents=3100))
+    await session.commit()
+    assert (await service.get_product("test-product")).price_cents == 3100
+    listing = await service.product_listing(**search)
+    assert json.loads(listing.body)["items"][0]["price_cents"] == 3100
+
+
+@pytest.mark.asyncio
+async def test_category_tree_versioning_and_etag(client, session):
+    parent = Category(name="Home", slug="home")
+    session.add(parent)
+    await session.flush()
+    session.add(Category(name="Kitchen", slug="kitchen", parent_id=parent.id))
+    await session.commit()
+
+    response = await client.get("/api/categories")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.json()[0]["children"][0]["slug"] == "kitchen"
+
+    cached = await client.get("/api/categories")
+    assert cached.content == response.content
+    assert 'desc="0 queries"' in cached.headers["Server-Timing"]
+    not_modified = await client.get("/api/categories", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    version = category_tree_store.version
+    parent.name = "Home & Garden"
+    await session.commit()
+    assert category_tree_store.version == version + 1
+
+    changed = await client.get("/api/categories", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()[0]["name"] == "Home & Garden"
+
+    await session.execute(Category.__table__.delete())
+    await session.commit()
+    assert category_tree_store.version == version + 2
+
+
+def test_category_tree_descendant_sets():
+    def category(id, parent_id=None):
+        return SimpleNamespace(id=id, name=f"c{id}", slug=f"c{id}", parent_id=parent_id)
+
+    tree = build_category_tree(
+        [category(1), category(2, 1), category(3, 2), category(4, 1), category(5)], version=1
+    )
+    assert tree.subtree_ids(1) == {1, 2, 3, 4}
+    assert tree.subtree_ids(2) == {2, 3}
+    assert tree.subtree_ids(5) == {5}
+    assert tree.subtree_ids(99) == {99}
+
+
+@pytest.mark.asyncio
+async def test_include_descendants_filter(client, session):
+    root = Category(name="Outdoor", slug="outdoor")
+    session.add(root)
+    await session.flush()
+    child = Category(name="Tents", slug="tents", parent_id=root.id)
+    session.add(child)
+    await session.flush()
+    products = [
+        Product(sku="OUT-1", name="Camp Stove", slug="camp-stove", price_cents=4000,
+                currency="USD", stock=3, category_id=root.id, is_active=True),
+        Product(sku="OUT-2", name="Dome Tent", slug="dome-tent", price_cents=9000,
+                currency="USD", stock=3, category_id=child.id, is_active=True),
+    ]
+    session.add_all(products)
+    await session.commit()
+    for product in products:
+        product_search_index.upsert(product)
+    try:
+        params = {"category_id": root.id}
+        exact = (await client.get("/api/products", params=params)).json()
+        assert [item["sku"] for item in exact["items"]] == ["OUT-1"]
+
+        params["include_descendants"] = "true"
+        subtree = (await client.get("/api/products", params=params)).json()
+        assert sorted(item["sku"] for item in subtree["items"]) == ["OUT-1", "OUT-2"]
+        assert subtree["total"] == 2
+
+        params["q"] = "tent"
+        searched = (await client.get("/api/products", params=params)).json()
+        assert [item["sku"] for item in searched["items"]] == ["OUT-2"]
+    finally:
+        for product in products:
+            product_search_index.remove(product.id)
+        await session.execute(Product.__table__.delete())
+        await session.execute(Category.__table__.delete())
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_product_facets_single_pass(client, session):
+    gear = Category(name="Gear", slug="gear")
+    books = Category(name="Books", slug="books")
+    session.add_all([gear, books])
+    await session.flush()
+    session.add_all(
+        [
+            Product(sku="F-1", name="Lamp", slug="lamp", price_cents=900, currency="USD",
+                    stock=0, category_id=gear.id),
+            Product(sku="F-2", name="Rope", slug="rope", price_cents=3000, currency="USD",
+                    stock=4, category_id=gear.id),
+            Product(sku="F-3", name="Atlas", slug="atlas", price_cents=3500, currency="USD",
+                    stock=2, category_id=books.id),
+        ]
+    )
+    await session.commit()
+    try:
+        response = await client.get("/api/products", params={"facets": "category,price,stock"})
+        assert response.status_code == 200
+        # listing page, its images, and one grouped query for all three facets
+        assert 'desc="3 queries"' in response.headers["Server-Timing"]
+        facets = response.json()["facets"]
+        assert facets["categories"] == [
+            {"category_id": gear.id, "count": 2},
+            {"category_id": books.id, "count": 1},
+        ]
+        assert [bucket["count"] for bucket in facets["price"]] == [1, 0, 2, 0, 0, 0]
+        assert facets["price"][0] == {"min_cents": None, "max_cents": 1000, "count": 1}
+        assert facets["stock"] == {"in_stock": 2, "out_of_stock": 1}
+
+        filtered = await client.get(
+            "/api/products", params={"facets": "stock", "min_price": 1000}
+        )
+        assert filtered.json()["facets"] == {
+            "categories": None, "price": None, "stock": {"in_stock": 2, "out_of_stock": 0}
+        }
+        assert (await client.get("/api/products")).json()["facets"] is None
+        assert (await client.get("/api/products", params={"facets": "color"})).status_code == 422
+    finally:
+        await session.execute(Product.__table__.delete())
+        await session.execute(Category.__table__.delete())
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_facets_count_the_search_index_matches(sample_catalog, client):
+    # SKU100 matches on its SKU and "tset" only fuzzily; neither is in the product name.
+    for params in ({"q": "sku100"}, {"q": "tset", "fuzzy": "true"}):
+        response = await client.get(
+            "/api/products", params={**params, "facets": "category,price,stock"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total"] == 1
+        facets = data["facets"]
+        assert sum(facet["count"] for facet in facets["categories"]) == data["total"]
+        assert sum(bucket["count"] for bucket in facets["price"]) == data["total"]
+        assert facets["stock"]["in_stock"] + facets["stock"]["out_of_stock"] == data["total"]
+
+
+@pytest.mark.asyncio
+async def test_search_facets_cost_one_statement_for_any_match_count(session):
+    matches = BULK_CHUNK_SIZE + 200
+    await session.execute(
+        Product.__table__.insert(),
+        [
+            {
+                "sku": f"WIDE-{i}", "name": f"Wide Match {i}", "slug": f"wide-{i}",
+                "price_cents": 500 if i % 2 else 5000, "currency": "USD",
+                "stock": 0 if i % 3 == 0 else 1, "is_active": True,
+                "created_at": dt.datetime(2024, 1, 1),
+            }
+            for i in range(matches)
+        ],
+    )
+    await session.commit()
+    index = ProductSearchIndex()
+    index.load((await session.execute(select(Product))).scalars())
+    repo = ProductRepository(session, search_index=index)
+    try:
+        with track_queries() as stats:
+            counts = await repo.facet_counts(
+                frozenset({"category", "price", "stock"}), price_bounds=[1000], q="wide"
+            )
+        assert stats.count == 1
+        assert counts.categories == {None: matches}
+        assert counts.price_buckets == [matches // 2, matches // 2]
+        assert counts.out_of_stock == len(range(0, matches, 3))
+        assert counts.in_stock + counts.out_of_stock == matches
+    finally:
+        await session.execute(Product.__table__.delete())
+        await session.commit()
+
+
+def test_product_snapshot_filters_sorts_and_updates():
+    pytest.importorskip("numpy")
+    base = dt.datetime(2024, 1, 1)
+
+    def row(id, price, category_id=None, minutes=0, is_active=True):
+        return SimpleNamespace(
+            id=id,
+            price_cents=price,
+            category_id=category_id,
+            created_at=base + dt.timedelta(minutes=minutes),
+            stock=5,
+            is_active=is_active,
+        )
+
+    snapshot = ProductSnapshot(capacity=2)
+    snapshot.clear()
+    for item in (row(1, 500, 1, 3), row(2, 300, 1, 1), row(3, 300, 2, 2), row(4, 900, None, 0)):
+        snapshot.add(item)
+    snapshot.finish()
+
+    assert snapshot.search(sort="price_asc", limit=3) == ([2, 3, 1], 4, True)
+    assert snapshot.search(sort="price_desc", limit=2) == ([4, 1], 4, True)
+    assert snapshot.search(sort="newest", offset=1, limit=10) == ([3, 2, 4], 4, False)
+    subtree = snapshot.search(category_ids=frozenset({1, 2}), max_price=400, sort="price_asc")
+    assert subtree[0] == [2, 3]
+    assert snapshot.search(sort="price_asc", after=(300, 2), limit=2) == ([3, 1], 4, True)
+    assert snapshot.search(sort="newest", after=(base + dt.timedelta(minutes=2), 3))[0] == [2, 4]
+
+    snapshot.upsert(row(2, 1000, 1, 1))
+    snapshot.upsert(row(5, 100, 2, 4))
+    snapshot.upsert(row(4, 900, is_active=False))
+    assert snapshot.search(sort="price_asc")[0] == [5, 3, 1, 2]
+    snapshot.remove(1)
+    assert snapshot.search(category_id=1)[0] == [2]
+    assert len(snapshot) == 3
+    assert snapshot.bytes_per_product() > 0
+
+
+@pytest.mark.asyncio
+async def test_snapshot_listing_matches_sql(sample_catalog, session, catalog_service):
+    pytest.importorskip("numpy")
+    snapshot = ProductSnapshot()
+    service = catalog_service(snapshot=snapshot)
+    await service.rebuild_snapshot()
+    sql = ProductRepository(session)
+    for sort in ("price_asc", "price_desc", None):
+        for filters in ({}, {"min_price": 3000}):
+            expected = await sql.search(sort=sort, page=1, page_size=10, **filters)
+            actual = await service.products.search(sort=sort, page=1, page_size=10, **filters)
+            assert [p.id for p in actual.items] == [p.id for p in expected.items]
+            assert actual.total == expected.total
+
+
+@pytest.mark.asyncio
+async def test_catalog_conditional_get(client, sample_catalog):
+    for url in ("/api/products/test-product", "/api/products?page_size=5"):
+        response = await client.get(url)
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert etag.startswith('W/"')
+
+        unchanged = await client.get(url, headers={"If-None-Match": f'"other", {etag}'})
+        assert unchanged.status_code == 304
+        assert unchanged.headers["etag"] == etag
+        assert unchanged.content == b""
+
+    stale = await client.get("/api/products/test-product", headers={"If-None-Match": 'W/"stale"'})
+    assert stale.status_code == 200
+    assert stale.json()["slug"] == "test-product"
+
+
+@pytest.mark.asyncio
+async def test_product_conditional_get_checks_version_first(
+    client, sample_catalog, session, monkeypatch
+):
+    url = "/api/products/test-product"
+    response = await client.get(url)
+    etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+
+    async def load_product(self, identifier):
+        raise AssertionError("a current copy must not load the product")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(CatalogService, "_resolve_product", load_product)
+        for headers in ({"If-None-Match": etag}, {"If-Modified-Since": last_modified}):
+            unchanged = await client.get(url, headers=headers)
+            assert unchanged.status_code == 304
+            assert unchanged.headers["last-modified"] == last_modified
+            assert 'desc="1 queries"' in unchanged.headers["Server-Timing"]
+
+    earlier = dt.datetime.utcnow() - dt.timedelta(days=1)
+    stale = await client.get(url, headers={"If-Modified-Since": http_date(earlier)})
+    assert stale.status_code == 200
+
+    product = await session.scalar(select(Product).where(Product.slug == "test-product"))
+    product.name = "Renamed Product"
+    await session.commit()
+    changed = await client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["name"] == "Renamed Product"
+    assert changed.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_admin_update_refreshes_cached_reads(sample_catalog, cached_reads, client, session):
+    session.add(
+        User(
+            email="cache-admin@example.com",
+            full_name="Admin",
+            hashed_password=get_password_hash("AdminPass123!"),
+            role=UserRole.admin,
+        )
+    )
+    await session.commit()
+    login = await client.post(
+        "/api/auth/login", json={"email": "cache-admin@example.com", "password": "AdminPass123!"}
+    )
+    admin = {"Authorization": f"Bearer {login.json()['tokens']['access_token']}"}
+    product_id = await session.scalar(select(Product.id).where(Product.slug == "test-product"))
+    detail_urls = ("/api/products/test-product", f"/api/products/{product_id}")
+    listing = {"page_size": 5, "facets": "category,price,stock"}
+
+    async def reads() -> tuple[list[dict], dict, dict]:
+        details = [(await client.get(url)).json() for url in detail_urls]
+        return details, (await client.get("/api/products", params=listing)).json(), (
+            await client.get("/api/products", params={"q": "renamed"})
+        ).json()
+
+    details, page, search = await reads()
+    assert [detail["name"] for detail in details] == ["Test Product"] * 2
+    assert search["total"] == 0
+    for url in detail_urls:
+        cached = await client.get(url)
+        assert 'desc="0 queries"' in cached.headers["Server-Timing"]
+
+    response = await client.patch(
+        f"/api/admin/products/{product_id}",
+        headers=admin,
+        json={"name": "Renamed Product", "price_cents": 900, "stock": 0},
+    )
+    assert response.status_code == 200
+    details, page, search = await reads()
+    assert [(d["name"], d["price_cents"], d["stock"]) for d in details] == [
+        ("Renamed Product", 900, 0)
+    ] * 2
+    assert [item["price_cents"] for item in page["items"]] == [900]
+    assert page["facets"]["stock"] == {"in_stock": 0, "out_of_stock": 1}
+    assert page["facets"]["price"][0]["count"] == 1
+    assert [item["id"] for item in search["items"]] == [product_id]
+
+    response = await client.patch(
+        f"/api/admin/products/{product_id}", headers=admin, json={"is_active": False}
+    )
+    assert response.status_code == 200
+    page = (await client.get("/api/products", params=listing)).json()
+    assert page["total"] == 0
+    assert page["facets"]["stock"] == {"in_stock": 0, "out_of_stock": 0}
+
+
+@pytest.mark.asyncio
+async def test_product_resolution_single_statement(sample_catalog, catalog_service):
+    slug_ids = TTLCache(maxsize=10, ttl=60)
+    service = catalog_service(slug_ids=slug_ids)
+    with assert_query_budget(max_queries=1):
+        product = await service.get_product("test-product")
+    assert product.images[0].alt == "test"
+    assert slug_ids.get("test-product") == product.id
+
+    with assert_query_budget(max_queries=1):
+        assert (await service.get_product(str(product.id))).slug == "test-product"
+    with assert_query_budget(max_queries=1):
+        assert (await service.get_product("test-product")).id == product.id
+
+    slug_ids.set("test-product", product.id + 1000)
+    assert (await service.get_product("test-product")).id == product.id
+    assert slug_ids.get("test-product") == product.id
+
+
+@pytest.mark.asyncio
+async def test_product_id_and_zero_padded_slug_collide(client, sample_catalog, session):
+    product_id = (await client.get("/api/products/test-product")).json()["id"]
+    padded = f"{product_id:03d}"
+    session.add(
+        Product(sku="PAD-1", name="Padded", slug=padded, price_cents=100, currency="USD", stock=1)
+    )
+    await session.commit()
+
+    response = await client.get(f"/api/products/{padded}")
+    assert response.status_code == 200
+    assert response.json()["sku"] == "SKU100"
+    assert (await client.get(f"/api/products/{product_id}")).json()["sku"] == "SKU100"
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_is_set_based(session, catalog_service):
+    products = [
+        Product(sku=f"BULK-{i}", name=f"Bulk {i}", slug=f"bulk-{i}", price_cents=1000,
+                currency="USD", stock=1, is_active=True)
+        for i in range(50)
+    ]
+    session.add_all(products)
+    await session.commit()
+    index = ProductSearchIndex()
+    index.load(products)
+    service = catalog_service(search_index=index)
+    items = [ProductBulkUpdateItem(sku=f"BULK-{i}", price_cents=2000 + i) for i in range(50)]
+    items += [
+        ProductBulkUpdateItem(id=products[0].id, stock=7, is_active=False),
+        ProductBulkUpdateItem(sku="MISSING", stock=1),
+    ]
+    try:
+        with track_queries() as stats:
+            result = await service.bulk_update(items)
+        await session.commit()
+        assert (result.requested, result.updated, result.not_found) == (52, 50, ["MISSING"])
+        assert stats.count <= 7
+
+        rows = await session.execute(
+            select(Product.sku, Product.price_cents, Product.stock, Product.is_active)
+            .where(Product.sku.in_(["BULK-0", "BULK-1"]))
+            .order_by(Product.sku)
+        )
+        assert rows.all() == [("BULK-0", 2000, 7, False), ("BULK-1", 2001, 1, True)]
+        assert index.search("bulk", min_price=2049) == ([products[49].id], 1)
+        assert index.search("bulk", max_price=2000) == ([], 0)
+    finally:
+        await session.execute(Product.__table__.delete())
+        await session.commit()
+
+
+def test_suggestion_index_prefixes_and_popularity():
+    def product(id, name, sku, is_active=True):
+        return SimpleNamespace(
+            id=id, name=name, sku=sku, slug=name.lower().replace(" ", "-"), price_cents=1000,
+            is_active=is_active,
+        )
+
+    index = SuggestionIndex(hot_range=1)
+    index.load(
+        [
+            product(1, "Wireless Headphones", "HP-001"),
+            product(2, "Headphone Stand", "ST-002"),
+            product(3, "Wired Mouse", "MS-003"),
+            product(4, "Hidden Headset", "HS-004", is_active=False),
+        ],
+        sales={1: 5},
+    )
+    assert [s.id for s in index.suggest("head")] == [1, 2]
+    assert [s.id for s in index.suggest("WIRE")] == [1, 3]
+    assert [s.id for s in index.suggest("wireless  h")] == [1]
+    assert [s.id for s in index.suggest("ms-0")] == [3]
+    assert index.suggest("  ") == []
+    assert [s.id for s in index.suggest("h", limit=1)] == [1]
+
+    assert "h" in index._memo
+    index.record_sale(2, 10)
+    assert [s.id for s in index.suggest("h")] == [2, 1]
+    assert [s.id for s in index.suggest("headphone")] == [2, 1]
+    index.record_sale(2, -8)  # cancelled
+    assert [s.id for s in index.suggest("h")] == [1, 2]
+    index.record_sale(2, 8)
+
+    index.upsert(product(3, "Headphone Amp", "MS-003"))
+    assert [s.id for s in index.suggest("wire")] == [1]
+    assert [s.id for s in index.suggest("h")] == [2, 1, 3]
+    index.upsert(product(2, "Headphone Stand", "ST-002", is_active=False))
+    index.remove(1)
+    assert [s.name for s in index.suggest("head")] == ["Headphone Amp"]
+
+
+@pytest.mark.asyncio
+async def test_suggest_endpoint_follows_catalog_writes(
+    client, sample_catalog, session, catalog_service
+):
+    service = catalog_service(suggestions=product_suggestions)
+    await service.rebuild_suggestions({})
+    product = await service.create_product(
+        ProductCreate(
+            sku="SUG-1", name="Test Tube Rack", slug="test-tube-rack", price_cents=900,
+            currency="USD", stock=1,
+        )
+    )
+    await session.commit()
+    try:
+        response = await client.get("/api/products/suggest", params={"prefix": "tes"})
+        assert response.status_code == 200
+        assert [item["slug"] for item in response.json()] == ["test-product", "test-tube-rack"]
+        response = await client.get("/api/products/suggest", params={"prefix": "sug-1"})
+        assert response.json() == [
+            {"id": product.id, "name": "Test Tube Rack", "slug": "test-tube-rack",
+             "sku": "SUG-1", "price_cents": 900}
+        ]
+        response = await client.get("/api/products/suggest", params={"prefix": ""})
+        assert response.status_code == 422
+    finally:
+        await service.delete_product(product)
+        await session.commit()
+        product_suggestions.clear()
+
+
+@pytest.mark.asyncio
+async def test_listing_is_assembled_from_versioned_fragments(
+    client, sample_catalog, session, catalog_service
+):
+    fragments = TTLCache(maxsize=100, ttl=60)
+    service = catalog_service(fragments=fragments)
+    await service.create_product(
+        ProductCreate(
+            sku="FRG-1", name="Fragment Lamp", slug="fragment-lamp", price_cents=4200,
+            currency="USD", stock=2, images=[{"url": "https://cdn.example.com/lamp", "alt": None}],
+        )
+    )
+    search = dict(
+        q=None, category_id=None, min_price=None, max_price=None, sort="price_asc", page=1,
+        page_size=10, facets=frozenset({"stock"}),
+    )
+
+    async def expected_body() -> bytes:
+        products = [await service.products.get_by_id(pid) for pid in listing.value]
+        page = ProductPage(
+            items=[ProductOut.model_validate(product) for product in products],
+            total=2,
+            page=1,
+            page_size=10,
+            pages=1,
+            facets=await service.product_facets(
+                frozenset({"stock"}), q=None, category_id=None, min_price=None, max_price=None
+            ),
+        )
+        return page.model_dump_json().encode()
+
+    listing = await service.product_listing(**search)
+    assert listing.body == await expected_body()
+    assert (fragments.hits, fragments.misses) == (0, 2)
+
+    listing = await service.product_listing(**search)
+    assert fragments.hits == 2
+
+    product = await service.products.get_by_id(listing.value[1])
+    await service.update_product(product, ProductUpdate(stock=0))
+    listing = await service.product_listing(**search)
+    assert (fragments.hits, fragments.misses) == (3, 3)
+    assert listing.body == await expected_body()
+    assert b'"stock":0' in listing.body
+
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_calls():
+    flights = SingleFlight()
+    calls = 0
+    release = asyncio.Event()
+
+    async def query(value):
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        if value == "boom":
+            raise ValueError(value)
+        return value
+
+    waiting = [asyncio.create_task(flights.run("a", lambda: query("a"))) for _ in range(5)]
+    failing = [asyncio.create_task(flights.run("b", lambda: query("boom"))) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert len(flights) == 2
+    release.set()
+    assert await asyncio.gather(*waiting) == ["a"] * 5
+    for task in failing:
+        with pytest.raises(ValueError):
+            await task
+    assert (calls, flights.leaders, flights.coalesced, flights.stampedes_avoided) == (2, 2, 6, 2)
+    assert len(flights) == 0
+
+    release.clear()
+    leader = asyncio.create_task(flights.run("c", lambda: query("c")))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flights.run("c", lambda: query("c")))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await follower == "c"
+    assert leader.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_listing_misses_share_one_query(
+    client, sample_catalog, session, catalog_service
+):
+    cache = TTLCache(maxsize=100, ttl=60)
+    flights = SingleFlight()
+    service = catalog_service(cache=cache, flights=flights)
+    search = dict(
+        q=None, category_id=None, min_price=None, max_price=None, sort=None, page=1, page_size=10
+    )
+    with track_queries() as single:
+        await service._build_listing(
+            **search, cursor=None, include_descendants=False, facets=frozenset(), fuzzy=False
+        )
+    with track_queries() as stats:
+        listings = await asyncio.gather(*(service.product_listing(**search) for _ in range(20)))
+    assert stats.count == single.count
+    assert all(listing is listings[0] for listing in listings)
+    assert (flights.leaders, flights.coalesced, flights.stampedes_avoided) == (1, 19, 1)
+
+    assert await service.product_listing(**search) is listings[0]
+    assert flights.leaders == 1
+
+    rendered = metrics_registry.render_prometheus()
+    assert 'singleflight_requests_total{flight="catalog_listing",role="coalesced"}' in rendered
+
+
+@pytest.mark.asyncio
+async def test_sales_counter_sorts(client, sample_catalog, session):
+    products = [
+        Product(
+            sku=f"HOT{idx}",
+            name=f"Hot Product {idx}",
+            slug=f"hot-product-{idx}",
+            price_cents=1000,
+            currency="USD",
+            stock=100,
+        )
+        for idx in range(4)
+    ]
+    session.add_all(products)
+    await session.flush()
+    # (product, qty, paid_at): product 0 sold most overall, but long ago.
+    sales = [
+        (0, 9, dt.datetime(2024, 1, 1)),
+        (1, 4, dt.datetime(2024, 6, 1)),
+        (2, 2, dt.datetime(2024, 6, 2)),
+        (3, 3, dt.datetime(2024, 6, 2)),
+    ]
+    for idx, (position, qty, paid_at) in enumerate(sales):
+        product = products[position]
+        item = OrderItem(
+            product_id=product.id,
+            sku_snapshot=product.sku,
+            name_snapshot=product.name,
+            price_cents=product.price_cents,
+            qty=qty,
+        )
+        session.add(
+            Order(
+                user_id=1,
+                status=OrderStatus.pending,
+                total_cents=product.price_cents * qty,
+                payment_ref=f"pay_sales_{idx}",
+                paid_at=paid_at,
+                items=[item],
+            )
+        )
+    await session.commit()
+
+    repo = ProductRepository(session)
+    service = OrderService(orders=OrderRepository(session), products=repo, session=session)
+    for idx in range(len(sales)):
+        await service.mark_paid(f"pay_sales_{idx}")
+    await service.mark_paid("pay_sales_0")  # repeated webhook does not count twice
+    cancelled = await service.mark_paid("pay_sales_3")
+    await service.transition_status(cancelled, OrderStatus.cancelled)
+    await session.commit()
+
+    ids = [product.id for product in products]
+    counters = await session.execute(
+        select(Product.id, Product.units_sold, Product.trending_score).where(Product.id.in_(ids))
+    )
+    units = {row.id: (row.units_sold, row.trending_score) for row in counters}
+    assert [units[pid][0] for pid in ids] == [9, 4, 2, 0]
+    assert units[ids[3]][1] == pytest.approx(0)
+    best = await repo.search(sort="best_selling", page=1, page_size=100)
+    assert [p.id for p in best.items][:3] == [ids[0], ids[1], ids[2]]
+    trending = await repo.search(sort="trending", page=1, page_size=100)
+    assert [p.id for p in trending.items][:3] == [ids[1], ids[2], ids[0]]
+
+    for sort, expected in (("best_selling", best), ("trending", trending)):
+        seen = []
+        result = await repo.search(sort=sort, page=1, page_size=2)
+        seen.extend(result.items)
+        while result.next_cursor:
+            result = await repo.search(sort=sort, page=1, page_size=2, cursor=result.next_cursor)
+            seen.extend(result.items)
+        assert [p.id for p in seen] == [p.id for p in expected.items]
+
+    await session.execute(OrderItem.__table__.delete())
+    await session.execute(Order.__table__.delete())
+    await session.commit()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import csv
+import datetime as dt
+import io
+import json
+
+import pytest
+
+from app.core.security import get_password_hash
+from app.models.order import Order, OrderItem, OrderStatus
+from app.models.user import User, UserRole
+
+
+@pytest.mark.asyncio
+async def test_order_export_streams_ndjson_and_csv(client, session):
+    admin = User(
+        email="finance-admin@example.com",
+        full_name="Finance",
+        hashed_password=get_password_hash("AdminPass123!"),
+        role=UserRole.admin,
+    )
+    session.add(admin)
+    await session.flush()
+    base = dt.datetime(2024, 3, 1)
+    orders = [
+        Order(
+            user_id=admin.id,
+            status=OrderStatus.paid if i % 2 else OrderStatus.pending,
+            total_cents=1000 * (i + 1),
+            currency="USD",
+            created_at=base + dt.timedelta(days=i),
+            items=[
+                OrderItem(product_id=1, sku_snapshot=f"SKU{i}-{n}", name_snapshot="Thing",
+                          price_cents=500, qty=n + 1)
+                for n in range(i)
+            ],
+        )
+        for i in range(4)
+    ]
+    session.add_all(orders)
+    await session.commit()
+    login = await client.post(
+        "/api/auth/login", json={"email": "finance-admin@example.com", "password": "AdminPass123!"}
+    )
+    headers = {"Authorization": f"Bearer {login.json()['tokens']['access_token']}"}
+    try:
+        window = {"created_from": "2024-03-01T00:00:00", "created_to": "2024-04-01T00:00:00"}
+        response = await client.get("/api/admin/orders/export", params=window, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        exported = [json.loads(line) for line in response.text.splitlines()]
+        assert [order["id"] for order in exported] == [order.id for order in orders]
+        assert [len(order["items"]) for order in exported] == [0, 1, 2, 3]
+        assert exported[3]["items"][2] == {
+            "id": orders[3].items[2].id,
+            "product_id": 1,
+            "sku": "SKU3-2",
+            "name": "Thing",
+            "price_cents": 500,
+            "qty": 3,
+        }
+
+        response = await client.get(
+            "/api/admin/orders/export",
+            params={
+                "format": "csv",
+                "status": "paid",
+                "created_from": "2024-03-02T00:00:00Z",
+                "created_to": window["created_to"],
+            },
+            headers=headers,
+        )
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [(int(row["order_id"]), row["sku"]) for row in rows] == [
+            (orders[1].id, "SKU1-0"),
+            (orders[3].id, "SKU3-0"),
+            (orders[3].id, "SKU3-1"),
+            (orders[3].id, "SKU3-2"),
+        ]
+
+        forbidden = await client.get("/api/admin/orders/export")
+        assert forbidden.status_code == 401
+    finally:
+        ids = [order.id for order in orders]
+        await session.execute(OrderItem.__table__.delete().where(OrderItem.order_id.in_(ids)))
+        await session.execute(Order.__table__.delete().where(Order.id.in_(ids)))
+        await session.commit()
@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+from sqlalchemy import select
+
+from app.core.security import get_password_hash
+from app.db.import_products import upload_file
+from app.db.query_stats import track_queries
+from app.models.product import Product, ProductImage
+from app.models.user import User, UserRole
+from app.repositories.products import ProductRepository
+from app.services.product_import import ProductImporter, iter_lines, parse_ndjson
+
+
+async def chunks(data: bytes, size: int = 7):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+def ndjson(*rows) -> bytes:
+    return b"\n".join(row if isinstance(row, bytes) else json.dumps(row).encode() for row in rows)
+
+
+def feed_row(sku: str, **overrides):
+    row = {
+        "sku": sku,
+        "name": f"Item {sku}",
+        "slug": sku.lower(),
+        "price_cents": 1000,
+        "currency": "USD",
+        "stock": 5,
+    }
+    row.update(overrides)
+    return row
+
+
+@pytest.mark.asyncio
+async def test_import_upserts_in_batches_and_reports_row_errors(client, session):
+    importer = ProductImporter(session=session, products=ProductRepository(session), batch_size=2)
+    data = ndjson(
+        feed_row("IMP-1", images=[{"url": "https://cdn.example.com/1.jpg"}]),
+        feed_row("IMP-2"),
+        b"{not json",
+        feed_row("IMP-3", price_cents=-5),
+        feed_row("IMP-4"),
+        feed_row("IMP-5", slug="imp-4"),
+    )
+    try:
+        with track_queries() as stats:
+            report = await importer.run(parse_ndjson(iter_lines(chunks(data))))
+        assert (report.rows, report.created, report.updated, report.failed) == (6, 3, 0, 3)
+        assert [error.line for error in report.errors] == [3, 4, 6]
+        assert report.errors[0].error.startswith("invalid JSON")
+        assert report.errors[1].error.startswith("price_cents")
+        assert report.errors[2].error.startswith("rejected by the database")
+        assert stats.count < 20
+
+        data = ndjson(
+            feed_row("IMP-1", price_cents=1500, images=[]),
+            feed_row("IMP-2", stock=0),
+            feed_row("IMP-6"),
+        )
+        report = await importer.run(parse_ndjson(iter_lines(chunks(data))))
+        assert (report.created, report.updated, report.failed) == (1, 2, 0)
+
+        rows = await session.execute(
+            select(Product.sku, Product.price_cents, Product.stock).order_by(Product.sku)
+        )
+        assert rows.all() == [
+            ("IMP-1", 1500, 5),
+            ("IMP-2", 1000, 0),
+            ("IMP-4", 1000, 5),
+            ("IMP-6", 1000, 5),
+        ]
+        assert (await session.execute(select(ProductImage))).all() == []
+    finally:
+        await session.execute(ProductImage.__table__.delete())
+        await session.execute(Product.__table__.delete())
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_csv_import_endpoint(client, session):
+    admin = User(
+        email="catalog-admin@example.com",
+        full_name="Catalog Admin",
+        hashed_password=get_password_hash("AdminPass123!"),
+        role=UserRole.admin,
+    )
+    session.add(admin)
+    await session.commit()
+    login = await client.post(
+        "/api/auth/login", json={"email": "catalog-admin@example.com", "password": "AdminPass123!"}
+    )
+    headers = {"Authorization": f"Bearer {login.json()['tokens']['access_token']}"}
+
+    feed = (
+        "sku,name,slug,description,price_cents,currency,stock,image_urls\r\n"
+        'CSV-1,Desk,desk,"Oak desk,\nsolid",25000,USD,3,https://cdn.example.com/d.jpg\r\n'
+        "CSV-2,Chair,chair,,9900,USD,abc,\r\n"
+    ).encode()
+    try:
+        response = await client.post(
+            "/api/admin/products/import", params={"format": "csv"}, content=feed, headers=headers
+        )
+        assert response.status_code == 200
+        report = response.json()
+        assert (report["rows"], report["created"], report["failed"]) == (2, 1, 1)
+        assert report["errors"][0]["line"] == 4
+        assert report["errors"][0]["error"].startswith("stock")
+        assert report["rows_per_second"] > 0
+
+        product = (await client.get("/api/products/desk")).json()
+        assert product["description"] == "Oak desk,\nsolid"
+        assert product["images"][0]["url"] == "https://cdn.example.com/d.jpg"
+
+        forbidden = await client.post("/api/admin/products/import", content=feed)
+        assert forbidden.status_code == 401
+    finally:
+        await session.execute(ProductImage.__table__.delete())
+        await session.execute(Product.__table__.delete())
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_import_endpoint_reports_rows_the_database_rejects(client, session):
+    session.add(
+        User(
+            email="feed-admin@example.com",
+            full_name="Feed Admin",
+            hashed_password=get_password_hash("AdminPass123!"),
+            role=UserRole.admin,
+        )
+    )
+    await session.commit()
+    login = await client.post(
+        "/api/auth/login", json={"email": "feed-admin@example.com", "password": "AdminPass123!"}
+    )
+    headers = {"Authorization": f"Bearer {login.json()['tokens']['access_token']}"}
+
+    feed = ndjson(feed_row("DUP-1", slug="dup"), feed_row("DUP-2", slug="dup"))
+    try:
+        response = await client.post("/api/admin/products/import", content=feed, headers=headers)
+        assert response.status_code == 200
+        report = response.json()
+        assert (report["rows"], report["created"], report["failed"]) == (2, 1, 1)
+        assert report["errors"][0]["line"] == 2
+        assert report["errors"][0]["error"].startswith("rejected by the database")
+        assert (await client.get("/api/products/dup")).json()["sku"] == "DUP-1"
+    finally:
+        await session.execute(ProductImage.__table__.delete())
+        await session.execute(Product.__table__.delete())
+        await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_cli_import_is_searchable_on_the_server(client, session, tmp_path):
+    session.add(
+        User(
+            email="cli-admin@example.com",
+            full_name="CLI Admin",
+            hashed_password=get_password_hash("AdminPass123!"),
+            role=UserRole.admin,
+        )
+    )
+    await session.commit()
+    login = await client.post(
+        "/api/auth/login", json={"email": "cli-admin@example.com", "password": "AdminPass123!"}
+    )
+    token = login.json()["tokens"]["access_token"]
+    feed = tmp_path / "feed.ndjson"
+    feed.write_bytes(
+        ndjson(feed_row("CLI-1", name="Walnut Bookshelf"), feed_row("CLI-2", name="Walnut Stool"))
+    )
+    try:
+        report = await upload_file(client, feed, fmt="ndjson", batch_size=1, token=token)
+        assert (report.rows, report.created, report.failed) == (2, 2, 0)
+
+        found = (await client.get("/api/products", params={"q": "walnut"})).json()
+        assert sorted(item["sku"] for item in found["items"]) == ["CLI-1", "CLI-2"]
+        suggested = (await client.get("/api/products/suggest", params={"prefix": "walnut"})).json()
+        assert len(suggested) == 2
+
+        feed.write_bytes(ndjson(feed_row("CLI-2", name="Oak Stool")))
+        report = await upload_file(client, feed, fmt="ndjson", batch_size=1, token=token)
+        assert report.updated == 1
+        found = (await client.get("/api/products", params={"q": "walnut"})).json()
+        assert [item["sku"] for item in found["items"]] == ["CLI-1"]
+    finally:
+        await session.execute(ProductImage.__table__.delete())
+        await session.execute(Product.__table__.delete())
+        await session.commit()
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import select
+
+from app.db.query_stats import QueryBudgetExceededError, assert_query_budget, statement_shape
+from app.models.product import Product
+
+
+def test_statement_shape_collapses_in_lists():
+    first = statement_shape("SELECT * FROM products\n WHERE id IN (?, ?, ?)")
+    second = statement_shape("SELECT * FROM products WHERE id IN (?)")
+    assert first == second
+
+
+@pytest.mark.asyncio
+async def test_query_budget_detects_repeated_statements(sample_catalog, session):
+    with assert_query_budget(max_queries=3) as stats:
+        await session.execute(select(Product))
+    assert stats.count == 1
+
+    with pytest.raises(QueryBudgetExceededError, match="possible N\\+1"):
+        with assert_query_budget(max_repeats=2):
+            for product_id in range(3):
+                await session.execute(select(Product).where(Product.id == product_id))
+
+    with pytest.raises(QueryBudgetExceededError, match="budget is 1"):
+        with assert_query_budget(max_queries=1):
+            await session.execute(select(Product))
+            await session.execute(select(Product.id))
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header(client, sample_catalog):
+    response = await client.get("/api/products", params={"page": 1, "page_size": 10})
+    assert response.status_code == 200
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    assert 'desc="2 queries"' in response.headers["Server-Timing"]